@@ -19,6 +19,7 @@ Module for interacting with and accessing Ontologies
 
 from .base import *
 from .create import OWLClass, OWLGraph, UMD
+from .store import SQLiteStore
 
 ##########################################################################
 ## Module functions
@@ -34,6 +35,7 @@ def make_graph(tree, lazy=False, **options):
         - description
         - creators (a list of creators names)
         - date (defaults to the current date)
+        - store (an rdflib store for the graph, e.g. a SQLiteStore)
 
     This function doesn't do too much, but is a quick way to start making
     RDF graphs from S-Expression trees.
@@ -19,11 +19,23 @@ TODO: How to add classes/instances/properties etc to ontology?
 ## Imports
 ##########################################################################
 
+import os
+import time
 import rdflib
+import threading
+import multiprocessing
 import urllib2
 import operator
 
+from collections import OrderedDict
+
 from lene.utils.rdfutils import *
+from lene.ontology.graph import VersionedGraph
+from lene.ontology.snapshot import read_source, snapshot_path, source_base
+from lene.ontology.snapshot import read_snapshot, write_snapshot
+from lene.ontology.snapshot import pack_triples, unpack_triples
+from lene.ontology.index import ClassHierarchy, PropertyIndex, NameIndex, EntityIndex
+from lene.ontology.index import build_tree, is_builtin
 from lene.ontology.vocabs import OWL, DUBLINCORE as DC
 from rdflib import Namespace, exceptions, URIRef, RDFS, RDF, BNode
 
@@ -34,6 +46,21 @@ from rdflib import Namespace, exceptions, URIRef, RDFS, RDF, BNode
 DEFAULT_SESSION_NAMESPACE = "http://www.example.org/session/resource#"
 DEFAULT_ONTO = "http://xmlns.com/foaf/0.1/"
 DEFAULT_LANGUAGE = "en"
+QUERY_CACHE_SIZE = 1000
+
+# Ontology properties derived from the indexes of the graph, as the method
+# and arguments that compute them, in the order that they are initialized.
+DERIVED = OrderedDict((
+    ("toplayer", ("_get_top_classes", ())),
+    ("class_tree", ("_build_class_tree", ())),
+    ("max_depth", ("_ontology_max_depth", ())),
+    ("classes", ("_get_all_classes", ())),
+    ("instances", ("_get_all_instances", ())),
+    ("rdf_props", ("_get_all_properties", ("rdf.property",))),
+    ("obj_props", ("_get_all_properties", ("owl.objectproperty",))),
+    ("data_props", ("_get_all_properties", ("owl.datatypeproperty",))),
+    ("properties", ("_get_all_properties", ())),
+))
 
 ##########################################################################
 ## The Ontology
@@ -45,17 +72,36 @@ class Ontology(object):
     at the ontological level.
     """
 
-    def __init__(self, uri=None):
+    def __init__(self, uri=None, cache=None, store="default", lazy=False):
         """
         Class that includes methods for manipulating an RDF/RDFS/OWL graph
         at the ontological level. If no URI is specified, then an empty
-        ontology is constructed.
+        ontology is constructed, unless the store already holds a graph.
+
+        A lazy ontology only records the location and format of the URI,
+        the graph is parsed and indexed the first time that it (or any
+        other state of the ontology) is accessed, e.g. by a query method.
 
         :param uri: a valid ontology uri (could be a local file path too)
-        """
-        self.graph      = rdflib.Graph()
+        :param cache: a trusted directory for binary snapshots of parsed ontologies
+        :param store: an rdflib store or store plugin name, e.g. a SQLiteStore
+        :param lazy: defer parsing the uri until the ontology is first used
+        """
+        if lazy and uri:
+            self.location   = expand_uri(uri)
+            self.format     = guess_rdf_format(self.location)
+            self.session    = None
+            self.session_ns = None
+
+            # Arguments of the deferred load, None once the ontology is loaded
+            self._lock      = threading.Lock()
+            self._pending   = (uri, cache, store)
+            return
+
+        self.graph      = VersionedGraph(store)
         self.pretty_uri = None
         self.location   = None
+        self.format     = None
 
         self.classes    = None
         self.instances  = None
@@ -72,28 +118,168 @@ class Ontology(object):
 
         self.class_tree = None
 
-        # If a URI is passed in, then load it from the location.
-        self.load(uri)
+        # Namespace rankers for sorting predicates, keyed by namespace order
+        self._rankers   = {}
+
+        # Indexes derived from the graph, keyed by index class
+        self._indexes   = {}
+        self._nsmap     = None
+
+        # Results of SPARQL queries and the graph version they are valid for
+        self._queries   = LRUCache(maxsize=QUERY_CACHE_SIZE)
+        self._query_version = None
 
-    def load(self, uri):
+        # If a URI is passed in, then load it from the location, otherwise
+        # initialize from a store that was reopened with a graph in it. The
+        # indexes of a reopened store are only built once they are used.
+        if uri:
+            self.load(uri, cache=cache)
+        elif len(self.graph) > 0:
+            self._initialize(deferred=True)
+
+    def load(self, uri, cache=None):
         """
         Loads a URI using the rdflib parser, which can include a web URI.
         What happens with multiple load calls? Should this be a class
         method that returns an instance of the ontology?
+
+        If a cache directory is given, the parsed triples, namespaces and
+        indexes are stored in a binary snapshot named by the hash of the
+        source, and later loads of the same source restore the snapshot
+        rather than parsing it again. Snapshots are pickles, so the cache
+        must be a trusted directory that no one else can write to.
         """
 
         if not uri: return                      # Handle empty URIs
-        if uri.startswith("www."):              # Handle lazy URLs
-            uri = "http://%s" % str(uri)
+        uri = expand_uri(uri)                   # Handle lazy URLs
 
         # Guess the format and parse
-        rdffmt = guess_rdf_format(uri)
-        self.graph.parse(uri, format=rdffmt)    # Handle exceptions?
+        rdffmt   = guess_rdf_format(uri)
+        snapshot = None
+        if cache is None:
+            self.graph.parse(uri, format=rdffmt)    # Handle exceptions?
+        else:
+            snapshot = self._load_snapshot(uri, rdffmt, cache)
 
         # Instantiate properties from the loaded graph
         self.location   = uri
+        self.format     = rdffmt
+        self._initialize()
+
+        # Store a snapshot of the graph and its indexes once they're built
+        if snapshot is not None:
+            indexes = [index for _, index in self._indexes.itervalues()]
+            write_snapshot(snapshot, self.graph, indexes, base=source_base(uri))
+
+        # Make the parsed triples durable in a transactional store
+        self.graph.commit()
+
+    def _initialize(self, deferred=False):
+        """
+        Instantiates the ontology properties from the triples in the graph.
+        If deferred, the properties derived from the indexes (see DERIVED)
+        are left unset and computed by __getattr__ when first accessed.
+        """
         self.pretty_uri = self.get_ontology_uri(stringify=True, exclude_blank=True)
 
+        if deferred:
+            for name in DERIVED:
+                self.__dict__.pop(name, None)
+            return
+
+        self.index(PropertyIndex)
+        for name in DERIVED:
+            setattr(self, name, self._derive(name))
+
+    def _derive(self, name):
+        """
+        Computes one of the DERIVED ontology properties from the indexes.
+        """
+        method, args = DERIVED[name]
+        return getattr(self, method)(*args)
+
+    def _load_snapshot(self, uri, rdffmt, cache):
+        """
+        Loads the uri from its snapshot in the cache directory if there is
+        one, otherwise parses it. Returns the path to write the snapshot to
+        once the indexes of the graph have been built, or None if there is
+        nothing left to write.
+
+        Indexes are only restored into (and stored from) an empty graph,
+        a source that is added to a graph with other triples is parsed on
+        its own and snapshot without indexes before it is merged.
+        """
+        base  = source_base(uri)
+        data  = read_source(uri)
+        path  = snapshot_path(cache, data, base)
+        fresh = len(self.graph) == 0
+
+        snapshot = read_snapshot(path, base) if os.path.exists(path) else None
+        if snapshot is not None:
+            triples, namespaces, indexes = snapshot
+            self._merge(triples, namespaces)
+            if fresh:
+                for index in indexes:
+                    self._indexes[type(index)] = (self.graph.version, index)
+            return None
+
+        # Parse with the same base uri as an uncached load of the uri
+        if fresh:
+            self.graph.parse(data=data, format=rdffmt, publicID=base)
+            return path
+
+        source = VersionedGraph()
+        source.parse(data=data, format=rdffmt, publicID=base)
+        write_snapshot(path, source, base=base)
+        self._merge(source, source.namespaces())
+        return None
+
+    def _merge(self, triples, namespaces):
+        """
+        Adds triples to the graph in bulk and binds the namespaces that are
+        not bound in the graph yet.
+        """
+        self.graph.addN((s, p, o, self.graph) for s, p, o in triples)
+        for prefix, ns in namespaces:
+            self.graph.bind(prefix, ns, override=False)
+
+    def load_many(self, uris, workers=None):
+        """
+        Loads several URIs at once: every source is parsed into its own
+        graph in a pool of worker processes (one per CPU by default) and
+        the triples are merged into the graph in bulk as they arrive, in
+        the order of the uris. Namespaces are bound in the same order, so
+        a prefix bound by an earlier source is kept.
+
+        Returns an ordered dict of the seconds it took to parse each uri.
+        """
+        uris = [expand_uri(uri) for uri in uris if uri]
+        if not uris: return OrderedDict()
+
+        timings = OrderedDict()
+        pool    = None
+        if workers != 1 and len(uris) > 1:
+            pool    = multiprocessing.Pool(workers)
+            results = pool.imap(parse_source, uris)
+        else:
+            results = (parse_source(uri) for uri in uris)
+
+        try:
+            for uri, terms, data, namespaces, seconds in results:
+                self._merge(unpack_triples(terms, data), namespaces)
+                timings[uri] = seconds
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+
+        # Instantiate properties from the merged graph
+        if self.location is None:
+            self.location = uris[0]
+        self._initialize()
+        self.graph.commit()
+        return timings
+
     def dump(self, path):
         """
         Save the current ontology to the path on disk.
@@ -101,7 +287,52 @@ class Ontology(object):
         with open(path, 'wb') as out:
             out.write(self.serialize())
 
+    @property
+    def loaded(self):
+        """
+        False while a lazy ontology has not been parsed yet.
+        """
+        return self.__dict__.get("_pending") is None
+
+    def __getattr__(self, name):
+        # Only called for missing attributes, e.g. the graph and the
+        # ontology properties of a lazy ontology that is not loaded yet,
+        # or the derived properties of an ontology on a reopened store.
+        if name.startswith("__"):
+            raise AttributeError("%r object has no attribute %r" % (
+                self.__class__.__name__, name))
+
+        if not self.loaded:
+            self._load_pending()
+            return getattr(self, name)
+
+        if name in DERIVED and "graph" in self.__dict__:
+            value = self.__dict__[name] = self._derive(name)
+            return value
+
+        raise AttributeError("%r object has no attribute %r" % (
+            self.__class__.__name__, name))
+
+    def _load_pending(self):
+        """
+        Parses and indexes the uri of a lazy ontology. Concurrent first
+        accesses wait on a lock and the uri is only parsed once. The state
+        is built on a separate ontology and then copied over, so that no
+        other thread can see a partially loaded graph.
+        """
+        with self._lock:
+            if self.loaded: return
+            uri, cache, store = self._pending
+            loaded = Ontology(uri, cache=cache, store=store)
+            for key, value in loaded.__dict__.iteritems():
+                self.__dict__.setdefault(key, value)
+            self._pending = None
+
     def __repr__(self):
+        if not self.loaded:
+            return "<%s for URI: %s - not loaded>" % (
+                self.__class__.__name__, self.location)
+
         return "<%s for URI: %s - %d triples>" % (
             self.__class__.__name__, self.pretty_uri, len(self.graph))
 
@@ -117,25 +348,48 @@ class Ontology(object):
         Sorting: by default results are sorted alphabeticallya nd according
         to the namespaces listed in the order_props default list.
         """
-        output  = []
-        exclude = exclude_props if exclude_props is not None else []
-        for s,p,o in self.graph.triples((entity, None, None)):
-            if exclude_blank and is_blank(o): continue
-            if p not in exclude:
-                output.append((p,o))
+        return next(self.entity_triples_many([entity], prettify=prettify,
+                    exclude_props=exclude_props, exclude_blank=exclude_blank,
+                    order_props=order_props))[1]
+
+    def entity_triples_many(self, entities, prettify=False, exclude_props=None,
+            exclude_blank=False, order_props=[RDF, RDFS, OWL.OWLNS, DC.DCNS]):
+        """
+        Yields (entity, pred-obj list) for each of the entities in turn,
+        with the same options as entity_triples. The excluded properties,
+        predicate ranking and prettified predicates are set up once and
+        shared by every entity, and results are streamed per entity.
+        """
+        exclude = set(exclude_props) if exclude_props else set()
 
         # Sorting
         if type(order_props) == type([]):
-            ordered = sort_by_namespace_prefix([p for p,o in output], order_props)
-            ordered = [(n+1, x) for n,x in enumerate(ordered)]
-            ranked  = dict((key, rank) for (rank, key) in ordered)
-            output  = sorted(output, key=lambda tup: ranked.get(tup[0]))
+            rank    = self.namespace_ranker(order_props).key
+            sortkey = lambda tup: rank(tup[0])
         elif order_props:
-            output  = sorted(output, key=operator.itemgetter(0))
+            sortkey = operator.itemgetter(0)
+        else:
+            sortkey = None
 
         if prettify:
-            return [(self.uri2nice(p), o) for p,o in output]
-        return output
+            nsmap = self.namespace_map()
+            names = {}
+
+        for entity in entities:
+            output = [
+                (p,o) for s,p,o in self.graph.triples((entity, None, None))
+                if p not in exclude and not (exclude_blank and is_blank(o))
+            ]
+
+            if sortkey is not None:
+                output.sort(key=sortkey)
+
+            if prettify:
+                for p,o in output:
+                    if p not in names: names[p] = nsmap.uri2nice(p)
+                output = [(names[p], o) for p,o in output]
+
+            yield entity, output
 
     def entity_labels(self, entity, language=DEFAULT_LANGUAGE, getall=True):
         """
@@ -230,28 +484,129 @@ class Ontology(object):
             return None
         else:
             output = []
-            for x in self.graph.namespaces():
-                if x[0]: output.append(x)
-            else:
-                prefix = infer_namespace_prefix(x[1])
-                if not prefix:
-                    prefix = "base"
-                output.append((prefix, x[1]))
+            for prefix, ns in self.graph.namespaces():
+                output.append((namespace_prefix(prefix, ns), ns))
 
             return sorted(output)
 
+    def namespace_map(self):
+        """
+        Returns the NamespaceMap of the graph namespaces, which is built
+        once and rebuilt only when a namespace has been bound since.
+        """
+        version = self.graph.ns_version
+        if self._nsmap is None or self._nsmap[0] != version:
+            self._nsmap = (version, NamespaceMap(self.namespaces()))
+        return self._nsmap[1]
+
+    def namespace_ranker(self, namespaces):
+        """
+        Returns the NamespaceRanker for an ordered list of namespaces. The
+        rankers (and the sort keys they cache) are kept per Ontology so
+        that predicates are only ranked once.
+        """
+        key = tuple(unicode(ns) for ns in namespaces)
+        if key not in self._rankers:
+            self._rankers[key] = NamespaceRanker(key)
+        return self._rankers[key]
+
+    def index(self, kind):
+        """
+        Returns the index of the given kind (e.g. ClassHierarchy) for the
+        graph. Indexes are built on first use and rebuilt whenever the
+        graph has been modified since they were built.
+        """
+        version = self.graph.version
+        cached  = self._indexes.get(kind)
+        if cached is None or cached[0] != version:
+            cached = self._indexes[kind] = (version, kind(self.graph))
+        return cached[1]
+
+    @property
+    def hierarchy(self):
+        """
+        The ClassHierarchy index of the ontology.
+        """
+        return self.index(ClassHierarchy)
+
+    @property
+    def entities(self):
+        """
+        The EntityIndex of the ontology.
+        """
+        return self.index(EntityIndex)
+
+    @property
+    def property_index(self):
+        """
+        The PropertyIndex of the ontology.
+        """
+        return self.index(PropertyIndex)
+
     def statistics(self):
         """
-        Returns a list of tuples containing interesting stats.
+        Returns a list of tuples containing interesting stats. Classes are
+        counted as in the classes attribute, without blank nodes.
         """
+        entities = self.entities
         return [
             ("Triples", len(self.graph)),
-            ("Classes", len(self.classes)),
-            ("Object Properties", len(self.obj_props)),
-            ("Datatype Properties", len(self.data_props)),
-            ("Individuals", len(self.instances)),
+            ("Classes", len(self._get_all_classes())),
+            ("Object Properties", len(entities.properties["owl.objectproperty"])),
+            ("Datatype Properties", len(entities.properties["owl.datatypeproperty"])),
+            ("Individuals", len(entities.instances)),
         ]
 
+    def query(self, query, initBindings=None, initNs=None):
+        """
+        Runs a SPARQL query on the graph and returns a list of result rows
+        for SELECT queries, a bool for ASK queries and a graph for CONSTRUCT
+        and DESCRIBE queries.
+
+        Results are cached by the normalized query text (see normalize_query)
+        and the bindings and namespaces, the cache is emptied whenever the
+        graph or its namespace bindings are modified. Returned graphs are
+        shared between calls and should not be modified.
+        """
+        version = (self.graph.version, self.graph.ns_version)
+        if version != self._query_version:
+            self._queries.invalidate()
+            self._query_version = version
+
+        initBindings = initBindings or {}
+        initNs       = initNs or {}
+        key = (
+            normalize_query(query),
+            frozenset(initBindings.iteritems()),
+            frozenset(initNs.iteritems()),
+        )
+
+        result = self._queries.get(key)
+        if result is None:
+            result = self.graph.query(query, initBindings=initBindings, initNs=initNs)
+            if result.type == "SELECT":
+                result = tuple(result)
+            elif result.type == "ASK":
+                result = result.askAnswer
+            else:
+                result = result.graph
+            self._queries[key] = result
+
+        if isinstance(result, tuple):
+            return list(result)
+        return result
+
+    def query_stats(self):
+        """
+        Returns the hits, misses and size of the SPARQL query cache.
+        """
+        return {
+            "hits": self._queries.hits,
+            "misses": self._queries.misses,
+            "size": len(self._queries),
+            "maxsize": self._queries.maxsize,
+        }
+
     def serialize(self, format=""):
         """
         Shortcut to output the ontology graph.
@@ -278,46 +633,28 @@ class Ontology(object):
             exclude_rdf_owl: boolean (True)
         """
 
-        def add_to_dict(key, data):
-            if kwargs.get('exclude_rdf_owl', True):
-                nspaces = (
-                    'http://www.w3.org/2002/07/owl#',
-                    'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
-                    'http://www.w3.org/2000/01/rdf-schema#',
-                )
-                for ns in nspaces:
-                    if key.startswith(ns): return data
-
-            data.add(key)
-            return data
-
-        output = set([])
+        entities = self.entities
+        if predicate:
+            output = set(entities.classes[predicate])
+        else:
+            output = entities.all_classes()
 
         if kwargs.get('add_owl_thing', True):
-            output = add_to_dict(OWL.Thing, output)
-
-        if predicate in ("", "rdfs"):
-            for subj in self.graph.subjects(RDF.type, RDFS.Class):
-                output = add_to_dict(subj, output)
-
-        if predicate in ("", "owl"):
-            for subj in self.graph.subjects(RDF.type, OWL.Class):
-                output = add_to_dict(subj, output)
+            output.add(OWL.Thing)
 
         if kwargs.get("include_domain_range", False):
-            for obj in self.graph.objects(None, RDFS.domain):
-                output = add_to_dict(obj, output)
-            for obj in self.graph.objects(None, RDFS.range):
-                output = add_to_dict(obj, output)
+            for values in self.property_index.domains.itervalues():
+                output.update(values)
+            for values in self.property_index.ranges.itervalues():
+                output.update(values)
 
         if kwargs.get("include_implicit", False):
-            for subj, verb, obj in self.graph.triples((None, RDFS.subClassOf, None)):
-                output = add_to_dict(subj, output)
-                output = add_to_dict(obj, output)
-            for obj in self.graph.objects(None, RDF.type):
-                output = add_to_dict(obj, output)
+            output.update(self.hierarchy.classes)
+            for types in entities.types.itervalues():
+                output.update(types)
 
-        output = list(output)
+        if kwargs.get('exclude_rdf_owl', True):
+            output = [key for key in output if not is_builtin(key)]
         if kwargs.get("remove_blank", True):
             output = [key for key in output if not is_blank(key)]
         return sort_uri_list_by_name(output)
@@ -325,34 +662,50 @@ class Ontology(object):
     def _get_top_classes(self, predicate='', ignore_thing=True):
         """
         Finds the topclass in the ontology (with multiple inheritance).
+        Classes whose only parent is owl:Thing are top classes unless
+        ignore_thing is False.
         """
-        pass
+        ignore  = (OWL.Thing,) if ignore_thing else ()
+        classes = self.hierarchy.roots(ignore)
+        if predicate:
+            classes &= set(self._get_all_classes(predicate))
+        return sort_uri_list_by_name(classes)
 
-    def _build_class_tree(self, parent=None, out=None):
+    def _build_class_tree(self, parent=None):
         """
-        Reconstruct the taxonomical tree of an ontology.
+        Reconstruct the taxonomical tree of an ontology. The tree is a dict
+        that maps 0 to the top classes and every class to its children. If
+        a parent is given, only the subtree rooted at it is returned.
         """
-        pass
+        roots = self._get_top_classes() if parent is None else [parent]
+        return build_tree(roots, self.hierarchy.children)
 
-    def _classes_from_tree(self, element=0, out=None):
+    def _classes_from_tree(self, element=0, treedict=None):
         """
         Extract all the classes in order from the tree representation of
         the ontology. Useful for taxonomic introspection.
         """
-        pass
+        treedict = treedict or self.class_tree or {}
+        output   = []
+        stack    = list(reversed(treedict.get(element, [])))
+        while stack:
+            cls = stack.pop()
+            output.append(cls)
+            stack.extend(reversed(treedict.get(cls, [])))
+        return output
 
-    def _class_tree_level(self, cls, level=0, key=0):
+    def _class_tree_level(self, cls):
         """
-        Returns the depth of a class in the class tree by inspecting the
-        Tree dictionary.
+        Returns the depth of a class in the class tree, where the top
+        classes are at level 0 and every class is deeper than its parents.
         """
-        pass
+        return self.hierarchy.depth(cls)
 
     def _ontology_max_depth(self):
         """
         Returns the max depth of the ontology class tree.
         """
-        pass
+        return self.hierarchy.max_depth()
 
     def class_repr(self, cls):
         """
@@ -360,11 +713,11 @@ class Ontology(object):
         """
         pass
 
-    def class_find(self, name, exact=False):
+    def class_find(self, name, exact=False, prefix=False, ignore_case=False):
         """
         Finds a class from its name within an ontology graph.
         """
-        pass
+        return self._find(name, self.hierarchy.classes, exact, prefix, ignore_case)
 
     def class_superclasses(self, cls, direct=True, exclude_blank=True, sort=False):
         """
@@ -372,7 +725,8 @@ class Ontology(object):
         direct is True, then it only returns the direct superclasses,
         otherwise it returns all of the superclasses.
         """
-        pass
+        return self._filter_entities(
+            self.hierarchy.superclasses(cls, direct), exclude_blank, sort)
 
     def class_subclasses(self, cls, direct=True, exclude_blank=True, sort=False):
         """
@@ -380,50 +734,100 @@ class Ontology(object):
         is True, then it returns the direct children, otherwise it returns
         all ancesestors of the given class.
         """
-        pass
+        return self._filter_entities(
+            self.hierarchy.subclasses(cls, direct), exclude_blank, sort)
 
     def class_siblings(self, cls, exclude_blank=True, sort=False):
         """
         Returns a list of siblings for a given class (direct children of
         the same parent(s)).
         """
-        pass
+        return self._filter_entities(
+            self.hierarchy.siblings(cls), exclude_blank, sort)
+
+    def class_is_subclass(self, cls, parent):
+        """
+        Returns True if cls is parent or one of its (transitive) subclasses.
+        """
+        return self.hierarchy.is_subclass(cls, parent)
 
     def class_most_specialized(self, classes):
         """
         From a list of classes, returns the leaf nodes only.
         """
-        pass
+        return self.hierarchy.most_specialized(classes)
 
     def class_most_generic(self, classes):
         """
         From a list of classes, returns only the most generic.
         """
-        pass
+        return self.hierarchy.most_generic(classes)
+
+    def class_lca(self, cls, other, exact=False):
+        """
+        Returns the most specific common superclass of two classes. See
+        ClassHierarchy.lca for how multiple inheritance is handled.
+        """
+        return self.hierarchy.lca(cls, other, exact=exact)
+
+    def class_lca_many(self, pairs, exact=False):
+        """
+        Returns the most specific common superclass of many class pairs.
+        """
+        return self.hierarchy.lca_many(pairs, exact=exact)
+
+    def class_similarity(self, classes, metric="wup"):
+        """
+        Returns a NumPy matrix with the pairwise taxonomic similarity of a
+        list of classes, either Wu-Palmer ("wup") or path length ("path").
+        """
+        return self.hierarchy.similarity(classes, metric=metric)
+
+    def _class_and_ancestors(self, cls, inherited=False):
+        """
+        Helper that returns the class along with (if inherited) its cached
+        ancestors and owl:Thing, which is the superclass of every class.
+        """
+        if not inherited:
+            return (cls,)
+        return self.hierarchy.ancestors(cls) | set([cls, OWL.Thing])
 
     def class_domain_for(self, cls, inherited=False):
         """
         Gets all the poperties that declare this class as a domain.
         """
-        pass
+        classes = self._class_and_ancestors(cls, inherited)
+        return sort_uri_list_by_name(self.property_index.domain_for(classes))
 
     def class_range_for(self, cls, inherited=False):
         """
         Gets all the properties that declare this class as a range.
         """
-        pass
+        classes = self._class_and_ancestors(cls, inherited)
+        return sort_uri_list_by_name(self.property_index.range_for(classes))
 
     def class_properties(self, cls):
         """
-        Gets all the properties defined for a class and their values.
+        Gets all the properties defined for a class and their values, that
+        is a list of (property, range) for every property with the class
+        (or one of its superclasses) as a domain.
         """
-        pass
+        index = self.property_index
+        return [
+            (prop, sort_uri_list_by_name(index.range(prop)))
+            for prop in self.class_domain_for(cls, inherited=True)
+        ]
 
     def class_instances(self, clss, direct=True):
         """
         Gets all the instances of a class (direct instances by default).
         """
-        pass
+        instances_of = self.entities.instances_of
+        output = set(instances_of.get(clss, ()))
+        if not direct:
+            for cls in self.hierarchy.descendants(clss):
+                output.update(instances_of.get(cls, ()))
+        return sort_uri_list_by_name(output)
 
     ##////////////////////////////////////////////////////////////////////
     ## Methods for manipulating OWL properties
@@ -437,38 +841,28 @@ class Ontology(object):
         if predicate not in ("", "rdf.property", "owl.objectproperty", "owl.datatypeproperty"):
             raise Exception("Unknown class predicate '%s'" % predicate)
 
-        output = set([])
-
-        if predicate in ("", "rdf.property"):
-            for subj in self.graph.subjects(RDF.type, RDF.Property):
-                output.add(subj)
-
-            if include_implicit:
-                for subj in self.graph.subjects(None, None):
-                    output.add(subj)
-
-        if predicate in ("", "owl.objectproperty") or include_implicit:
-            for subj in self.graph.subjects(RDF.type, OWL.ObjectProperty):
-                output.add(subj)
-
-        if predicate in ("", "owl.datatypeproperty") or include_implicit:
-            for subj in self.graph.subjects(RDF.type, OWL.DatatypeProperty):
-                output.add(subj)
+        entities = self.entities
+        if predicate:
+            output = set(entities.properties[predicate])
+        else:
+            output = entities.all_properties()
 
-        output = list(output)
+        if include_implicit:
+            output.update(self.property_index.implicit)
         return sort_uri_list_by_name(output)
 
     def _get_top_properties(self, predicate='', include_implicit=False):
         """
         Finds the top property in an ontology
         """
-        pass
+        return sort_uri_list_by_name(
+            self.property_index.roots(predicate, include_implicit))
 
-    def _build_property_tree(self, predicate, parent=None, out=None):
+    def _build_property_tree(self, predicate='', include_implicit=False):
         """
         Constructs a taxonomical property tree of an ontology.
         """
-        pass
+        return self.property_index.tree(predicate, include_implicit)
 
     def property_repr(self, prop):
         """
@@ -476,37 +870,41 @@ class Ontology(object):
         """
         pass
 
-    def property_find(self, name, exact=False, predicate="", include_implicit=False):
+    def property_find(self, name, exact=False, predicate="", include_implicit=False,
+                      prefix=False, ignore_case=False):
         """
         Find a property from its name within an ontology graph.
         """
-        pass
+        props = self.property_index.properties(predicate, include_implicit)
+        return self._find(name, props, exact, prefix, ignore_case)
 
     def property_range(self, prop):
         """
         Returns the range of a property
         """
-        pass
+        return sort_uri_list_by_name(self.property_index.range(prop))
 
     def property_domain(self, prop):
         """
         Returns the domain of a property
         """
-        pass
+        return sort_uri_list_by_name(self.property_index.domain(prop))
 
     def property_superclasses(self, prop, direct=True, exclude_blank=True, sort=False):
         """
         Return a list of superclasses of a property. If direct is True then
         only return immediate superclasses, otherwise return all.
         """
-        pass
+        return self._filter_entities(
+            self.property_index.superproperties(prop, direct), exclude_blank, sort)
 
     def property_subclasses(self, prop, direct=True, exclude_blank=True, sort=False):
         """
         Return a list of subclasses of a property. If direct is True then
         return only immediate subclasses, otherwise return all of them.
         """
-        pass
+        return self._filter_entities(
+            self.property_index.subproperties(prop, direct), exclude_blank, sort)
 
     ##////////////////////////////////////////////////////////////////////
     ## Methods for manipulating OWL instances
@@ -516,7 +914,7 @@ class Ontology(object):
         """
         Returns all of the instances in the ontology
         """
-        pass
+        return sort_uri_list_by_name(self.entities.instances)
 
     def instance_representation(self, instance):
         """
@@ -524,11 +922,11 @@ class Ontology(object):
         """
         pass
 
-    def instance_find(self, name, exact=False):
+    def instance_find(self, name, exact=False, prefix=False, ignore_case=False):
         """
         Find an instance by a name.
         """
-        pass
+        return self._find(name, self.entities.instances, exact, prefix, ignore_case)
 
     def add_instance(self, cls, instance, ns=None):
         """
@@ -541,13 +939,21 @@ class Ontology(object):
         """
         Returns the class of the instance
         """
-        pass
+        classes = self.entities.classes_of.get(instance, ())
+        if most_specialized:
+            classes = self.hierarchy.most_specialized(classes)
+        return sort_uri_list_by_name(classes)
 
     def instance_siblings(self, instance):
         """
         Returns the siblings of an instance.
         """
-        pass
+        instances_of = self.entities.instances_of
+        output = set()
+        for cls in self.entities.classes_of.get(instance, ()):
+            output.update(instances_of.get(cls, ()))
+        output.discard(instance)
+        return sort_uri_list_by_name(output)
 
     ##////////////////////////////////////////////////////////////////////
     ## Helper methods and utilities
@@ -559,23 +965,42 @@ class Ontology(object):
         namespace symbols. Cuts the uri of the namespace and replaces it
         with its shortcut.
         """
-        nice = str(uri)
-        for nstup in self.namespaces():
-                if nice.find(str(nstup[1])) == 0:
-                    if nstup[0]:
-                        prefix = nstup[0]
-                    else:
-                        prefix = infer_namespace_prefix(nstup[1])
-                        if not prefix:
-                            prefix = "base"
-
-        return prefix + ":" + nice[len(str(nstup[1])):]
+        return self.namespace_map().uri2nice(uri)
 
     def nice2uri(self, s):
         """
         Returns a URI instance from a string representation.
         """
-        pass
+        return self.namespace_map().nice2uri(s)
+
+    def _filter_entities(self, entities, exclude_blank=True, sort=False):
+        """
+        Helper that converts a set of entities from an index to a list,
+        removing the blank nodes and sorting by name if required.
+        """
+        if exclude_blank:
+            entities = [entity for entity in entities if not is_blank(entity)]
+        if sort:
+            return sort_uri_list_by_name(entities)
+        return list(entities)
+
+    def _find(self, name, candidates, exact=False, prefix=False, ignore_case=False):
+        """
+        Helper that looks up a name (a local name, label or full uri) in
+        the NameIndex and returns the sorted matches among the candidates.
+        Exact matches are case sensitive unless ignore_case is True, prefix
+        and substring matches are always case insensitive.
+        """
+        if exact:
+            mode = "iexact" if ignore_case else "exact"
+        else:
+            mode = "prefix" if prefix else "substring"
+
+        matches = self.index(NameIndex).find(name, mode)
+        if exact:
+            matches.add(URIRef(name))
+        return sort_uri_list_by_name(
+            entity for entity in matches if entity in candidates)
 
     def to_html(self, element=0, treedict=None):
         """
@@ -590,6 +1015,22 @@ class Ontology(object):
         """
         pass
 
+##########################################################################
+## Source parsing
+##########################################################################
+
+def parse_source(uri):
+    """
+    Parses a single source into its own graph. Returns the uri, the packed
+    triples and the namespaces of the graph and the seconds it took to
+    parse, which are cheap to send back from a worker process.
+    """
+    start = time.time()
+    graph = rdflib.Graph()
+    graph.parse(uri, format=guess_rdf_format(uri))
+    terms, data = pack_triples(graph)
+    return uri, terms, data, list(graph.namespaces()), time.time() - start
+
 if __name__ == '__main__':
     ontology = Ontology("/Users/benjamin/Repos/umd/lene/fixtures/mclumd.owl")
     entity   = URIRef("http://cs.umd.edu/active/#Action")
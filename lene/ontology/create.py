@@ -22,6 +22,7 @@ import logging
 from lene.utils import *
 from lene.exceptions import *
 from datetime import datetime
+from lene.ontology.graph import VersionedGraph
 from rdflib import Graph, Literal, Namespace, URIRef
 from rdflib.namespace import DC, FOAF, OWL, RDF, RDFS
 
@@ -162,12 +163,16 @@ class OWLGraph(object):
     # TODO: Replace with a regular expression
     DEFINES = (DEFINE_FRAME, DEFINE_RELATION, DEFINE_ATTRIBUTE_VALUE)
 
-    def __init__(self, tree, lazy=False, **opts):
+    def __init__(self, tree, lazy=False, store="default", **opts):
         """
         If lazy, do not run the make_graph method on the tree, but keep
         the graph object as None, this will ensure lazy loading is possible
+
+        The store is the rdflib store (or store plugin name) that the graph
+        is created on, e.g. a SQLiteStore for KBs that do not fit in memory.
         """
         self.graph = None
+        self.store = store
         self.tree  = tree
         self.opts  = opts
         if not lazy: self.make_graph()
@@ -179,7 +184,7 @@ class OWLGraph(object):
         """
         if self.graph is not None:
             raise GraphBindingError("Graph has already been created on %r" % self)
-        self.graph = Graph()
+        self.graph = VersionedGraph(self.store)
 
         self.add_header()
         self.add_defaults()
@@ -192,6 +197,8 @@ class OWLGraph(object):
                     thing = self.add_thing(stmt)
             else:
                 logging.warn("Unknown expression '%s'" % stmt[0])
+
+        self.graph.commit()
         return self.graph
 
     def add_header(self, **opts):
@@ -0,0 +1,56 @@
+# lene.ontology.graph
+# An rdflib Graph that keeps track of its own modifications
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 14:05:18 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: graph.py [] bengfort@cs.umd.edu $
+
+"""
+An rdflib Graph that keeps track of its own modifications.
+
+Indexes and caches that are derived from a graph (e.g. the class hierarchy
+of an Ontology) compare the version they were built against with the
+current version of the graph to find out if they are stale.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import rdflib
+
+##########################################################################
+## Versioned Graph
+##########################################################################
+
+class VersionedGraph(rdflib.Graph):
+    """
+    A Graph with a version counter that is incremented on every add or
+    remove and a namespace version that is incremented on every bind.
+    Parsing goes through add and bind so it is tracked as well.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(VersionedGraph, self).__init__(*args, **kwargs)
+        self.version    = 0
+        self.ns_version = 0
+
+    def add(self, triple):
+        super(VersionedGraph, self).add(triple)
+        self.version += 1
+
+    def addN(self, quads):
+        super(VersionedGraph, self).addN(quads)
+        self.version += 1
+
+    def remove(self, triple):
+        super(VersionedGraph, self).remove(triple)
+        self.version += 1
+
+    def bind(self, prefix, namespace, override=True):
+        super(VersionedGraph, self).bind(prefix, namespace, override=override)
+        self.ns_version += 1
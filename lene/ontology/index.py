@@ -0,0 +1,929 @@
+# lene.ontology.index
+# Precomputed indexes over the entities of an ontology graph
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 14:12:40 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: index.py [] bengfort@cs.umd.edu $
+
+"""
+Precomputed indexes over the entities of an ontology graph.
+
+Every index is built from a graph in a single pass over the triples that
+it needs and then answers queries from dictionaries, rather than scanning
+the graph again on every call. The Ontology rebuilds its indexes whenever
+the version of its graph changes.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+from bisect import bisect_left
+from lene.utils.rdfutils import is_blank, sort_uri_list_by_name, split_uri
+from lene.ontology.vocabs import OWL
+from rdflib import RDF, RDFS, URIRef
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+EMPTY        = frozenset()
+CLASS_TYPES  = (OWL.Class, RDFS.Class)
+SIMILARITY   = ("wup", "path")
+
+PROPERTY_TYPES = {
+    RDF.Property: "rdf.property",
+    OWL.ObjectProperty: "owl.objectproperty",
+    OWL.DatatypeProperty: "owl.datatypeproperty",
+}
+
+PROPERTY_ROOTS = (OWL.OWLNS["topObjectProperty"], OWL.OWLNS["topDataProperty"])
+DOMAINS        = (RDFS.domain, OWL.OWLNS["domain"])
+RANGES         = (RDFS.range, OWL.OWLNS["range"])
+
+CLASS_KINDS    = {RDFS.Class: "rdfs", OWL.Class: "owl"}
+INDIVIDUAL     = OWL.OWLNS["NamedIndividual"]
+BUILTINS       = tuple(unicode(ns) for ns in (RDF.uri, RDFS.uri, OWL.OWLNS))
+
+FIND_MODES     = ("exact", "iexact", "prefix", "substring")
+GRAM           = 3
+
+# Version of the pickled layout of the indexes, stored in snapshots (see
+# lene.ontology.snapshot) so that indexes pickled by an older version of
+# this module are never restored. Bump it whenever an index changes.
+INDEX_VERSION  = 1
+
+##########################################################################
+## Helper functions
+##########################################################################
+
+def closure(node, edges, cache):
+    """
+    Returns the transitive closure of a node along edges (a dict of sets,
+    e.g. the parents or the children of every node), reusing and updating
+    the cache of closures that have already been computed.
+    """
+    if node in cache:
+        return cache[node]
+
+    seen  = set()
+    stack = list(edges.get(node, EMPTY))
+    while stack:
+        other = stack.pop()
+        if other in seen: continue
+        seen.add(other)
+        if other in cache:
+            seen.update(cache[other])
+        else:
+            stack.extend(edges.get(other, EMPTY))
+
+    seen.discard(node)
+    output = cache[node] = frozenset(seen)
+    return output
+
+def is_builtin(uri):
+    """
+    Returns True if the uri is in the RDF, RDFS or OWL namespace.
+    """
+    return unicode(uri).startswith(BUILTINS)
+
+def build_tree(roots, children):
+    """
+    Builds a taxonomical tree dict that maps 0 to the sorted roots and
+    every node with named children to its sorted children.
+    """
+    tree  = {0: sort_uri_list_by_name(roots)}
+    stack = list(tree[0])
+    while stack:
+        node = stack.pop()
+        if node in tree: continue
+        named = [child for child in children.get(node, EMPTY) if not is_blank(child)]
+        if named:
+            tree[node] = sort_uri_list_by_name(named)
+            stack.extend(tree[node])
+    return tree
+
+##########################################################################
+## Entity Index
+##########################################################################
+
+class EntityIndex(object):
+    """
+    Sorts every typed entity of an ontology into classes (by rdfs or owl
+    declaration), properties (by kind, see PROPERTY_TYPES) and instances
+    with a single scan over the rdf:type triples. An instance is a named
+    individual or a named subject with a type outside of RDF, RDFS and OWL.
+    The same scan builds the type index in both directions: the instances
+    of every class and the classes of every instance.
+    """
+
+    def __init__(self, graph):
+        self.types        = {}
+        self.classes      = dict((kind, set()) for kind in CLASS_KINDS.itervalues())
+        self.properties   = dict((kind, set()) for kind in PROPERTY_TYPES.itervalues())
+        self.instances    = set()
+        self.instances_of = {}
+        self.classes_of   = {}
+
+        for subj, obj in graph.subject_objects(RDF.type):
+            self.types.setdefault(subj, set()).add(obj)
+
+            if obj in CLASS_KINDS:
+                self.classes[CLASS_KINDS[obj]].add(subj)
+            elif obj in PROPERTY_TYPES:
+                self.properties[PROPERTY_TYPES[obj]].add(subj)
+            elif is_blank(subj):
+                continue
+            elif obj == INDIVIDUAL:
+                self.instances.add(subj)
+            elif not is_builtin(obj):
+                self.instances.add(subj)
+                self.instances_of.setdefault(obj, set()).add(subj)
+                self.classes_of.setdefault(subj, set()).add(obj)
+
+    def all_classes(self):
+        """
+        Returns the set of all declared classes.
+        """
+        return set().union(*self.classes.values())
+
+    def all_properties(self):
+        """
+        Returns the set of all declared properties.
+        """
+        return set().union(*self.properties.values())
+
+##########################################################################
+## Class Hierarchy
+##########################################################################
+
+class ClassHierarchy(object):
+    """
+    The rdfs:subClassOf hierarchy of an ontology as parent and child
+    adjacency sets. Multiple inheritance (and even cycles) are allowed, the
+    transitive ancestors and descendants are computed on demand and cached.
+
+    owl:Thing is treated as the implicit root of the hierarchy: the classes
+    whose only (named) parent is owl:Thing are the roots and have depth 0.
+    The depth of any other class is the length of the longest subClassOf
+    path to a root, so that a class is always deeper than its parents.
+
+    For subsumption checks every class is assigned a bit and the set of
+    its ancestors (and itself) is stored as an integer bitset, so that
+    checking if one class is a subclass of another is a single mask test
+    and filtering k classes takes k bitwise operations.
+    """
+
+    ROOT = OWL.Thing
+
+    def __init__(self, graph):
+        self.classes  = set()
+        self.parents  = {}
+        self.children = {}
+
+        self._ancestors   = {}
+        self._descendants = {}
+        self._bits        = None
+        self._masks       = None
+        self._tour        = None
+        self._distances   = {}
+
+        for kind in CLASS_TYPES:
+            self.classes.update(graph.subjects(RDF.type, kind))
+
+        for child, parent in graph.subject_objects(RDFS.subClassOf):
+            if child == parent: continue
+            self.parents.setdefault(child, set()).add(parent)
+            self.children.setdefault(parent, set()).add(child)
+            self.classes.add(child)
+            self.classes.add(parent)
+
+        self.depths = self._compute_depths()
+
+    def _named_parents(self, cls, ignore=(ROOT,)):
+        """
+        Returns the parents of a class that are not blank or ignored.
+        """
+        return [
+            parent for parent in self.parents.get(cls, EMPTY)
+            if parent not in ignore and not is_blank(parent)
+        ]
+
+    def _compute_depths(self):
+        """
+        Computes the depth of every named class by visiting the hierarchy
+        in topological order from the roots. Classes in a subClassOf cycle
+        are assigned a depth one deeper than their deepest visited parent.
+        """
+        depths  = {}
+        pending = {}
+        queue   = []
+
+        for cls in self.classes:
+            if cls == self.ROOT or is_blank(cls): continue
+            pending[cls] = len(self._named_parents(cls))
+            if not pending[cls]:
+                depths[cls] = 0
+                queue.append(cls)
+
+        while True:
+            while queue:
+                cls = queue.pop()
+                for child in self.children.get(cls, EMPTY):
+                    if child not in pending or child in depths: continue
+                    pending[child] -= 1
+                    if not pending[child]:
+                        depths[child] = 1 + max(
+                            depths.get(parent, -1) for parent in self._named_parents(child)
+                        )
+                        queue.append(child)
+
+            # Break any cycle at the class with the deepest visited parent
+            cycle = [cls for cls in pending if cls not in depths]
+            if not cycle: break
+
+            cls = max(cycle, key=lambda cls: max(
+                [depths.get(parent, -1) for parent in self._named_parents(cls)]
+            ))
+            depths[cls] = 1 + max(
+                depths.get(parent, -1) for parent in self._named_parents(cls)
+            )
+            queue.append(cls)
+
+        return depths
+
+    def ancestors(self, cls):
+        """
+        Returns the set of all (transitive) superclasses of a class.
+        """
+        return closure(cls, self.parents, self._ancestors)
+
+    def descendants(self, cls):
+        """
+        Returns the set of all (transitive) subclasses of a class.
+        """
+        return closure(cls, self.children, self._descendants)
+
+    def superclasses(self, cls, direct=True):
+        """
+        Returns the direct or all superclasses of a class.
+        """
+        if direct:
+            return self.parents.get(cls, EMPTY)
+        return self.ancestors(cls)
+
+    def subclasses(self, cls, direct=True):
+        """
+        Returns the direct or all subclasses of a class.
+        """
+        if direct:
+            return self.children.get(cls, EMPTY)
+        return self.descendants(cls)
+
+    def siblings(self, cls):
+        """
+        Returns the classes that share at least one parent with a class.
+        """
+        output = set()
+        for parent in self.parents.get(cls, EMPTY):
+            output.update(self.children.get(parent, EMPTY))
+        output.discard(cls)
+        return output
+
+    def _bitsets(self):
+        """
+        Assigns a bit to every class and computes the ancestor-or-self
+        bitset of every class, once, on first use.
+        """
+        if self._bits is None:
+            bits  = dict((cls, 1 << idx) for idx, cls in enumerate(self.classes))
+            masks = {}
+            for cls, bit in bits.iteritems():
+                mask = bit
+                for ancestor in self.ancestors(cls):
+                    mask |= bits[ancestor]
+                masks[cls] = mask
+            self._bits, self._masks = bits, masks
+        return self._bits, self._masks
+
+    def is_subclass(self, cls, other):
+        """
+        Returns True if cls is other or one of its (transitive) subclasses.
+        """
+        if cls == other: return True
+        bits, masks = self._bitsets()
+        bit = bits.get(other)
+        return bit is not None and bool(masks.get(cls, 0) & bit)
+
+    def _strict_masks(self, classes):
+        """
+        Helper that returns the unique classes with their bit and their
+        strict ancestor bitset (unknown classes have neither).
+        """
+        bits, masks = self._bitsets()
+        seen   = set()
+        output = []
+        for cls in classes:
+            if cls in seen: continue
+            seen.add(cls)
+            bit = bits.get(cls, 0)
+            output.append((cls, bit, masks.get(cls, 0) & ~bit))
+        return output
+
+    def most_specialized(self, classes):
+        """
+        Filters a list of classes to those that are not a superclass of
+        any other class in the list (the leaves), preserving their order.
+        """
+        entries = self._strict_masks(classes)
+        above   = 0
+        for cls, bit, strict in entries:
+            above |= strict
+        return [cls for cls, bit, strict in entries if not bit & above]
+
+    def most_generic(self, classes):
+        """
+        Filters a list of classes to those that are not a subclass of any
+        other class in the list (the roots), preserving their order.
+        """
+        entries = self._strict_masks(classes)
+        members = 0
+        for cls, bit, strict in entries:
+            members |= bit
+        return [cls for cls, bit, strict in entries if not strict & members]
+
+    def lca(self, cls, other, exact=False):
+        """
+        Returns the lowest common ancestor of two classes, or None if either
+        is not a named class of the hierarchy (owl:Thing is the common
+        ancestor of otherwise unrelated classes).
+
+        By default the query is answered in O(1) on the spanning tree of
+        the hierarchy (see EulerTour), where a class with multiple parents
+        only hangs below its deepest parent. With multiple inheritance that
+        tree ancestor is always a common ancestor but not necessarily the
+        deepest one; use exact=True to intersect the ancestor sets instead
+        and return the deepest common ancestor of the full DAG.
+        """
+        if exact:
+            return self._exact_lca(cls, other)
+        if self._tour is None:
+            self._tour = EulerTour(self)
+        return self._tour.lca(cls, other)
+
+    def lca_many(self, pairs, exact=False):
+        """
+        Returns the lowest common ancestors of a sequence of class pairs.
+        Tree queries are vectorized with NumPy if it is installed.
+        """
+        if exact:
+            return [self._exact_lca(cls, other) for cls, other in pairs]
+        if self._tour is None:
+            self._tour = EulerTour(self)
+        return self._tour.lca_many(pairs)
+
+    def _exact_lca(self, cls, other):
+        """
+        Returns the deepest common ancestor (or self) of two classes in the
+        DAG, ties are broken by the uri so that the result is stable.
+        """
+        if cls == self.ROOT or other == self.ROOT:
+            return self.ROOT if (cls in self.depths or other in self.depths) else None
+        if cls not in self.depths or other not in self.depths:
+            return None
+
+        common = (self.ancestors(cls) | set([cls])) & (self.ancestors(other) | set([other]))
+        common = [node for node in common if node in self.depths]
+        if not common:
+            return self.ROOT
+        return max(common, key=lambda node: (self.depths[node], node))
+
+    def distances(self, cls):
+        """
+        Returns a dict of the length of the shortest subClassOf path from a
+        class to each of its named ancestors (and itself), including the
+        virtual owl:Thing root one step above the roots. Cached per class.
+        """
+        if cls in self._distances:
+            return self._distances[cls]
+
+        output   = {cls: 0}
+        frontier = [cls]
+        while frontier:
+            following = []
+            for node in frontier:
+                for parent in self.parents.get(node, EMPTY):
+                    if parent in output or is_blank(parent): continue
+                    output[parent] = output[node] + 1
+                    following.append(parent)
+            frontier = following
+
+        if cls in self.depths:
+            roots = [dist + 1 for node, dist in output.iteritems() if self.depths.get(node) == 0]
+            if roots:
+                output[self.ROOT] = min(roots + [output.get(self.ROOT, roots[0])])
+
+        self._distances[cls] = output
+        return output
+
+    def similarity(self, classes, metric="wup"):
+        """
+        Returns an N x N NumPy matrix of the pairwise similarity of the
+        given classes, computed from the cached ancestor distances:
+
+            - wup: Wu-Palmer, 2 * depth(lcs) / (depth(a) + depth(b)) where
+              the depth is counted from owl:Thing and the lcs is the deepest
+              common ancestor (in the DAG)
+            - path: 1 / (1 + length of the shortest path between a and b
+              through a common ancestor)
+
+        Unrelated classes have a similarity of 0, identical classes of 1.
+        """
+        if np is None:
+            raise ImportError("NumPy is required to compute similarity matrices")
+        if metric not in SIMILARITY:
+            raise ValueError("Unknown similarity metric '%s', use one of %s" %
+                             (metric, ", ".join(SIMILARITY)))
+
+        classes = list(classes)
+        rows    = [self.distances(cls) for cls in classes]
+        columns = {}
+        for row in rows:
+            for node in row:
+                columns.setdefault(node, len(columns))
+
+        size = len(classes)
+        dist = np.empty((size, len(columns)))
+        dist.fill(np.inf)
+        for idx, row in enumerate(rows):
+            for node, length in row.iteritems():
+                dist[idx, columns[node]] = length
+
+        # Depth of every column counted from owl:Thing (which has depth 0)
+        depth = np.zeros(len(columns))
+        for node, col in columns.iteritems():
+            if node in self.depths:
+                depth[col] = self.depths[node] + 1
+
+        # Each row only has to be compared on the columns of its own
+        # ancestors, which keeps the cost at N * N * (number of ancestors)
+        member = np.isfinite(dist)
+        output = np.zeros((size, size))
+        for idx, row in enumerate(rows):
+            cols = np.array([columns[node] for node in row], dtype=np.intp)
+            if metric == "wup":
+                output[idx] = np.where(member[:, cols], depth[cols], 0).max(axis=1)
+            else:
+                output[idx] = (dist[:, cols] + dist[idx, cols]).min(axis=1)
+
+        ids = np.array([columns[cls] for cls in classes], dtype=np.intp)
+        if metric == "wup":
+            own   = depth[ids]
+            total = own[:, None] + own[None, :]
+            output = np.where(total > 0, 2 * output / np.where(total > 0, total, 1), 0)
+        else:
+            output = np.where(np.isfinite(output), 1.0 / (1.0 + output), 0)
+
+        output[ids[:, None] == ids[None, :]] = 1.0
+        return output
+
+    def roots(self, ignore=(ROOT,)):
+        """
+        Returns the named classes without any named parents other than the
+        ignored ones (by default owl:Thing is ignored).
+        """
+        return set(
+            cls for cls in self.classes
+            if cls not in ignore and not is_blank(cls)
+            and not self._named_parents(cls, ignore)
+        )
+
+    def depth(self, cls):
+        """
+        Returns the depth of a class (0 for the roots) or None if the class
+        is not a named class in the hierarchy.
+        """
+        return self.depths.get(cls)
+
+    def max_depth(self):
+        """
+        Returns the depth of the deepest class in the hierarchy.
+        """
+        if not self.depths: return 0
+        return max(self.depths.itervalues())
+
+    def __contains__(self, cls):
+        return cls in self.classes
+
+    def __len__(self):
+        return len(self.classes)
+
+##########################################################################
+## Lowest Common Ancestors
+##########################################################################
+
+class EulerTour(object):
+    """
+    Answers lowest common ancestor queries on the spanning tree of a class
+    hierarchy in constant time. Every named class is attached to its
+    deepest parent (the roots to owl:Thing, the virtual root of the tree),
+    the tree is walked depth first to record the Euler tour, and a sparse
+    table over the tour holds the position of the shallowest node of every
+    range whose length is a power of two. The LCA of two classes is the
+    shallowest node between their first occurrences in the tour, which is
+    the minimum of two overlapping ranges of the table.
+    """
+
+    def __init__(self, hierarchy):
+        self.root = hierarchy.ROOT
+        depths    = hierarchy.depths
+
+        # Attach each class to its deepest parent that is strictly above it
+        # (which is always a tree, even if the hierarchy has cycles).
+        children = {}
+        for cls, depth in depths.iteritems():
+            parents = [
+                parent for parent in hierarchy._named_parents(cls)
+                if depths.get(parent, depth) < depth
+            ]
+            parent = max(parents, key=lambda p: (depths[p], p)) if parents else self.root
+            children.setdefault(parent, []).append(cls)
+
+        for nodes in children.itervalues():
+            nodes.sort()
+
+        # Walk the tree to record the tour, levels and first occurrences
+        self.euler  = [self.root]
+        self.levels = [0]
+        self.first  = {self.root: 0}
+
+        stack = [(self.root, 0, iter(children.get(self.root, ())))]
+        while stack:
+            node, level, remaining = stack[-1]
+            child = next(remaining, None)
+            if child is None:
+                stack.pop()
+                if stack:
+                    self.euler.append(stack[-1][0])
+                    self.levels.append(stack[-1][1])
+            else:
+                self.first[child] = len(self.euler)
+                self.euler.append(child)
+                self.levels.append(level + 1)
+                stack.append((child, level + 1, iter(children.get(child, ()))))
+
+        # Sparse table: table[k][i] is the position of the minimum level
+        # in euler[i:i + 2**k]
+        size   = len(self.euler)
+        levels = self.levels
+        self.table = [range(size)]
+        span = 1
+        while 2 * span <= size:
+            prev = self.table[-1]
+            self.table.append([
+                prev[i] if levels[prev[i]] <= levels[prev[i + span]] else prev[i + span]
+                for i in xrange(size - 2 * span + 1)
+            ])
+            span *= 2
+
+        self._arrays = None
+
+    def _query(self, lo, hi):
+        """
+        Returns the position of the shallowest node in euler[lo:hi+1].
+        """
+        k = (hi - lo + 1).bit_length() - 1
+        x = self.table[k][lo]
+        y = self.table[k][hi - (1 << k) + 1]
+        return x if self.levels[x] <= self.levels[y] else y
+
+    def lca(self, cls, other):
+        """
+        Returns the lowest common ancestor of two classes in the tree.
+        """
+        if cls not in self.first or other not in self.first:
+            return None
+
+        lo, hi = self.first[cls], self.first[other]
+        if lo > hi: lo, hi = hi, lo
+        return self.euler[self._query(lo, hi)]
+
+    def lca_many(self, pairs):
+        """
+        Returns the lowest common ancestors of a sequence of class pairs,
+        None for pairs with a class that is not in the tree.
+        """
+        pairs = list(pairs)
+        if np is None:
+            return [self.lca(cls, other) for cls, other in pairs]
+
+        if self._arrays is None:
+            size  = len(self.euler)
+            table = np.zeros((len(self.table), size), dtype=np.intp)
+            for k, row in enumerate(self.table):
+                table[k, :len(row)] = row
+            self._arrays = (table, np.asarray(self.levels))
+
+        table, levels = self._arrays
+        known  = [
+            idx for idx, (cls, other) in enumerate(pairs)
+            if cls in self.first and other in self.first
+        ]
+
+        output = [None] * len(pairs)
+        if not known:
+            return output
+
+        first = np.array([
+            (self.first[pairs[idx][0]], self.first[pairs[idx][1]]) for idx in known
+        ], dtype=np.intp)
+        lo = first.min(axis=1)
+        hi = first.max(axis=1)
+        k  = np.floor(np.log2(hi - lo + 1)).astype(np.intp)
+        x  = table[k, lo]
+        y  = table[k, hi - (1 << k) + 1]
+        positions = np.where(levels[x] <= levels[y], x, y)
+
+        for idx, pos in zip(known, positions):
+            output[idx] = self.euler[pos]
+        return output
+
+##########################################################################
+## Property Index
+##########################################################################
+
+class PropertyIndex(object):
+    """
+    The RDF, object and datatype properties of an ontology along with their
+    rdfs:subPropertyOf hierarchy, domains and ranges, built from lookups of
+    the predicates involved rather than a scan of the graph. Properties that are made a subClassOf another
+    property (as OWLGraph does) are treated as sub-properties, and the
+    owl:topObjectProperty and owl:topDataProperty are implicit roots.
+    Domains and ranges are indexed both by property and by class.
+    """
+
+    def __init__(self, graph):
+        self.kinds    = dict((kind, set()) for kind in PROPERTY_TYPES.itervalues())
+        self.implicit = set()
+        self.parents  = {}
+        self.children = {}
+        self.domains  = {}
+        self.ranges   = {}
+        self.domain_of = {}
+        self.range_of  = {}
+
+        self._ancestors   = {}
+        self._descendants = {}
+        self._properties  = {}
+
+        for kind, name in PROPERTY_TYPES.iteritems():
+            self.kinds[name].update(graph.subjects(RDF.type, kind))
+
+        for pred in DOMAINS:
+            for subj, obj in graph.subject_objects(pred):
+                self.domains.setdefault(subj, set()).add(obj)
+                self.domain_of.setdefault(obj, set()).add(subj)
+
+        for pred in RANGES:
+            for subj, obj in graph.subject_objects(pred):
+                self.ranges.setdefault(subj, set()).add(obj)
+                self.range_of.setdefault(obj, set()).add(subj)
+
+        declared = self.properties()
+        edges    = list(graph.subject_objects(RDFS.subPropertyOf))
+        edges.extend(
+            (subj, obj) for subj, obj in graph.subject_objects(RDFS.subClassOf)
+            if subj in declared
+        )
+
+        for child, parent in edges:
+            if child == parent: continue
+            self.parents.setdefault(child, set()).add(parent)
+            self.children.setdefault(parent, set()).add(child)
+            for prop in (child, parent):
+                if prop not in declared and prop not in PROPERTY_ROOTS:
+                    self.implicit.add(prop)
+
+    def properties(self, predicate="", include_implicit=False):
+        """
+        Returns the set of properties of a kind (one of the keys of the
+        PROPERTY_TYPES values, or "" for all) optionally including the
+        properties that are only implied by the sub-property hierarchy.
+        The sets are cached and must not be modified.
+        """
+        if predicate and predicate not in self.kinds:
+            raise ValueError("Unknown property predicate '%s'" % predicate)
+
+        key = (predicate, include_implicit)
+        if key not in self._properties:
+            if predicate:
+                output = set(self.kinds[predicate])
+            else:
+                output = set().union(*self.kinds.values())
+
+            if include_implicit:
+                output |= self.implicit
+            self._properties[key] = frozenset(output)
+        return self._properties[key]
+
+    def ancestors(self, prop):
+        """
+        Returns the set of all (transitive) super properties of a property.
+        """
+        return closure(prop, self.parents, self._ancestors)
+
+    def descendants(self, prop):
+        """
+        Returns the set of all (transitive) sub properties of a property.
+        """
+        return closure(prop, self.children, self._descendants)
+
+    def superproperties(self, prop, direct=True):
+        """
+        Returns the direct or all super properties of a property.
+        """
+        if direct:
+            return self.parents.get(prop, EMPTY)
+        return self.ancestors(prop)
+
+    def subproperties(self, prop, direct=True):
+        """
+        Returns the direct or all sub properties of a property.
+        """
+        if direct:
+            return self.children.get(prop, EMPTY)
+        return self.descendants(prop)
+
+    def domain(self, prop):
+        """
+        Returns the set of classes declared as the domain of a property.
+        """
+        return self.domains.get(prop, EMPTY)
+
+    def range(self, prop):
+        """
+        Returns the set of classes declared as the range of a property.
+        """
+        return self.ranges.get(prop, EMPTY)
+
+    def domain_for(self, classes):
+        """
+        Returns the set of properties with any of the classes as a domain.
+        """
+        output = set()
+        for cls in classes:
+            output.update(self.domain_of.get(cls, EMPTY))
+        return output
+
+    def range_for(self, classes):
+        """
+        Returns the set of properties with any of the classes as a range.
+        """
+        output = set()
+        for cls in classes:
+            output.update(self.range_of.get(cls, EMPTY))
+        return output
+
+    def roots(self, predicate="", include_implicit=False):
+        """
+        Returns the properties of a kind without a parent of the same kind
+        (the implicit top properties are not counted as parents).
+        """
+        props = self.properties(predicate, include_implicit)
+        return set(
+            prop for prop in props if not is_blank(prop) and not any(
+                parent in props for parent in self.parents.get(prop, EMPTY)
+            )
+        )
+
+    def tree(self, predicate="", include_implicit=False):
+        """
+        Returns the taxonomical tree dict of the properties of a kind.
+        """
+        props    = self.properties(predicate, include_implicit)
+        children = dict(
+            (prop, set(child for child in kids if child in props))
+            for prop, kids in self.children.iteritems()
+        )
+        return build_tree(self.roots(predicate, include_implicit), children)
+
+##########################################################################
+## Name Index
+##########################################################################
+
+def ngrams(string, n=GRAM):
+    """
+    Returns the set of n-grams (substrings of length n) of a string.
+    """
+    return set(string[idx:idx+n] for idx in xrange(len(string) - n + 1))
+
+class NameIndex(object):
+    """
+    Indexes the local names and rdfs:labels of every named subject in the
+    graph for interactive lookups. Names are kept case sensitive for exact
+    matches and case folded in a sorted list for prefix matches (with a
+    binary search) and in n-gram postings (up to trigrams) for substring
+    matches, so that a lookup only ever touches the names that can match.
+    """
+
+    def __init__(self, graph):
+        self.exact  = {}    # Maps a name to the set of its entities
+        self.folded = {}    # Maps a lower case name to its entities
+        self.grams  = {}    # Maps an n-gram to the lower case names
+
+        for subj in set(graph.subjects()):
+            if isinstance(subj, URIRef):
+                self.add(subj, split_uri(subj).name)
+
+        for subj, label in graph.subject_objects(RDFS.label):
+            if isinstance(subj, URIRef):
+                self.add(subj, unicode(label))
+
+        self.keys = sorted(self.folded)
+
+    def add(self, entity, name):
+        """
+        Adds a name for an entity to the postings (the sorted keys have to
+        be rebuilt afterward, which is why the index is built in one go).
+        """
+        if not name: return
+        self.exact.setdefault(name, set()).add(entity)
+
+        key = name.lower()
+        if key not in self.folded:
+            self.folded[key] = set()
+            for size in xrange(1, GRAM + 1):
+                for gram in ngrams(key, size):
+                    self.grams.setdefault(gram, set()).add(key)
+        self.folded[key].add(entity)
+
+    def _prefix_keys(self, query):
+        """
+        Yields the folded names that start with the query.
+        """
+        idx = bisect_left(self.keys, query)
+        while idx < len(self.keys) and self.keys[idx].startswith(query):
+            yield self.keys[idx]
+            idx += 1
+
+    def _substring_keys(self, query):
+        """
+        Returns the folded names that contain the query by intersecting
+        the postings of its trigrams (smallest first). Queries shorter than
+        a trigram are looked up in the unigram or bigram postings directly.
+        """
+        if len(query) < GRAM:
+            return self.grams.get(query, ()) if query else self.keys
+
+        postings = []
+        for gram in ngrams(query):
+            if gram not in self.grams:
+                return []
+            postings.append(self.grams[gram])
+
+        postings.sort(key=len)
+        keys = set(postings[0])
+        for posting in postings[1:]:
+            keys &= posting
+            if not keys: break
+        return [key for key in keys if query in key]
+
+    def find(self, query, mode="substring"):
+        """
+        Returns the set of entities with a name that matches the query in
+        one of the FIND_MODES: exact (case sensitive), iexact, prefix or
+        substring (the latter three are case insensitive).
+        """
+        if mode not in FIND_MODES:
+            raise ValueError("Unknown find mode '%s', use one of %s" %
+                             (mode, ", ".join(FIND_MODES)))
+
+        query = unicode(query)
+        if mode == "exact":
+            return set(self.exact.get(query, ()))
+
+        query = query.lower()
+        if mode == "iexact":
+            return set(self.folded.get(query, ()))
+
+        if mode == "prefix":
+            keys = self._prefix_keys(query)
+        else:
+            keys = self._substring_keys(query)
+
+        output = set()
+        for key in keys:
+            output |= self.folded[key]
+        return output
+
+    def __len__(self):
+        return len(self.keys)
@@ -0,0 +1,178 @@
+# lene.ontology.snapshot
+# Binary snapshots of parsed ontology graphs and their indexes
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 16:02:27 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: snapshot.py [] bengfort@cs.umd.edu $
+
+"""
+Binary snapshots of parsed ontology graphs and their indexes.
+
+Parsing RDF/XML is by far the slowest part of loading an Ontology. A
+snapshot stores the parsed triples with every term written only once (the
+triples themselves are an array of term ids), the namespace bindings and
+the indexes that were built from the graph. Snapshots are named by the
+SHA1 hash of the source document, the base uri that its relative uris are
+resolved against and the snapshot and index versions, so a changed source,
+a copy of the source at another location or an upgrade of lene never hits
+a stale snapshot. A snapshot file is laid out as follows:
+
+    magic    7 bytes    "LENESNP"
+    version  1 byte     the snapshot format version
+    payload  pickle     base, index version, terms, namespaces, indexes
+                        and the triple ids
+
+The base and index version in the payload are checked again on reading and
+a snapshot that does not match is treated as a cache miss.
+
+Snapshots are pickles, and unpickling can run arbitrary code, so only read
+snapshots from a trusted cache directory that no one else can write to.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import urllib2
+import hashlib
+import cPickle as pickle
+
+from array import array
+from urlparse import urljoin
+from urllib import pathname2url
+from rdflib import URIRef
+from lene.exceptions import *
+from lene.utils import atomic_write
+from lene.ontology.index import INDEX_VERSION
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+MAGIC     = "LENESNP"
+VERSION   = "2"
+EXTENSION = ".snapshot"
+PROTOCOL  = 2
+TYPECODE  = "i"
+
+##########################################################################
+## Helper functions
+##########################################################################
+
+def read_source(uri):
+    """
+    Reads the raw document of a local path or a URL.
+    """
+    if os.path.exists(uri):
+        with open(uri, 'rb') as fobj:
+            return fobj.read()
+
+    response = urllib2.urlopen(uri)
+    try:
+        return response.read()
+    finally:
+        response.close()
+
+def source_base(uri):
+    """
+    Returns the absolute uri that rdflib resolves the relative uris of a
+    source without an xml:base against when it parses the uri, e.g. the
+    file uri of a local path.
+    """
+    if os.path.exists(uri):
+        uri = pathname2url(uri)
+    base = urljoin("file:", "%s/" % pathname2url(os.getcwd()))
+    return unicode(URIRef(uri, base=base).defrag())
+
+def snapshot_path(cache, data, base):
+    """
+    Returns the path of the snapshot of a source document in the cache
+    directory, which is named by the SHA1 hash of the snapshot and index
+    versions, the base uri of the source and the document.
+    """
+    digest = hashlib.sha1()
+    digest.update("%s:%s:%d\0" % (MAGIC, VERSION, INDEX_VERSION))
+    digest.update(base.encode("utf-8") + "\0")
+    digest.update(data)
+    return os.path.join(cache, digest.hexdigest() + EXTENSION)
+
+def pack_triples(triples):
+    """
+    Returns the list of distinct terms in triples and the triples as a
+    string of term ids, which is far quicker to pickle than the triples.
+    """
+    terms = {}
+    ids   = array(TYPECODE)
+    for triple in triples:
+        for term in triple:
+            ids.append(terms.setdefault(term, len(terms)))
+
+    vocab = [None] * len(terms)
+    for term, idx in terms.iteritems():
+        vocab[idx] = term
+    return vocab, ids.tostring()
+
+def unpack_triples(terms, data):
+    """
+    Returns the list of triples packed by pack_triples.
+    """
+    ids = array(TYPECODE)
+    ids.fromstring(data)
+    return [
+        (terms[ids[idx]], terms[ids[idx+1]], terms[ids[idx+2]])
+        for idx in xrange(0, len(ids), 3)
+    ]
+
+##########################################################################
+## Reading and Writing
+##########################################################################
+
+def write_snapshot(path, graph, indexes=(), base=None):
+    """
+    Writes the triples and namespaces of a graph along with the indexes
+    that were built from it and the base uri of its source to path, with
+    atomic_write. The cache directory is created if it does not exist.
+    """
+    vocab, ids = pack_triples(graph)
+    payload = {
+        "base": base,
+        "index_version": INDEX_VERSION,
+        "terms": vocab,
+        "triples": ids,
+        "namespaces": list(graph.namespaces()),
+        "indexes": list(indexes),
+    }
+
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    with atomic_write(path, prefix=".snapshot-") as out:
+        out.write(MAGIC + VERSION)
+        pickle.dump(payload, out, PROTOCOL)
+
+def read_snapshot(path, base=None):
+    """
+    Reads a snapshot and returns the list of triples, the namespace
+    bindings and the list of indexes that it holds. Returns None if the
+    snapshot was written by another snapshot or index version or for a
+    source with another base uri than the given base.
+    """
+    with open(path, 'rb') as fobj:
+        header = fobj.read(len(MAGIC) + len(VERSION))
+        if not header.startswith(MAGIC):
+            raise OntologyException("%r is not a lene snapshot" % path)
+        if header[len(MAGIC):] != VERSION:
+            return None
+        payload = pickle.load(fobj)
+
+    if payload["index_version"] != INDEX_VERSION or payload["base"] != base:
+        return None
+
+    triples = unpack_triples(payload["terms"], payload["triples"])
+    return triples, payload["namespaces"], payload["indexes"]
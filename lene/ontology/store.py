@@ -0,0 +1,407 @@
+# lene.ontology.store
+# A disk-backed SQLite triple store for rdflib graphs
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 17:12:40 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: store.py [] bengfort@cs.umd.edu $
+
+"""
+A disk-backed SQLite triple store for rdflib graphs.
+
+The in-memory store of rdflib keeps every triple in RAM, which limits the
+size of the ontologies and KB conversions that can be handled. This store
+keeps the graph in a single SQLite database instead:
+
+    terms       every distinct term once, keyed by an integer id
+    triples     (s, p, o) term ids, with covering indexes on spo, pos, osp
+    namespaces  the prefix bindings of the graph
+
+Added triples are buffered and written in bulk with executemany, so both
+parsing and addN go through the same batched inserts. Opening an existing
+database does not read any triples, so reopening a store is near-instant.
+
+The connection is not bound to the thread that opened it; every access to
+the database goes through a lock, so a store (e.g. one loaded lazily by an
+Ontology) can be shared between threads.
+
+The store is registered with rdflib as the "SQLite" plugin:
+
+    store = SQLiteStore("ontology.db")
+    graph = Graph(store)
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import sqlite3
+import threading
+
+from rdflib import plugin
+from rdflib.store import Store, VALID_STORE, NO_STORE
+from rdflib.term import URIRef, BNode, Literal
+from lene.utils.rdfutils import LRUCache
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+BATCH      = 10000      # Number of buffered triples written at once
+TERM_CACHE = 100000     # Number of term ids kept in memory
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS terms ("
+    " id INTEGER PRIMARY KEY,"
+    " kind TEXT NOT NULL,"
+    " value TEXT NOT NULL,"
+    " datatype TEXT NOT NULL DEFAULT '',"
+    " lang TEXT NOT NULL DEFAULT '',"
+    " UNIQUE (kind, value, datatype, lang))",
+    "CREATE TABLE IF NOT EXISTS triples ("
+    " s INTEGER NOT NULL,"
+    " p INTEGER NOT NULL,"
+    " o INTEGER NOT NULL,"
+    " PRIMARY KEY (s, p, o)) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s)",
+    "CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p)",
+    "CREATE TABLE IF NOT EXISTS namespaces ("
+    " prefix TEXT PRIMARY KEY,"
+    " uri TEXT NOT NULL)",
+)
+
+PENDING = (
+    "CREATE TEMP TABLE IF NOT EXISTS pending ("
+    " kind TEXT, value TEXT, datatype TEXT, lang TEXT)"
+)
+
+# Selects the decoded terms of every triple matching a where clause
+SELECT = (
+    "SELECT t.s, s.kind, s.value, s.datatype, s.lang,"
+    " t.p, p.kind, p.value, p.datatype, p.lang,"
+    " t.o, o.kind, o.value, o.datatype, o.lang"
+    " FROM triples t"
+    " JOIN terms s ON s.id = t.s"
+    " JOIN terms p ON p.id = t.p"
+    " JOIN terms o ON o.id = t.o"
+)
+
+##########################################################################
+## Term Encoding
+##########################################################################
+
+def encode_term(term):
+    """
+    Returns the (kind, value, datatype, lang) row of an rdflib term.
+    """
+    if isinstance(term, Literal):
+        return (
+            u"L", unicode(term),
+            unicode(term.datatype or u""), unicode(term.language or u""),
+        )
+    if isinstance(term, URIRef):
+        return (u"U", unicode(term), u"", u"")
+    if isinstance(term, BNode):
+        return (u"B", unicode(term), u"", u"")
+    raise TypeError("cannot store %r in a SQLite store" % (term,))
+
+def decode_term(kind, value, datatype, lang):
+    """
+    Returns the rdflib term of a (kind, value, datatype, lang) row.
+    """
+    if kind == u"U":
+        return URIRef(value)
+    if kind == u"B":
+        return BNode(value)
+    return Literal(value, lang=lang or None, datatype=datatype or None)
+
+##########################################################################
+## SQLite Store
+##########################################################################
+
+class SQLiteStore(Store):
+    """
+    An rdflib Store that keeps a single graph in a SQLite database. The
+    configuration is the path to the database file, which is created if
+    it does not exist yet. Changes are only durable once commit is called
+    (Graph.commit) or the store is closed.
+    """
+
+    context_aware      = False
+    formula_aware      = False
+    transaction_aware  = True
+    graph_aware        = False
+
+    def __init__(self, configuration=None, identifier=None):
+        self.conn       = None
+        self.path       = None
+        self._pending   = []
+        self._ids       = LRUCache(maxsize=TERM_CACHE)
+        self._lock      = threading.RLock()
+        super(SQLiteStore, self).__init__(identifier=identifier)
+        if configuration is not None:
+            self.open(configuration, create=True)
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Database management
+    ##////////////////////////////////////////////////////////////////////
+
+    def open(self, configuration, create=False):
+        """
+        Opens the database at the path given by configuration, creating
+        it if create is True. Returns NO_STORE if the database does not
+        exist and is not created.
+        """
+        if not create and not os.path.exists(configuration):
+            return NO_STORE
+
+        with self._lock:
+            self.path = configuration
+            self.conn = sqlite3.connect(configuration, check_same_thread=False)
+            self.conn.text_factory = unicode
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                self.conn.execute(statement)
+            self.conn.execute(PENDING)
+            self.conn.commit()
+            return VALID_STORE
+
+    def close(self, commit_pending_transaction=True):
+        """
+        Commits the pending changes and closes the database connection.
+        Graph.close does not ask for a commit by default, so changes are
+        always committed; call rollback first to discard them.
+        """
+        with self._lock:
+            if self.conn is None: return
+            self.commit()
+            self.conn.close()
+            self.conn = None
+
+    def destroy(self, configuration):
+        """
+        Closes the store and deletes the database at configuration.
+        """
+        with self._lock:
+            if self.conn is not None:
+                self.rollback()
+                self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(configuration + suffix):
+                os.remove(configuration + suffix)
+
+    def commit(self):
+        with self._lock:
+            self._flush()
+            self.conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._pending = []
+            self._ids.clear()
+            self.conn.rollback()
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Term ids
+    ##////////////////////////////////////////////////////////////////////
+
+    def _term_id(self, term):
+        """
+        Returns the id of a term in the database or None if it is unknown.
+        """
+        key = encode_term(term)
+        idx = self._ids.get(key)
+        if idx is None:
+            row = self.conn.execute(
+                "SELECT id FROM terms WHERE kind=? AND value=? AND datatype=? AND lang=?",
+                key
+            ).fetchone()
+            if row is None: return None
+            idx = self._ids[key] = row[0]
+        return idx
+
+    def _term_ids(self, keys):
+        """
+        Returns a map of encoded terms to their ids, inserting the terms
+        that are not in the database yet in bulk.
+        """
+        ids     = {}
+        missing = []
+        for key in keys:
+            idx = self._ids.get(key)
+            if idx is None:
+                missing.append(key)
+            else:
+                ids[key] = idx
+
+        if missing:
+            self.conn.execute("DELETE FROM pending")
+            self.conn.executemany("INSERT INTO pending VALUES (?, ?, ?, ?)", missing)
+            self.conn.execute(
+                "INSERT OR IGNORE INTO terms (kind, value, datatype, lang) "
+                "SELECT kind, value, datatype, lang FROM pending"
+            )
+            rows = self.conn.execute(
+                "SELECT t.id, t.kind, t.value, t.datatype, t.lang "
+                "FROM pending p JOIN terms t ON t.kind = p.kind AND "
+                "t.value = p.value AND t.datatype = p.datatype AND t.lang = p.lang"
+            )
+            for row in rows:
+                key = tuple(row[1:])
+                ids[key] = self._ids[key] = row[0]
+        return ids
+
+    def _flush(self):
+        """
+        Writes the buffered triples to the database in one batch.
+        """
+        if not self._pending: return
+        pending, self._pending = self._pending, []
+
+        encoded = [tuple(encode_term(term) for term in triple) for triple in pending]
+        ids     = self._term_ids(set(key for triple in encoded for key in triple))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)",
+            ((ids[s], ids[p], ids[o]) for s, p, o in encoded)
+        )
+
+    def _where(self, pattern, alias=None):
+        """
+        Returns the where clause and parameters matching a triple pattern
+        or None if the pattern contains a term that is not in the store.
+        The columns are qualified with the alias of the triples table, if
+        one is given (as in SELECT).
+        """
+        clauses = []
+        params  = []
+        for column, term in zip(("s", "p", "o"), pattern):
+            if term is None: continue
+            idx = self._term_id(term)
+            if idx is None: return None
+            if alias:
+                column = "%s.%s" % (alias, column)
+            clauses.append("%s = ?" % column)
+            params.append(idx)
+
+        if not clauses:
+            return "", params
+        return " WHERE " + " AND ".join(clauses), params
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Triple methods
+    ##////////////////////////////////////////////////////////////////////
+
+    def add(self, triple, context, quoted=False):
+        """
+        Buffers a triple to be written with the next batch.
+        """
+        Store.add(self, triple, context, quoted)
+        with self._lock:
+            self._pending.append(triple)
+            if len(self._pending) >= BATCH:
+                self._flush()
+
+    def addN(self, quads):
+        """
+        Adds quads to the store in batches; contexts are ignored.
+        """
+        with self._lock:
+            for s, p, o, _ in quads:
+                self._pending.append((s, p, o))
+                if len(self._pending) >= BATCH:
+                    self._flush()
+            self._flush()
+
+    def remove(self, pattern, context=None):
+        """
+        Removes every triple that matches the pattern.
+        """
+        with self._lock:
+            self._flush()
+            where = self._where(pattern)
+            if where is None: return
+
+            clause, params = where
+            self.conn.execute("DELETE FROM triples" + clause, params)
+        Store.remove(self, pattern, context)
+
+    def triples(self, pattern, context=None):
+        """
+        Yields every triple that matches the pattern along with an empty
+        iterator of contexts, since the store holds a single graph. The
+        lock is only held while fetching a batch, not between yields.
+        """
+        with self._lock:
+            self._flush()
+            where = self._where(pattern, alias="t")
+            if where is None: return
+
+            clause, params = where
+            cursor = self.conn.cursor()
+            cursor.execute(SELECT + clause, params)
+
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(BATCH)
+            if not rows: break
+            for row in rows:
+                triple = (
+                    decode_term(*row[1:5]),
+                    decode_term(*row[6:10]),
+                    decode_term(*row[11:15]),
+                )
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        with self._lock:
+            self._flush()
+            return self.conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    ##////////////////////////////////////////////////////////////////////
+    ## Namespace methods
+    ##////////////////////////////////////////////////////////////////////
+
+    def bind(self, prefix, namespace):
+        with self._lock:
+            self.conn.execute("DELETE FROM namespaces WHERE uri = ?", (unicode(namespace),))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                (unicode(prefix), unicode(namespace))
+            )
+
+    def namespace(self, prefix):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT uri FROM namespaces WHERE prefix = ?", (unicode(prefix),)
+            ).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT prefix FROM namespaces WHERE uri = ?", (unicode(namespace),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
+
+    def __repr__(self):
+        return "<%s at %s>" % (self.__class__.__name__, self.path)
+
+##########################################################################
+## Plugin registration
+##########################################################################
+
+plugin.register("SQLite", Store, "lene.ontology.store", "SQLiteStore")
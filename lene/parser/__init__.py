@@ -19,13 +19,15 @@ Parser for LISP representations
 
 from .lexer import *
 from .tokenize import *
+from .hashcons import *
 from StringIO import StringIO
 
 ##########################################################################
 ## Module functions
 ##########################################################################
 
-def load(fp, encoding=None, lexer=None, tokenizer=None, detokenize=True):
+def load(fp, encoding=None, lexer=None, tokenizer=None, detokenize=True,
+         hashcons=None):
     """
     Parse `fp` (a file-like object with a `read` method that contains a
     Lisp document) to a Python object - a list based tree structure.
@@ -40,16 +42,31 @@ def load(fp, encoding=None, lexer=None, tokenizer=None, detokenize=True):
 
     Finally, if you would like access to the token stream rather than the
     Python primitive objects, set `detokenize` to False.
+
+    If `hashcons` is a `HashConsTable`, structurally identical subtrees
+    are returned as shared, immutable `SExpression` nodes. The caller keeps
+    the table, so it can be reused to share nodes between documents and
+    asked for the memory saved with `dedup_ratio`.
     """
+    if hashcons is not None and not isinstance(hashcons, HashConsTable):
+        raise TypeError("hashcons must be a HashConsTable, not %r" % (hashcons,))
+
     lexer  = lexer() if lexer else Lexer()
     stream = TokenStream(fp, tokenizer=tokenizer)
     parse  = lexer.parse(stream)
 
     if detokenize:
-        return list(lexer.detokenize(parse))
+        tree = list(lexer.detokenize(parse))
+        if hashcons is not None:
+            tree = [
+                hashcons.intern(node) if isinstance(node, list) else node
+                for node in tree
+            ]
+        return tree
     return parse
 
-def loads(s, encoding=None, lexer=None, tokenizer=None, detokenize=True):
+def loads(s, encoding=None, lexer=None, tokenizer=None, detokenize=True,
+          hashcons=None):
     """
     Parse `s` (a string or unicode instance containing a Lisp document) to
     a Python object- a list based tree structure.
@@ -63,7 +80,39 @@ def loads(s, encoding=None, lexer=None, tokenizer=None, detokenize=True):
     Tokenizer.
 
     Finally, if you would like access to the token stream rather than the
-    Python primitive objects, set `detokenize` to False.
+    Python primitive objects, set `detokenize` to False. See `load` for
+    the `hashcons` option.
     """
     stream = StringIO(s)
-    return load(stream, encoding, lexer, tokenizer, detokenize)
+    return load(stream, encoding, lexer, tokenizer, detokenize, hashcons)
+
+def iterwalk(fp, lexer=None, tokenizer=None):
+    """
+    Enumerates the tokens of `fp` (a file-like object or a path) directly
+    from the token stream, yielding (index, value, depth) tuples exactly
+    like `lene.utils.walk` does for a parsed tree, but without building
+    the tree in memory. This is useful to feed streaming statistics.
+    """
+    lexer = lexer() if lexer else Lexer()
+    index = [0]     # Position of the next node in each open list
+
+    for token in TokenStream(fp, tokenizer=tokenizer):
+        token = lexer.handle_token(token)
+
+        if lexer.is_alphanumeric(token):
+            yield index[-1], token.value, len(index) - 1
+            index[-1] += 1
+        elif lexer.is_ignorable(token):
+            continue
+        elif token.tag == RBRACE:
+            index[-1] += 1
+            index.append(0)
+        elif token.tag == LBRACE:
+            if len(index) == 1:
+                raise SyntacticError("Unbalanced parentheses")
+            index.pop()
+        else:
+            raise SyntacticError("Unknown Token '%s'" % repr(token))
+
+    if len(index) != 1:
+        raise SyntacticError("Unbalanced parentheses")
@@ -0,0 +1,141 @@
+# lene.parser.hashcons
+# Hash-consing of structurally identical subtrees in parsed KBs
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 09:12:44 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: hashcons.py [] bengfort@cs.umd.edu $
+
+"""
+Hash-consing of structurally identical subtrees in parsed KBs.
+
+Frames repeat the same small subexpressions over and over, for example
+`(value (nature))` or `(isa (value (temperature-value)))`. A hash-consing
+table interns every subtree so that structurally identical subtrees are
+represented by exactly one shared, immutable node. This reduces the memory
+required for large KBs and turns subtree equality into an identity check:
+
+    >>> table = HashConsTable()
+    >>> tree  = loads("(a (value (x))) (b (value (x)))", hashcons=table)
+    >>> tree[0][1] is tree[1][1]
+    True
+    >>> len(table), table.requests
+    (4, 6)
+
+Interned nodes are `SExpression` objects, an immutable list subclass, so
+that the rest of lene (which expects a list of lists) works unchanged.
+"""
+
+##########################################################################
+## Immutable Tree Nodes
+##########################################################################
+
+class SExpression(list):
+    """
+    An immutable list that represents an interned subtree. Its hash is
+    computed once on construction from its (already interned) children,
+    so it may be used as a dictionary key or set member cheaply.
+    """
+
+    __slots__ = ('_hash',)
+
+    def __init__(self, iterable=()):
+        list.__init__(self, iterable)
+        self._hash = hash(tuple(self))
+
+    def __hash__(self):
+        return self._hash
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("%s nodes are shared and cannot be modified" %
+                        self.__class__.__name__)
+
+    __setitem__  = _immutable
+    __delitem__  = _immutable
+    __setslice__ = _immutable
+    __delslice__ = _immutable
+    __iadd__     = _immutable
+    __imul__     = _immutable
+    append       = _immutable
+    extend       = _immutable
+    insert       = _immutable
+    pop          = _immutable
+    remove       = _immutable
+    reverse      = _immutable
+    sort         = _immutable
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    def __repr__(self):
+        return "%s(%s)" % (self.__class__.__name__, list.__repr__(self))
+
+##########################################################################
+## Hash-consing Table
+##########################################################################
+
+class HashConsTable(object):
+    """
+    Interns trees so that structurally identical subtrees are shared. A
+    single table can be reused across many documents (e.g. every file of
+    a KB) in order to deduplicate subtrees between them as well.
+    """
+
+    def __init__(self):
+        self.nodes    = {}  # Maps child keys to the interned SExpression
+        self.atoms    = {}  # Maps (type, value) to the interned atom
+        self.requests = 0   # Number of subtrees that have been interned
+
+    def intern(self, tree):
+        """
+        Returns the shared SExpression node for the given tree (a list of
+        lists and atoms), interning every subtree from the leaves up.
+        """
+        children = []
+        for child in tree:
+            if isinstance(child, list):
+                child = self.intern(child)
+            else:
+                child = self.atoms.setdefault((child.__class__, child), child)
+            children.append(child)
+
+        # Interned children are unique so they can be keyed by identity,
+        # atoms are keyed by type as well to keep 1 and 1.0 distinct.
+        key = tuple(
+            id(child) if isinstance(child, SExpression) else (child.__class__, child)
+            for child in children
+        )
+
+        self.requests += 1
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = SExpression(children)
+        return node
+
+    def dedup_ratio(self):
+        """
+        Returns the fraction of interned subtrees that were duplicates and
+        are now shared, a real number in the range [0, 1).
+        """
+        if not self.requests:
+            return 0.0
+        return 1.0 - float(len(self)) / self.requests
+
+    def clear(self):
+        """
+        Releases all interned nodes and resets the statistics.
+        """
+        self.nodes.clear()
+        self.atoms.clear()
+        self.requests = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __repr__(self):
+        return "<%s with %d unique of %d subtrees (%0.1f%% shared)>" % (
+            self.__class__.__name__, len(self), self.requests,
+            self.dedup_ratio() * 100)
@@ -17,6 +17,10 @@ Utility functions and modules for lene
 ## Imports
 ##########################################################################
 
+import os
+import tempfile
+
+from contextlib import contextmanager
 
 ##########################################################################
 ## Minor helper functions
@@ -43,6 +47,26 @@ def flatten(tree):
         else:
             yield node
 
+@contextmanager
+def atomic_write(path, prefix=".tmp-"):
+    """
+    Yields a binary file object to write the contents of path to. The data
+    goes to a temporary file (named with prefix) in the same directory that
+    replaces path once the block completes, so a partially written file is
+    never read by another process. The temporary file is removed if the
+    block raises.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=dirname, prefix=prefix)
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            yield out
+        os.rename(tmp, path)
+    except:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
 def walk(tree, depth=0):
     """
     Enumerates a tree's tokens by walking it in a depth-first fashion.
@@ -0,0 +1,301 @@
+# lene.utils.countstore
+# Compact on-disk storage for token counts
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 10:21:37 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: countstore.py [] bengfort@cs.umd.edu $
+
+"""
+Compact on-disk storage for token counts.
+
+Counts are stored as (section, token, count) entries, where the section is
+the tree depth for a TokenFrequency and always 0 for a Histogram. A count
+file is laid out as follows (all integers are little endian):
+
+    magic    8 bytes        "LENECNT2"
+    length   uint64         length of the JSON header in bytes
+    header   JSON           kind, sections and the number of tokens and entries
+    offsets  uint64[v+1]    offsets of each of the v tokens in the token block
+    tokens   bytes          the encoded tokens, sorted bytewise
+    data     int64[n]       section indices for each of the n entries
+             int64[n]       token indices for each of the n entries
+             int64[n]       counts for each of the n entries
+
+Tokens are encoded with a type tag (see encode_token) so that byte strings
+that are not valid UTF-8, unicode strings and numbers all round trip. The
+vocabulary is sorted, so a token is found with a binary search over the
+token block, and entries are sorted by section and then token index, so a
+count is found with a binary search over the data. The file is memory-mapped
+and nothing is read up front but the small JSON header, which keeps opening
+a store and looking up counts cheap even for huge vocabularies.
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import json
+import struct
+
+from itertools import izip
+from mmap import mmap as memory_map, ACCESS_READ
+from bisect import bisect_left, bisect_right
+from lene.exceptions import *
+from lene.utils import atomic_write
+
+##########################################################################
+## Module Constants
+##########################################################################
+
+MAGIC   = "LENECNT2"
+HEADER  = struct.Struct("<8sQ")
+UINT64  = struct.Struct("<Q")
+INT64   = struct.Struct("<q")
+CHUNK   = 4096              # Number of entries unpacked at once when iterating
+
+##########################################################################
+## Token encoding
+##########################################################################
+
+def encode_token(token):
+    """
+    Encodes a token as a type tag followed by its bytes, e.g. "s" and the
+    raw bytes of a str, "u" and the UTF-8 bytes of a unicode string or "i"
+    and the digits of an integer.
+    """
+    if isinstance(token, str):
+        return "s" + token
+    if isinstance(token, unicode):
+        return "u" + token.encode("utf-8")
+    if isinstance(token, bool):
+        return "b" + str(int(token))
+    if isinstance(token, (int, long)):
+        return "i" + str(token)
+    if isinstance(token, float):
+        return "f" + repr(token)
+    raise TypeError("cannot store token %r of type %s" % (token, type(token).__name__))
+
+def decode_token(data):
+    """
+    Decodes a token encoded with encode_token.
+    """
+    tag, value = data[0], data[1:]
+    if tag == "s":
+        return value
+    if tag == "u":
+        return value.decode("utf-8")
+    if tag == "b":
+        return value == "1"
+    if tag == "i":
+        return int(value)
+    if tag == "f":
+        return float(value)
+    raise LeneException("unknown token type %r in count file" % tag)
+
+##########################################################################
+## Writing
+##########################################################################
+
+def write_counts(path, kind, entries):
+    """
+    Writes an iterable of (section, token, count) entries to path, with
+    atomic_write. Counts of the same token in a section are summed.
+    """
+    counts = {}
+    for section, token, count in entries:
+        if not count: continue
+        key = (section, encode_token(token))
+        counts[key] = counts.get(key, 0) + count
+
+    sections = sorted(set(section for section, _ in counts))
+    tokens   = sorted(set(token for _, token in counts))
+    sidxs    = dict((section, idx) for idx, section in enumerate(sections))
+    vidxs    = dict((token, idx) for idx, token in enumerate(tokens))
+    rows     = sorted(
+        (sidxs[section], vidxs[token], count)
+        for (section, token), count in counts.iteritems()
+    )
+
+    header = json.dumps({
+        "kind": kind,
+        "sections": sections,
+        "tokens": len(tokens),
+        "size": len(rows),
+    })
+
+    offsets = [0]
+    for token in tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    with atomic_write(path, prefix=".counts-") as out:
+        out.write(HEADER.pack(MAGIC, len(header)))
+        out.write(header)
+        out.write(struct.pack("<%dQ" % len(offsets), *offsets))
+        for token in tokens:
+            out.write(token)
+        for column in xrange(3):
+            out.write(struct.pack("<%dq" % len(rows), *[row[column] for row in rows]))
+
+##########################################################################
+## Packed sequences
+##########################################################################
+
+class PackedIntegers(object):
+    """
+    A read-only sequence of the n packed integers at offset in a buffer,
+    which can be searched with bisect without unpacking the buffer.
+    """
+
+    def __init__(self, buf, offset, size, fmt=INT64):
+        self.buf    = buf
+        self.offset = offset
+        self.size   = size
+        self.fmt    = fmt
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < self.size:
+            raise IndexError("packed integer index out of range")
+        return self.fmt.unpack_from(self.buf, self.offset + idx * self.fmt.size)[0]
+
+    def chunks(self, size=CHUNK):
+        """
+        Yields the integers in tuples of up to size integers.
+        """
+        for start in xrange(0, self.size, size):
+            count = min(size, self.size - start)
+            yield struct.unpack_from("<%d%s" % (count, self.fmt.format[-1]),
+                                     self.buf, self.offset + start * self.fmt.size)
+
+    def __len__(self):
+        return self.size
+
+
+class PackedStrings(object):
+    """
+    A read-only sequence of the byte strings in a buffer given by a packed
+    array of their offsets, which can be searched with bisect.
+    """
+
+    def __init__(self, buf, offsets, base):
+        self.buf     = buf
+        self.offsets = offsets
+        self.base    = base
+
+    def __getitem__(self, idx):
+        if not 0 <= idx < len(self):
+            raise IndexError("packed string index out of range")
+        start = self.base + self.offsets[idx]
+        end   = self.base + self.offsets[idx + 1]
+        return self.buf[start:end]
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+##########################################################################
+## Count Store
+##########################################################################
+
+class CountStore(object):
+    """
+    Read-only view of a count file. The file is memory-mapped (unless mmap
+    is False, then it is read in full) and only the JSON header is parsed
+    on open; tokens and counts are searched in place. Close the store (or
+    use it as a context manager) to release the memory map.
+    """
+
+    def __init__(self, path, mmap=True):
+        self.path = path
+
+        with open(path, 'rb') as fobj:
+            magic, length = HEADER.unpack(fobj.read(HEADER.size))
+            if magic != MAGIC:
+                raise LeneException("%r is not a lene count file" % path)
+            header = json.loads(fobj.read(length))
+
+            if mmap and os.fstat(fobj.fileno()).st_size:
+                self.buf = memory_map(fobj.fileno(), 0, access=ACCESS_READ)
+            else:
+                fobj.seek(0)
+                self.buf = fobj.read()
+
+        self.kind     = header["kind"]
+        self.sections = dict((section, idx) for idx, section in enumerate(header["sections"]))
+        self.section_names = header["sections"]
+        self.size     = header["size"]
+
+        # Offsets of the token offsets, the token block and the data columns
+        ntokens = header["tokens"]
+        offset  = HEADER.size + length
+        offsets = PackedIntegers(self.buf, offset, ntokens + 1, UINT64)
+        base    = offset + UINT64.size * (ntokens + 1)
+        self.tokens = PackedStrings(self.buf, offsets, base)
+
+        offset  = base + offsets[ntokens]
+        self.section_ids, self.vocab_ids, self.counts = [
+            PackedIntegers(self.buf, offset + column * INT64.size * self.size, self.size)
+            for column in xrange(3)
+        ]
+
+    def token(self, vidx):
+        """
+        Returns the token with the given index in the vocabulary.
+        """
+        return decode_token(self.tokens[vidx])
+
+    def get(self, token, section=0):
+        """
+        Returns the count of a token in a section (depth), 0 if missing.
+        """
+        sidx = self.sections.get(section)
+        if sidx is None: return 0
+
+        try:
+            key = encode_token(token)
+        except TypeError:
+            return 0
+
+        vidx = bisect_left(self.tokens, key)
+        if vidx == len(self.tokens) or self.tokens[vidx] != key:
+            return 0
+
+        # Find the block of the section then search within it by vocab
+        lo = bisect_left(self.section_ids, sidx)
+        hi = bisect_right(self.section_ids, sidx, lo)
+        jj = bisect_left(self.vocab_ids, vidx, lo, hi)
+        if jj < hi and self.vocab_ids[jj] == vidx:
+            return self.counts[jj]
+        return 0
+
+    def __iter__(self):
+        """
+        Yields (section, token, count) entries in storage order.
+        """
+        columns = (self.section_ids.chunks(), self.vocab_ids.chunks(), self.counts.chunks())
+        for sids, vids, counts in izip(*columns):
+            for sidx, vidx, count in izip(sids, vids, counts):
+                yield self.section_names[sidx], self.token(vidx), count
+
+    def close(self):
+        """
+        Releases the memory map of the count file.
+        """
+        if hasattr(self.buf, "close"):
+            self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return "<%s of %s with %d tokens and %d entries>" % (
+            self.__class__.__name__, self.kind, len(self.tokens), self.size)
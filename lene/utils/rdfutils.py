@@ -17,10 +17,143 @@ Utility functions for managing rdf and OWL
 ## Imports
 ##########################################################################
 
+import re
+import threading
+
 from os.path import splitext
 from urlparse import urlparse
+from collections import namedtuple
+from lene.exceptions import OntologyException
 from rdflib import URIRef, RDFS, RDF, BNode
 
+##########################################################################
+## URI decomposition
+##########################################################################
+
+class LRUCache(object):
+    """
+    A mapping with at most maxsize items that evicts the least recently
+    used item when it is full. Items are kept in a circular doubly linked
+    list of [prev, next, key, value] links so that every operation is O(1).
+    Relinking takes several statements, so every operation that changes the
+    list holds a lock and a cache can be shared between threads.
+    """
+
+    PREV, NEXT, KEY, VALUE = 0, 1, 2, 3
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.lock    = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """
+        Removes every item from the cache and resets the statistics.
+        """
+        self.invalidate()
+        self.hits   = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """
+        Removes every item from the cache but keeps the statistics.
+        """
+        root    = []
+        root[:] = [root, root, None, None]
+        with self.lock:
+            self.map  = {}
+            self.root = root
+
+    def _touch(self, link):
+        """
+        Moves a link to the most recently used end of the list.
+        """
+        prev, succ = link[self.PREV], link[self.NEXT]
+        prev[self.NEXT] = succ
+        succ[self.PREV] = prev
+
+        root = self.root
+        last = root[self.PREV]
+        last[self.NEXT] = root[self.PREV] = link
+        link[self.PREV] = last
+        link[self.NEXT] = root
+
+    def get(self, key, default=None):
+        """
+        Returns the value of key (marking it as recently used) or default.
+        """
+        with self.lock:
+            link = self.map.get(key)
+            if link is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._touch(link)
+            return link[self.VALUE]
+
+    def __getitem__(self, key):
+        with self.lock:
+            link = self.map[key]
+            self._touch(link)
+            return link[self.VALUE]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            link = self.map.get(key)
+            if link is not None:
+                link[self.VALUE] = value
+                self._touch(link)
+                return
+
+            root = self.root
+            if len(self.map) >= self.maxsize:
+                oldest = root[self.NEXT]
+                root[self.NEXT] = oldest[self.NEXT]
+                oldest[self.NEXT][self.PREV] = root
+                del self.map[oldest[self.KEY]]
+
+            last = root[self.PREV]
+            link = [last, root, key, value]
+            last[self.NEXT] = root[self.PREV] = self.map[key] = link
+
+    def __contains__(self, key):
+        return key in self.map
+
+    def __len__(self):
+        return len(self.map)
+
+    def __repr__(self):
+        return "<%s with %d of %d items (%d hits, %d misses)>" % (
+            self.__class__.__name__, len(self), self.maxsize, self.hits, self.misses)
+
+
+URIParts  = namedtuple('URIParts', ['namespace', 'name', 'prefix'])
+URI_CACHE = LRUCache(maxsize=50000)
+
+def split_uri(uri, cache=URI_CACHE):
+    """
+    Decomposes a uri into its namespace, local name and inferred namespace
+    prefix, e.g. 'http://www.w3.org/2002/07/owl#Class' is split into
+    ('http://www.w3.org/2002/07/owl#', 'Class', 'owl'). The local name is
+    given after a # or otherwise after the last /.
+
+    Decompositions are memoized in a bounded LRU cache since the same uris
+    are split over and over when sorting and prettifying query results.
+    """
+    parts = cache.get(uri)
+    if parts is None:
+        string = unicode(uri)
+        if "#" in string:
+            namespace, sep, name = string.partition("#")
+        else:
+            namespace, sep, name = string.rpartition("/")
+
+        namespace = namespace + sep
+        prefix    = namespace.rstrip("#/").split("/")[-1]
+        parts     = cache[uri] = URIParts(namespace, name, prefix)
+    return parts
+
 ##########################################################################
 ## Utility functions
 ##########################################################################
@@ -45,19 +178,11 @@ def sort_by_namespace_prefix(uris, namespaces):
             rdflib.term.URIRef(u'http://www.w3.org/1999/02/22-rdf-syntax-ns#type')
         ]
 
-    TODO: This can be better, remove multiple iterations over uris list.
+    Uris that are not in any of the namespaces are sorted by name after the
+    ones that are. Use a NamespaceRanker directly to reuse the ranking of
+    the namespaces across many calls.
     """
-    output = []
-    uris   = sort_uri_list_by_name(uris)
-    for ns in namespaces:
-        output.extend(list(filter_by_namespace_prefix(uris, ns)))
-
-    # Add any remaining uris
-    for uri in uris:
-        if uri not in output:
-            output.append(uri)
-
-    return output
+    return NamespaceRanker(namespaces).sort(uris)
 
 def filter_by_namespace_prefix(uris, namespace):
     """
@@ -67,6 +192,13 @@ def filter_by_namespace_prefix(uris, namespace):
         if str(uri).startswith(str(namespace)):
             yield uri
 
+def uri_last_bit(uri):
+    """
+    Returns the last bit (usually the name) of a uri, which is specified
+    either after a # or after the last /.
+    """
+    return split_uri(uri).name
+
 def sort_uri_list_by_name(uris):
     """
     Sorts a list of uris based on the last bit (usually the name) of a uri
@@ -75,20 +207,7 @@ def sort_uri_list_by_name(uris):
             rdflib.URIRef('http://purl.org/vocab/frbr/core#Work')
 
     """
-
-    def get_last_bit(uri_string):
-        try:
-            x = uri_string.split("#")[1]
-        except:
-            x = uri_string.split("/")[-1]
-        return x
-
-    try:
-        return sorted(uris, key=lambda x: get_last_bit(x.__str__()))
-    except:
-        # TODO: do more testing.. maybe use a unicode-safe method instead of __str__
-        print "Error in <sort_uri_list_by_name>: possibly a UnicodeEncodeError"
-        return uris
+    return sorted(uris, key=uri_last_bit)
 
 def is_blank(node):
     """
@@ -99,12 +218,45 @@ def is_blank(node):
 def infer_namespace_prefix(uri):
     """
     From a URI returns the last bit and simulates a namespace prefix.
-    e.g. <'http://www.w3.org/2008/05/skos#'> returns the 'skos' string
+    e.g. <'http://www.w3.org/2008/05/skos#'> returns the 'skos' string,
+    as does a namespace without a trailing separator like <'.../skos'>.
+    """
+    parts = split_uri(uri)
+    return parts.name or parts.prefix
+
+def namespace_prefix(prefix, namespace):
+    """
+    Returns the prefix to show for a (prefix, namespace) binding: the
+    default (empty) prefix is inferred from the namespace, or is 'base'
+    if nothing can be inferred.
+    """
+    return prefix or infer_namespace_prefix(namespace) or "base"
+
+def expand_uri(uri):
+    """
+    Expands lazy web addresses, e.g. 'www.example.com/onto.owl' to a
+    URL with an http scheme that the rdflib parser can open.
+    """
+    if uri.startswith("www."):
+        return "http://%s" % str(uri)
+    return uri
+
+# String literals, IRIs and escaped characters (e.g. the \# in the local
+# name of e:a\#b) are kept as is, runs of whitespace and comments between
+# them are collapsed into a single space.
+QUERY_TOKENS = re.compile(
+    r'("""[\s\S]*?"""|\'\'\'[\s\S]*?\'\'\'|"(?:[^"\\\n]|\\.)*"|'
+    r"'(?:[^'\\\n]|\\.)*'|<[^<>\"{}|^`\\\s]*>|\\.)|((?:\s|#[^\n]*)+)"
+)
+
+def normalize_query(query):
+    """
+    Normalizes the text of a SPARQL query so that queries that only differ
+    in their whitespace or comments are the same, e.g. to use as a key.
     """
-    uristr = str(uri)
-    parts  = uristr.replace("#", "").split("/")
-    if parts: return parts[-1]
-    return ""
+    def replace(match):
+        return match.group(1) or " "
+    return QUERY_TOKENS.sub(replace, query).strip()
 
 def guess_rdf_format(uri):
     """
@@ -138,3 +290,192 @@ def guess_rdf_format(uri):
     if ext in extmap:
         return extmap[ext]
     return XML
+
+##########################################################################
+## Namespace matching
+##########################################################################
+
+class PrefixTrie(object):
+    """
+    A character trie that maps string keys (e.g. namespace uris) to values
+    and finds every key that is a prefix of a given string in a single
+    walk over the string, rather than testing each key with startswith.
+    """
+
+    def __init__(self, items=None):
+        self.root = {}
+        self.size = 0
+        if items is not None:
+            for key, value in items:
+                self[key] = value
+
+    def __setitem__(self, key, value):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {})
+        if None not in node:
+            self.size += 1
+        node[None] = (key, value)   # None is never a character
+
+    def __getitem__(self, key):
+        node = self.root
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                raise KeyError(key)
+        if None not in node:
+            raise KeyError(key)
+        return node[None][1]
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def __len__(self):
+        return self.size
+
+    def prefixes(self, string):
+        """
+        Yields the (key, value) of every key that is a prefix of string,
+        from the shortest to the longest.
+        """
+        node = self.root
+        if None in node:
+            yield node[None]
+        for char in string:
+            node = node.get(char)
+            if node is None:
+                return
+            if None in node:
+                yield node[None]
+
+    def longest_prefix(self, string, default=None):
+        """
+        Returns the (key, value) of the longest key that is a prefix of
+        string, or default if no key is a prefix of it.
+        """
+        match = default
+        for match in self.prefixes(string):
+            pass
+        return match
+
+
+class NamespaceRanker(object):
+    """
+    Ranks uris by an ordered list of namespaces and then by name. A uri is
+    ranked by the first namespace in the list that it starts with, uris
+    in none of the namespaces are ranked last. The sort key of each uri is
+    computed once and cached, so a ranker should be reused (e.g. per
+    Ontology) when the same predicates are sorted over and over.
+    """
+
+    def __init__(self, namespaces):
+        self.namespaces = [unicode(ns) for ns in namespaces]
+        self.trie = PrefixTrie()
+        self.keys = {}
+
+        for rank, ns in enumerate(self.namespaces):
+            if ns not in self.trie:
+                self.trie[ns] = rank
+
+    def rank(self, uri):
+        """
+        Returns the index of the first namespace that the uri is in.
+        """
+        ranks = [rank for _, rank in self.trie.prefixes(unicode(uri))]
+        if ranks:
+            return min(ranks)
+        return len(self.namespaces)
+
+    def key(self, uri):
+        """
+        Returns the (rank, name) sort key for the uri.
+        """
+        key = self.keys.get(uri)
+        if key is None:
+            key = self.keys[uri] = (self.rank(uri), uri_last_bit(uri))
+        return key
+
+    def sort(self, uris):
+        """
+        Returns the uris sorted by namespace rank and then by name.
+        """
+        return sorted(uris, key=self.key)
+
+
+class NamespaceMap(object):
+    """
+    Converts uris to "prefix:name" strings and back for a fixed list of
+    (prefix, namespace) bindings. The namespaces are kept in a PrefixTrie
+    so the longest matching namespace of a uri is found in one walk over
+    the uri, and the prefixes in a dict for the way back.
+
+    The namespace of a uri that is in none of the namespaces is added to
+    the map with an inferred prefix, so that nice2uri can resolve every
+    string that uri2nice returns.
+    """
+
+    def __init__(self, namespaces):
+        self.trie   = PrefixTrie()
+        self.curies = {}
+        self.lock   = threading.Lock()
+
+        for prefix, ns in namespaces:
+            self._bind(prefix, unicode(ns))
+
+    def _bind(self, prefix, ns):
+        """
+        Adds a namespace with the shown prefix of the binding (see
+        namespace_prefix) and returns that prefix.
+        """
+        prefix = namespace_prefix(prefix, ns)
+        if ns not in self.trie:
+            self.trie[ns] = prefix
+        self.curies.setdefault(prefix, ns)
+        return prefix
+
+    def _infer(self, ns):
+        """
+        Adds a namespace that is not bound with an inferred prefix, which
+        is numbered if it is already used by another namespace.
+        """
+        with self.lock:
+            if ns in self.trie:
+                return self.trie[ns]
+
+            prefix = base = namespace_prefix("", ns)
+            count  = 0
+            while prefix in self.curies:
+                count += 1
+                prefix = "%s%d" % (base, count)
+            return self._bind(prefix, ns)
+
+    def uri2nice(self, uri):
+        """
+        Returns the uri with its namespace replaced by the prefix. Uris in
+        none of the namespaces are split and their namespace is added with
+        an inferred prefix; uris without a namespace are returned as is.
+        """
+        string = unicode(uri)
+        match  = self.trie.longest_prefix(string)
+        if match is None:
+            parts = split_uri(uri)
+            if not parts.namespace:
+                return string
+            return self._infer(parts.namespace) + ":" + parts.name
+        return match[1] + ":" + string[len(match[0]):]
+
+    def nice2uri(self, nice):
+        """
+        Returns the URIRef of a "prefix:name" string; full uris are simply
+        wrapped. Raises an OntologyException for an unknown prefix.
+        """
+        prefix, sep, name = unicode(nice).partition(":")
+        if prefix in self.curies:
+            return URIRef(self.curies[prefix] + name)
+        if sep and name.startswith("//"):
+            return URIRef(nice)
+        raise OntologyException("Unknown namespace prefix '%s' in '%s'" % (prefix, nice))
@@ -17,15 +17,39 @@ Provides a statistical analysis of tokens
 ## Imports
 ##########################################################################
 
-from heapq import nlargest
+import math
+import struct
+import hashlib
+
+from array import array
+from collections import namedtuple
+from heapq import nlargest, heapify, heappush, heappop
 from operator import itemgetter
 from lene.utils import walk, flatten
 from itertools import repeat, ifilter
+from lene.utils.countstore import CountStore, write_counts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
 
 ##########################################################################
 ## Evaluation Classes
 ##########################################################################
 
+def ranked(items):
+    """
+    Sorts (token, count) pairs from the most to the least common, breaking
+    ties by the token so that the order does not depend on hashing.
+    """
+    return sorted(items, key=lambda item: (-item[1], item[0]))
+
 class Histogram(dict):
     """
     Dict subclass for counting hashable objects, sometimes called a Bag or
@@ -38,8 +62,13 @@ class Histogram(dict):
 
     >>> Histogram('abbabcddc')
     Histogram({'a':2, 'b':3, 'c':2, 'd':2})
+
+    The total number of samples is maintained as elements are counted so
+    that `N` and `freq` do not have to sum over every bin on each call.
     """
 
+    _N = 0  # Running total of all counts, maintained by the mutators
+
     @classmethod
     def fromkeys(klass, iterable, v=None):
         raise NotImplementedError(
@@ -52,13 +81,14 @@ class Histogram(dict):
         the elements of the iterable, or initialize the counts from
         another Histogram.
         """
+        self._N = 0
         self.update(iterable, **kwargs)
 
     def N(self):
         """
         Total number of tokens/samples
         """
-        return sum(self.values())
+        return self._N
 
     def B(self):
         """
@@ -74,9 +104,32 @@ class Histogram(dict):
         of sample outcomes that have been recorded. Frequencies are always
         real numbers in the range [0, 1].
         """
-        if self.N() == 0:
+        if self._N == 0:
             return 0.0
-        return float(self[elem]) / self.N()
+        return float(self[elem]) / self._N
+
+    def frequencies(self, as_array=False):
+        """
+        Return the frequency of every element in a single pass, e.g. the
+        normalized distribution of the Histogram as a dictionary.
+
+        If as_array is True, a tuple of (elements, frequencies) is returned
+        instead, where frequencies is a NumPy array aligned with the list
+        of elements; this requires NumPy to be installed.
+        """
+        total = float(self._N)
+
+        if as_array:
+            if np is None:
+                raise ImportError("NumPy is required for array frequencies")
+            elems  = self.keys()
+            counts = np.fromiter(self.itervalues(), dtype=float, count=len(self))
+            if total: counts /= total
+            return elems, counts
+
+        if not total:
+            return dict.fromkeys(self, 0.0)
+        return dict((elem, count / total) for elem, count in self.iteritems())
 
     def max(self):
         """
@@ -115,14 +168,26 @@ class Histogram(dict):
             if hasattr(iterable, 'iteritems'):
                 if self:
                     self_get = self.get
+                    self_set = dict.__setitem__
+                    total    = 0
                     for elem, count in iterable.iteritems():
-                        self[elem] = self_get(elem, 0) + count
+                        self_set(self, elem, self_get(elem, 0) + count)
+                        total += count
+                    self._N += total
                 else:
                     dict.update(self, iterable) # Faster if empty
+                    if isinstance(iterable, Histogram):
+                        self._N += iterable.N()
+                    else:
+                        self._N += sum(iterable.itervalues())
             else:
                 self_get = self.get
+                self_set = dict.__setitem__
+                total    = 0
                 for elem in iterable:
-                    self[elem] = self_get(elem, 0) + 1
+                    self_set(self, elem, self_get(elem, 0) + 1)
+                    total += 1
+                self._N += total
 
         if kwargs:
             self.update(kwargs)
@@ -149,6 +214,30 @@ class Histogram(dict):
         """
         return Histogram(self)
 
+    def __reduce__(self):
+        """
+        Rebuilds copies and pickles from the counts rather than restoring
+        the running total and then replaying every item through __setitem__,
+        which would count every element twice.
+        """
+        return (self.__class__, (dict(self),))
+
+    def save(self, path):
+        """
+        Write the counts to a compact count file on disk (see countstore).
+        """
+        write_counts(path, self.__class__.__name__,
+                     ((0, elem, count) for elem, count in self.iteritems()))
+
+    @classmethod
+    def load(klass, path):
+        """
+        Read a Histogram from a count file written with `save`. Loaded
+        counts can be merged with `update` or by adding Histograms.
+        """
+        with CountStore(path) as store:
+            return klass(dict((token, count) for _, token, count in store))
+
     def __missing__(self, key):
         """
         Returns the default value when requested key is not found.
@@ -179,13 +268,52 @@ class Histogram(dict):
     def __repr__(self):
         return '<Histogram with %d samples and %d outcomes>' % (len(self), self.N())
 
+    def __setitem__(self, elem, count):
+        """
+        like dict.__setitem__ but keeps the running total up to date
+        """
+        self._N += count - self.get(elem, 0)
+        dict.__setitem__(self, elem, count)
+
     def __delitem__(self, elem):
         """
         like dict.__delitem__ but does not raise KeyError
         """
         if elem in self:
+            self._N -= dict.__getitem__(self, elem)
             dict.__delitem__(self, elem)
 
+    def setdefault(self, elem, count=0):
+        """
+        like dict.setdefault but keeps the running total up to date
+        """
+        if elem not in self:
+            self[elem] = count
+        return dict.__getitem__(self, elem)
+
+    def pop(self, elem, *default):
+        """
+        like dict.pop but keeps the running total up to date
+        """
+        if elem in self:
+            self._N -= dict.__getitem__(self, elem)
+        return dict.pop(self, elem, *default)
+
+    def popitem(self):
+        """
+        like dict.popitem but keeps the running total up to date
+        """
+        elem, count = dict.popitem(self)
+        self._N -= count
+        return elem, count
+
+    def clear(self):
+        """
+        like dict.clear but also resets the running total
+        """
+        dict.clear(self)
+        self._N = 0
+
     # Multiset-style mathematical operations discussed in:
     #       Knuth TAOCP Volume II section 4.6.3 exercise 19
     #       and at http://en.wikipedia.org/wiki/Multiset
@@ -287,17 +415,39 @@ class TokenFrequency(dict):
         """
         if iterable is not None:
             if hasattr(iterable, 'iteritems'):
-                if self:
-                    for elem, hist in iterable.iteritems():
-                        self[elem].update(hist)
-                else:
-                    dict.update(self, iterable)
+                # Always copy counts so that merged results never share (and
+                # later mutate) the Histograms of another TokenFrequency.
+                for elem, hist in iterable.iteritems():
+                    self[elem].update(hist)
             else:
                 for idx, elem, depth in walk(iterable):
                     self[depth][elem] += 1
         if kwargs:
             self.update(kwargs)
 
+    def save(self, path):
+        """
+        Write the counts at every depth to a compact count file on disk.
+        Saved partial counts (e.g. per file of a corpus) can be loaded and
+        merged with `update` in any order to get the corpus wide counts.
+        """
+        write_counts(path, self.__class__.__name__, (
+            (depth, token, count)
+            for depth, hist in self.iteritems()
+            for token, count in hist.iteritems()
+        ))
+
+    @classmethod
+    def load(klass, path):
+        """
+        Read a TokenFrequency from a count file written with `save`.
+        """
+        tokens = klass()
+        with CountStore(path) as store:
+            for depth, token, count in store:
+                tokens[depth][token] = count
+        return tokens
+
     def pprint(self, depth=None):
         """
         Pretty prints the token frequencies at each level of the tree.
@@ -313,8 +463,8 @@ class TokenFrequency(dict):
             output.append("Tree Level %i" % level)
             output.append("=" * len(output[-1]))
 
-            # Create frequencies of the most common tokend
-            for token, count in self[level].most_common():
+            # Create frequencies of the most common tokens, ties by token
+            for token, count in ranked(self[level].iteritems()):
                 output.append("  {0: <4} {1}".format(count, token))
 
             # Create space between tree levels
@@ -330,3 +480,837 @@ class TokenFrequency(dict):
 
     def __str__(self):
         return self.pprint()
+
+##########################################################################
+## Structural Profiles
+##########################################################################
+
+FrameProfile = namedtuple('FrameProfile', ['index', 'name', 'tokens', 'size', 'depth'])
+
+
+class TreeProfile(object):
+    """
+    Computes a structural profile of a KB in a single streaming pass over
+    its parsed top-level forms (frames), namely:
+
+        - depths: Histogram of the maximum nesting depth of each frame
+        - branching: Histogram of the number of children of every list
+        - frames: a FrameProfile per frame with its token count, its size
+          in bytes when written as a normalized S-expression, and depth
+
+    These numbers are used to size worker pools and to find pathological
+    frames; see `largest` and `deepest`. Frames are walked iteratively so
+    that very deep frames do not exhaust the recursion limit.
+    """
+
+    def __init__(self, forms=None):
+        self.depths    = Histogram()
+        self.branching = Histogram()
+        self.frames    = []
+        if forms is not None:
+            self.update(forms)
+
+    def update(self, forms):
+        """
+        Profiles every top-level form of an iterable (e.g. a parsed tree).
+        """
+        for form in forms:
+            self.profile(form)
+
+    def profile(self, form):
+        """
+        Profiles a single top-level form and returns its FrameProfile.
+        """
+        tokens = size = depth = 0
+        stack  = [(form, 1)]
+
+        while stack:
+            node, level = stack.pop()
+            if isinstance(node, list):
+                self.branching[len(node)] += 1
+                depth = max(depth, level)
+                size += 2 + max(len(node) - 1, 0)   # Parens and spaces
+                stack.extend((child, level + 1) for child in node)
+            else:
+                tokens += 1
+                if isinstance(node, unicode):
+                    size += len(node.encode('utf-8'))
+                else:
+                    size += len(str(node))
+
+        name = form
+        if isinstance(form, list):
+            name = None
+            if len(form) > 1 and not isinstance(form[1], list):
+                name = form[1]
+            elif form and not isinstance(form[0], list):
+                name = form[0]
+
+        frame = FrameProfile(len(self.frames), name, tokens, size, depth)
+        self.depths[depth] += 1
+        self.frames.append(frame)
+        return frame
+
+    def N(self):
+        """
+        Total number of frames profiled
+        """
+        return len(self.frames)
+
+    def tokens(self):
+        """
+        Total number of tokens in every frame
+        """
+        return sum(frame.tokens for frame in self.frames)
+
+    def size(self):
+        """
+        Total size in bytes of every frame
+        """
+        return sum(frame.size for frame in self.frames)
+
+    def largest(self, n=10):
+        """
+        Returns the n largest frames by size in bytes.
+        """
+        return nlargest(n, self.frames, key=lambda frame: (frame.size, frame.tokens))
+
+    def deepest(self, n=10):
+        """
+        Returns the n deepest frames, larger frames first on equal depth.
+        """
+        return nlargest(n, self.frames, key=lambda frame: (frame.depth, frame.size))
+
+    def pprint(self, n=10):
+        """
+        Pretty prints a summary of the profile.
+        """
+        output = [
+            "%d frames, %d tokens, %d bytes" % (self.N(), self.tokens(), self.size()),
+            "",
+            "Frame Depths",
+            "============",
+        ]
+        for depth, count in sorted(self.depths.iteritems()):
+            output.append("  {0: <4} {1}".format(count, depth))
+
+        output.extend(["", "Branching Factors", "================="])
+        for branches, count in sorted(self.branching.iteritems()):
+            output.append("  {0: <4} {1}".format(count, branches))
+
+        for title, frames in (("Largest Frames", self.largest(n)),
+                              ("Deepest Frames", self.deepest(n))):
+            output.extend(["", title, "=" * len(title)])
+            for frame in frames:
+                output.append("  {0: <8} {1: <4} {2}".format(frame.size, frame.depth, frame.name))
+
+        output.append("")
+        return "\n".join(output)
+
+    def __repr__(self):
+        return '<TreeProfile of %d frames>' % self.N()
+
+    def __str__(self):
+        return self.pprint()
+
+##########################################################################
+## Approximate Counting
+##########################################################################
+
+def stable_hash(elem):
+    """
+    Returns a pair of 64 bit hashes of an element that, unlike the builtin
+    hash, are the same in every process so that sketches built by different
+    workers can be merged.
+    """
+    if isinstance(elem, unicode):
+        elem = elem.encode('utf-8')
+    elif not isinstance(elem, str):
+        elem = repr(elem)
+    return struct.unpack('<QQ', hashlib.md5(elem).digest())
+
+
+class CountMinSketch(object):
+    """
+    A Count-Min sketch estimates the frequency of elements in a stream of
+    unbounded vocabulary in fixed memory. Estimates never undercount and,
+    with probability 1 - delta, overcount by at most epsilon * N where N
+    is the total number of elements that have been counted.
+
+    Sketches with the same width and depth can be merged, e.g. to combine
+    the sketches built by several workers over parts of a corpus.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, width=None, depth=None):
+        self.width = width or int(math.ceil(math.e / epsilon))
+        self.depth = depth or int(math.ceil(math.log(1.0 / delta)))
+        self.table = [array('l', [0]) * self.width for _ in xrange(self.depth)]
+        self._N    = 0
+
+    @property
+    def epsilon(self):
+        """
+        The relative error bound of the estimates of this sketch.
+        """
+        return math.e / self.width
+
+    @property
+    def delta(self):
+        """
+        The probability that an estimate exceeds the error bound.
+        """
+        return math.exp(-self.depth)
+
+    def N(self):
+        """
+        Total number of tokens/samples
+        """
+        return self._N
+
+    def _buckets(self, elem):
+        """
+        Yields the bucket of the element in each row (double hashing).
+        """
+        h1, h2 = stable_hash(elem)
+        for row in xrange(self.depth):
+            yield (h1 + row * h2) % self.width
+
+    def incr(self, elem, n=1):
+        """
+        Increment an element
+        """
+        for row, col in zip(self.table, self._buckets(elem)):
+            row[col] += n
+        self._N += n
+
+    def update(self, iterable=None, **kwargs):
+        """
+        Counts the elements of an iterable, or the counts of a dictionary
+        or Histogram, into the sketch.
+        """
+        if iterable is not None:
+            if hasattr(iterable, 'iteritems'):
+                for elem, count in iterable.iteritems():
+                    self.incr(elem, count)
+            else:
+                for elem in iterable:
+                    self.incr(elem)
+        if kwargs:
+            self.update(kwargs)
+
+    def estimate(self, elem):
+        """
+        Returns the estimated count of an element (never an undercount).
+        """
+        return min(row[col] for row, col in zip(self.table, self._buckets(elem)))
+
+    def error(self):
+        """
+        Returns the bound on the overcount of any estimate.
+        """
+        return int(math.ceil(self.epsilon * self._N))
+
+    def __getitem__(self, elem):
+        return self.estimate(elem)
+
+    def merge(self, other):
+        """
+        Adds the counts of another sketch of the same shape to this one.
+        """
+        if not isinstance(other, CountMinSketch):
+            raise NotImplementedError()
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Can only merge sketches of the same width and depth")
+
+        for mine, theirs in zip(self.table, other.table):
+            for col, count in enumerate(theirs):
+                if count: mine[col] += count
+        self._N += other._N
+        return self
+
+    def __add__(self, other):
+        """
+        Returns a new sketch with the counts of both sketches.
+        """
+        result = CountMinSketch(width=self.width, depth=self.depth)
+        return result.merge(self).merge(other)
+
+    def __repr__(self):
+        return '<CountMinSketch %dx%d with %d samples>' % (
+            self.depth, self.width, self._N)
+
+
+class SpaceSaving(object):
+    """
+    The Space-Saving algorithm tracks the top-k most frequent elements of
+    a stream in fixed memory. It monitors at most `capacity` elements; when
+    a new element arrives and the summary is full, the element with the
+    minimum count is replaced and the new element inherits its count as
+    its error. Every element with a true frequency greater than N/capacity
+    is guaranteed to be monitored, and counts overestimate by at most the
+    recorded error (and never by more than epsilon * N).
+
+    Summaries of the same capacity can be merged, see Agarwal et al.
+    "Mergeable Summaries" (PODS 2012).
+    """
+
+    def __init__(self, capacity=None, epsilon=0.001):
+        self.capacity = capacity or int(math.ceil(1.0 / epsilon))
+        self.counts   = {}
+        self.errors   = {}
+        self._heap    = []  # (count, elem), entries may be stale
+        self._N       = 0
+
+    @property
+    def epsilon(self):
+        """
+        The relative error bound of the counts of this summary.
+        """
+        return 1.0 / self.capacity
+
+    def N(self):
+        """
+        Total number of tokens/samples
+        """
+        return self._N
+
+    def _minimum(self):
+        """
+        Returns the (count, elem) of the monitored element with the least
+        count, discarding stale heap entries along the way.
+        """
+        heap = self._heap
+        while heap:
+            count, elem = heap[0]
+            if self.counts.get(elem) == count:
+                return count, elem
+            heappop(heap)
+        return 0, None
+
+    def _push(self, elem):
+        """
+        Records the new count of an element on the heap, compacting the
+        heap when there are too many stale entries.
+        """
+        heappush(self._heap, (self.counts[elem], elem))
+        if len(self._heap) > 4 * self.capacity + 64:
+            self._heap = [(count, elem) for elem, count in self.counts.iteritems()]
+            heapify(self._heap)
+
+    def incr(self, elem, n=1):
+        """
+        Increment an element
+        """
+        self._N += n
+        if elem in self.counts:
+            self.counts[elem] += n
+        elif len(self.counts) < self.capacity:
+            self.counts[elem] = n
+            self.errors[elem] = 0
+        else:
+            count, evicted = self._minimum()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[elem] = count + n
+            self.errors[elem] = count
+        self._push(elem)
+
+    def update(self, iterable=None, **kwargs):
+        """
+        Counts the elements of an iterable, or the counts of a dictionary
+        or Histogram, into the summary.
+        """
+        if iterable is not None:
+            if hasattr(iterable, 'iteritems'):
+                for elem, count in iterable.iteritems():
+                    self.incr(elem, count)
+            else:
+                for elem in iterable:
+                    self.incr(elem)
+        if kwargs:
+            self.update(kwargs)
+
+    def error(self, elem):
+        """
+        Returns the maximum overcount of a monitored element.
+        """
+        return self.errors.get(elem, 0)
+
+    def guaranteed(self, elem):
+        """
+        Returns the count that the element is guaranteed to have.
+        """
+        return self.counts.get(elem, 0) - self.errors.get(elem, 0)
+
+    def most_common(self, n=None):
+        """
+        List the n most common elements and their (estimated) counts from
+        the most common to the least common.
+        """
+        if n is None:
+            return sorted(self.counts.iteritems(), key=itemgetter(1), reverse=True)
+        return nlargest(n, self.counts.iteritems(), key=itemgetter(1))
+
+    def __getitem__(self, elem):
+        return self.counts.get(elem, 0)
+
+    def __contains__(self, elem):
+        return elem in self.counts
+
+    def __len__(self):
+        return len(self.counts)
+
+    def merge(self, other):
+        """
+        Merges another summary of the same capacity into this one. Elements
+        missing from a full summary may have occurred up to its minimum
+        count times, so that count is added to both the count and error.
+        """
+        if not isinstance(other, SpaceSaving):
+            raise NotImplementedError()
+        if self.capacity != other.capacity:
+            raise ValueError("Can only merge summaries of the same capacity")
+
+        mine   = self._minimum()[0] if len(self) >= self.capacity else 0
+        theirs = other._minimum()[0] if len(other) >= other.capacity else 0
+
+        counts = {}
+        errors = {}
+        for elem in set(self.counts) | set(other.counts):
+            counts[elem] = self.counts.get(elem, mine) + other.counts.get(elem, theirs)
+            errors[elem] = self.errors.get(elem, mine) + other.errors.get(elem, theirs)
+
+        keep = nlargest(self.capacity, counts.iteritems(), key=itemgetter(1))
+        self.counts = dict(keep)
+        self.errors = dict((elem, errors[elem]) for elem, _ in keep)
+        self._heap  = [(count, elem) for elem, count in keep]
+        heapify(self._heap)
+        self._N += other._N
+        return self
+
+    def __add__(self, other):
+        """
+        Returns a new summary that merges both summaries.
+        """
+        result = SpaceSaving(self.capacity)
+        return result.merge(self).merge(other)
+
+    def __repr__(self):
+        return '<SpaceSaving top %d of %d samples>' % (self.capacity, self._N)
+
+##########################################################################
+## Vectorized Tree Statistics
+##########################################################################
+
+class Vocabulary(object):
+    """
+    Bidirectional mapping of hashable symbols to contiguous integer ids,
+    assigned in the order that the symbols are first seen. Used to index
+    the rows and columns of count arrays by symbol.
+    """
+
+    def __init__(self, symbols=None):
+        self.ids     = {}
+        self.symbols = []
+        if symbols is not None:
+            self.update(symbols)
+
+    def add(self, symbol):
+        """
+        Returns the id of the symbol, adding it to the vocabulary if needed.
+        """
+        idx = self.ids.get(symbol)
+        if idx is None:
+            idx = self.ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return idx
+
+    def update(self, symbols):
+        """
+        Adds every symbol in the iterable to the vocabulary.
+        """
+        for symbol in symbols:
+            self.add(symbol)
+
+    def symbol(self, idx):
+        """
+        Returns the symbol for the given id.
+        """
+        return self.symbols[idx]
+
+    def __getitem__(self, symbol):
+        return self.ids[symbol]
+
+    def __contains__(self, symbol):
+        return symbol in self.ids
+
+    def __iter__(self):
+        return iter(self.symbols)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __repr__(self):
+        return '<Vocabulary with %d symbols>' % len(self)
+
+
+class TokenTensor(object):
+    """
+    Counts the tokens of a Tree in a sparse tensor indexed by symbol id,
+    depth, and child position (the index of the token in its list). This
+    keeps the positional information that TokenFrequency discards, and
+    computes marginals, top-k tokens and the TokenFrequency report with
+    vectorized NumPy operations rather than one Histogram per depth.
+
+    The tensor is stored in coordinate format: `coords` is a 3xN array of
+    unique (symbol, depth, position) coordinates and `counts` holds the
+    N corresponding counts. Use `dense` to get the full array.
+
+    Updates are buffered and only summed into the unique coordinates when
+    the tensor is read or when the buffer outgrows the tensor (and at least
+    COMPACT coordinates), so streaming many trees into a tensor stays linear
+    in the number of tokens rather than re-sorting the tensor every update.
+    """
+
+    SYMBOL   = 0
+    DEPTH    = 1
+    POSITION = 2
+    COMPACT  = 65536
+
+    def __init__(self, tree=None, vocab=None):
+        if np is None:
+            raise ImportError("NumPy is required for the TokenTensor")
+
+        self.vocab    = vocab if vocab is not None else Vocabulary()
+        self._coords  = np.zeros((3, 0), dtype=np.int64)
+        self._counts  = np.zeros(0, dtype=np.int64)
+        self._pending = []
+        self._npending = 0
+
+        if tree is not None:
+            self.update(tree)
+
+    @property
+    def coords(self):
+        """
+        The 3xN array of unique (symbol, depth, position) coordinates.
+        """
+        self._compact()
+        return self._coords
+
+    @property
+    def counts(self):
+        """
+        The N counts of the coordinates.
+        """
+        self._compact()
+        return self._counts
+
+    @property
+    def shape(self):
+        """
+        The (symbols, depths, positions) shape of the dense tensor.
+        """
+        if not self.counts.size:
+            return (len(self.vocab), 0, 0)
+        depths, positions = self.coords[1:].max(axis=1) + 1
+        return (len(self.vocab), int(depths), int(positions))
+
+    def update(self, tree):
+        """
+        Counts the tokens of a tree (or another TokenTensor that shares
+        this tensor's vocabulary) into the tensor.
+        """
+        if isinstance(tree, TokenTensor):
+            if tree.vocab is not self.vocab:
+                raise ValueError("Can only merge tensors that share a vocabulary")
+            return self._merge(tree.coords, tree.counts)
+
+        add    = self.vocab.add
+        coords = []
+        if tree:
+            coords = [(add(token), depth, idx) for idx, token, depth in walk(tree)]
+
+        coords = np.array(coords, dtype=np.int64).reshape(-1, 3).T
+        self._merge(coords, np.ones(coords.shape[1], dtype=np.int64))
+
+    def _merge(self, coords, counts):
+        """
+        Buffers coordinate counts, compacting the tensor once the buffer
+        is larger than the tensor itself.
+        """
+        if not counts.size:
+            return
+
+        self._pending.append((coords, counts))
+        self._npending += counts.size
+        if self._npending >= max(self.COMPACT, self._counts.size):
+            self._compact()
+
+    def _compact(self):
+        """
+        Sums the buffered coordinate counts into the unique coordinates.
+        """
+        if not self._pending:
+            return
+
+        coords = np.hstack([self._coords] + [pending[0] for pending in self._pending])
+        counts = np.concatenate([self._counts] + [pending[1] for pending in self._pending])
+        self._pending  = []
+        self._npending = 0
+
+        dims = tuple(coords.max(axis=1) + 1)
+        keys = np.ravel_multi_index(coords, dims)
+        keys, inverse = np.unique(keys, return_inverse=True)
+
+        self._counts = np.bincount(inverse, weights=counts).astype(np.int64)
+        self._coords = np.vstack(np.unravel_index(keys, dims)).astype(np.int64)
+
+    def dense(self):
+        """
+        Returns the dense (symbols, depths, positions) count array.
+        """
+        tensor = np.zeros(self.shape, dtype=np.int64)
+        tensor[tuple(self.coords)] = self.counts
+        return tensor
+
+    def _select(self, depth=None, position=None, idxmax=None):
+        """
+        Returns a boolean mask of the coordinates that match the filters.
+        """
+        mask = np.ones(self.counts.size, dtype=bool)
+        if depth is not None:
+            mask &= self.coords[self.DEPTH] == depth
+        if position is not None:
+            mask &= self.coords[self.POSITION] == position
+        if idxmax is not None:
+            mask &= self.coords[self.POSITION] <= idxmax
+        return mask
+
+    def marginal(self, *axes):
+        """
+        Returns the dense counts summed over every axis that is not given,
+        e.g. marginal(TokenTensor.DEPTH) is the number of tokens at each
+        depth and marginal(SYMBOL, DEPTH) is a symbols x depths matrix.
+        """
+        axes  = axes or (self.SYMBOL, self.DEPTH, self.POSITION)
+        shape = tuple(self.shape[axis] for axis in axes)
+        size  = int(np.prod(shape))
+        if not size:
+            return np.zeros(shape, dtype=np.int64)
+
+        keys = np.ravel_multi_index(self.coords[list(axes)], shape)
+        return np.bincount(keys, weights=self.counts, minlength=size
+                           ).astype(np.int64).reshape(shape)
+
+    def top(self, k=10, depth=None, position=None, idxmax=None):
+        """
+        Returns the k most common (symbol, count) pairs, optionally for a
+        single depth and/or child position. Ties are broken by the order
+        in which the symbols were first seen. If k is None, all symbols
+        with a nonzero count are returned.
+        """
+        mask   = self._select(depth, position, idxmax)
+        totals = np.bincount(self.coords[self.SYMBOL][mask],
+                             weights=self.counts[mask],
+                             minlength=len(self.vocab)).astype(np.int64)
+
+        order  = np.lexsort((np.arange(totals.size), -totals))
+        order  = order[totals[order] > 0]
+        if k is not None:
+            order = order[:k]
+        return [(self.vocab.symbol(idx), int(totals[idx])) for idx in order]
+
+    def to_token_frequency(self, idxmax=None):
+        """
+        Converts the tensor into a TokenFrequency, only counting tokens
+        whose position is at most idxmax (all tokens if None).
+        """
+        tokens = TokenFrequency()
+        mask   = self._select(idxmax=idxmax)
+        for sym, depth, count in zip(self.coords[self.SYMBOL][mask],
+                                     self.coords[self.DEPTH][mask],
+                                     self.counts[mask]):
+            tokens[int(depth)][self.vocab.symbol(sym)] += int(count)
+        return tokens
+
+    def pprint(self, depth=None, idxmax=None):
+        """
+        Pretty prints the token frequencies at each level of the tree in
+        the same format as TokenFrequency.pprint. Pass idxmax=0 to count
+        the same tokens as TokenFrequency.from_tree does by default.
+        """
+        mask   = self._select(idxmax=idxmax)
+        levels = np.unique(self.coords[self.DEPTH][mask]).tolist()
+        if depth: levels = levels[:depth]
+
+        output = []
+        for level in levels:
+            output.append("Tree Level %i" % level)
+            output.append("=" * len(output[-1]))
+
+            for token, count in ranked(self.top(None, depth=level, idxmax=idxmax)):
+                output.append("  {0: <4} {1}".format(count, token))
+
+            output.append("")
+
+        return "\n".join(output)
+
+    def __repr__(self):
+        return '<TokenTensor of shape %r with %d outcomes>' % (
+            self.shape, int(self.counts.sum()))
+
+    def __str__(self):
+        return self.pprint()
+
+
+class SlotFillerCooccurrence(object):
+    """
+    Profiles the schema usage of a KB by counting, in a single pass over
+    the top-level forms, which slots occur with which define-kinds and
+    which fillers occur in which slots. For example the form:
+
+        (define-frame TEMPERATURE-VALUE
+            (isa (value (physical-object-attribute-value))))
+
+    counts `isa` for the `define-frame` kind, and the filler
+    `physical-object-attribute-value` for the `isa` slot. Counts are
+    returned as SciPy sparse matrices whose rows and columns are indexed
+    by the `kinds`, `slots` and `fillers` vocabularies.
+
+    Counts are aggregated per (row, column) pair as they are recorded, so
+    memory grows with the number of distinct pairs rather than with the
+    number of occurrences. The sparse matrices are built once and cached
+    until the counts are updated again, so they should not be modified.
+    """
+
+    def __init__(self, tree=None):
+        if sparse is None:
+            raise ImportError("SciPy is required for slot-filler co-occurrence")
+
+        self.kinds   = Vocabulary()
+        self.slots   = Vocabulary()
+        self.fillers = Vocabulary()
+
+        # Counts of each matrix keyed by (row, column)
+        self._kind_slot   = {}
+        self._slot_filler = {}
+
+        # CSR matrices built from the counts, emptied by every update
+        self._matrices    = {}
+
+        if tree is not None:
+            self.update(tree)
+
+    @staticmethod
+    def _record(counts, row, col, count=1):
+        key = (row, col)
+        counts[key] = counts.get(key, 0) + count
+
+    def update(self, tree):
+        """
+        Counts the slots and fillers of every top-level form in the tree,
+        or merges the counts of another SlotFillerCooccurrence.
+        """
+        self._matrices.clear()
+        if isinstance(tree, SlotFillerCooccurrence):
+            return self._merge(tree)
+
+        add_kind   = self.kinds.add
+        add_slot   = self.slots.add
+        add_filler = self.fillers.add
+        record     = self._record
+
+        for form in tree:
+            if not isinstance(form, list) or not form or isinstance(form[0], list):
+                continue
+
+            kind = add_kind(form[0])
+            for slot in form[2:]:
+                if not isinstance(slot, list) or not slot or isinstance(slot[0], list):
+                    continue
+
+                sidx = add_slot(slot[0])
+                record(self._kind_slot, kind, sidx)
+
+                # Fillers are the heads of the values of each facet
+                for facet in slot[1:]:
+                    if not isinstance(facet, list):
+                        continue
+                    for filler in facet[1:]:
+                        if isinstance(filler, list):
+                            if not filler or isinstance(filler[0], list):
+                                continue
+                            filler = filler[0]
+                        record(self._slot_filler, sidx, add_filler(filler))
+
+    def _merge(self, other):
+        """
+        Adds the counts of another co-occurrence, remapping its vocabulary.
+        """
+        pairs = (
+            (other._kind_slot, self._kind_slot, other.kinds, self.kinds, other.slots, self.slots),
+            (other._slot_filler, self._slot_filler, other.slots, self.slots, other.fillers, self.fillers),
+        )
+
+        for source, target, srows, trows, scols, tcols in pairs:
+            # Remap every symbol once rather than once per pair
+            rowmap = [trows.add(srows.symbol(idx)) for idx in xrange(len(srows))]
+            colmap = [tcols.add(scols.symbol(idx)) for idx in xrange(len(scols))]
+            for (row, col), count in source.iteritems():
+                self._record(target, rowmap[row], colmap[col], count)
+
+    def _matrix(self, name, counts, shape):
+        """
+        Returns the cached CSR matrix of the counts, building it if needed.
+        """
+        matrix = self._matrices.get(name)
+        if matrix is None or matrix.shape != shape:
+            size = len(counts)
+            rows = np.fromiter((key[0] for key in counts), dtype=np.int64, count=size)
+            cols = np.fromiter((key[1] for key in counts), dtype=np.int64, count=size)
+            data = np.fromiter(counts.itervalues(), dtype=np.int64, count=size)
+            matrix = sparse.csr_matrix((data, (rows, cols)), shape=shape, dtype=np.int64)
+            self._matrices[name] = matrix
+        return matrix
+
+    @property
+    def kind_slot(self):
+        """
+        Sparse kinds x slots matrix of slot occurrences per define-kind.
+        """
+        return self._matrix("kind_slot", self._kind_slot, (len(self.kinds), len(self.slots)))
+
+    @property
+    def slot_filler(self):
+        """
+        Sparse slots x fillers matrix of filler occurrences per slot.
+        """
+        return self._matrix("slot_filler", self._slot_filler, (len(self.slots), len(self.fillers)))
+
+    @staticmethod
+    def _top(matrix, idx, vocab, n):
+        row    = matrix.getrow(idx)
+        order  = np.lexsort((row.indices, -row.data))
+        if n is not None: order = order[:n]
+        return [(vocab.symbol(row.indices[jj]), int(row.data[jj])) for jj in order]
+
+    def slots_for(self, kind, n=None):
+        """
+        Returns the n most common (slot, count) pairs of a define-kind.
+        """
+        if kind not in self.kinds:
+            return []
+        return self._top(self.kind_slot, self.kinds[kind], self.slots, n)
+
+    def fillers_for(self, slot, n=None):
+        """
+        Returns the n most common (filler, count) pairs of a slot.
+        """
+        if slot not in self.slots:
+            return []
+        return self._top(self.slot_filler, self.slots[slot], self.fillers, n)
+
+    def __repr__(self):
+        return '<SlotFillerCooccurrence of %d kinds, %d slots and %d fillers>' % (
+            len(self.kinds), len(self.slots), len(self.fillers))
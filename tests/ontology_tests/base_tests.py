@@ -0,0 +1,551 @@
+# tests.ontology_tests.base_tests
+# Tests for the Ontology object and its queries
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 13:02:51 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: base_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Tests for the Ontology object and its queries
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import unittest
+import threading
+import SimpleHTTPServer
+import BaseHTTPServer
+
+from lene.exceptions import *
+from lene.ontology.base import *
+from lene.ontology.vocabs import OWL
+from rdflib import URIRef, RDF, RDFS
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "fixtures")
+MCLUMD   = os.path.join(FIXTURES, "mclumd.owl")
+FAHR451  = os.path.join(FIXTURES, "fahr451.owl")
+RESTRICT = os.path.join(FIXTURES, "restriction.owl")
+ACTIVE   = "http://cs.umd.edu/active/#"
+
+##########################################################################
+## Ontology Test Cases
+##########################################################################
+
+class OntologyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ontology = Ontology(MCLUMD)
+
+    def tearDown(self):
+        self.ontology = None
+
+    def test_entity_triples_order(self):
+        """
+        Assert entity triples are sorted by namespace and then name
+        """
+        entity = URIRef(ACTIVE + "from")
+        preds  = [p for p, o in self.ontology.entity_triples(entity)]
+        self.assertEqual(preds, [
+            RDF.type, RDFS.comment, RDFS.domain, RDFS.range, RDFS.subPropertyOf
+        ])
+
+    def test_entity_triples_exclude(self):
+        """
+        Assert excluded properties are not in the entity triples
+        """
+        entity = URIRef(ACTIVE + "from")
+        triples = self.ontology.entity_triples(entity, exclude_props=[RDFS.comment])
+        self.assertNotIn(RDFS.comment, [p for p, o in triples])
+        self.assertEqual(len(triples), 4)
+
+    def test_namespace_ranker_cached(self):
+        """
+        Assert namespace rankers are reused by the Ontology
+        """
+        order = [RDF, RDFS, OWL.OWLNS]
+        self.assertIs(self.ontology.namespace_ranker(order),
+                      self.ontology.namespace_ranker(list(order)))
+
+    def test_uri2nice(self):
+        """
+        Test the prettified uris use the longest matching namespace
+        """
+        self.assertEqual(self.ontology.uri2nice(OWL.Class), "owl:Class")
+        self.assertEqual(self.ontology.uri2nice(RDFS.subClassOf), "rdfs:subClassOf")
+        self.assertEqual(self.ontology.uri2nice(URIRef("http://example.com/people/bob")), "people:bob")
+
+    def test_class_tree(self):
+        """
+        Test the class tree built from the hierarchy index
+        """
+        self.assertIn(URIRef(ACTIVE + "Object"), self.ontology.toplayer)
+        self.assertEqual(self.ontology.max_depth, 3)
+        self.assertEqual(self.ontology.class_tree[URIRef(ACTIVE + "Point")],
+                         [URIRef(ACTIVE + "Coordinate-2D"), URIRef(ACTIVE + "Coordinate-3D")])
+        self.assertEqual(self.ontology._class_tree_level(URIRef(ACTIVE + "Nature")), 3)
+        self.assertEqual(len(self.ontology._classes_from_tree()), 18)
+
+    def test_class_superclasses(self):
+        """
+        Test the direct and transitive superclasses of a class
+        """
+        person = URIRef(ACTIVE + "Person")
+        self.assertEqual(self.ontology.class_superclasses(person),
+                         [URIRef(ACTIVE + "Volitional-Agent")])
+        self.assertEqual(self.ontology.class_superclasses(person, direct=False, sort=True), [
+            URIRef(ACTIVE + "Agent"), URIRef(ACTIVE + "Object"),
+            OWL.Thing, URIRef(ACTIVE + "Volitional-Agent"),
+        ])
+
+    def test_class_subclasses(self):
+        """
+        Test the direct and transitive subclasses of a class
+        """
+        agent = URIRef(ACTIVE + "Agent")
+        self.assertEqual(len(self.ontology.class_subclasses(agent)), 2)
+        self.assertEqual(len(self.ontology.class_subclasses(agent, direct=False)), 4)
+        self.assertEqual(self.ontology.class_siblings(URIRef(ACTIVE + "Coordinate-2D")),
+                         [URIRef(ACTIVE + "Coordinate-3D")])
+
+    def test_hierarchy_invalidated(self):
+        """
+        Assert the hierarchy index is rebuilt when the graph changes
+        """
+        hierarchy = self.ontology.hierarchy
+        self.assertIs(hierarchy, self.ontology.hierarchy)
+
+        child = URIRef(ACTIVE + "Robot")
+        self.ontology.graph.add((child, RDFS.subClassOf, URIRef(ACTIVE + "Agent")))
+        self.assertIsNot(hierarchy, self.ontology.hierarchy)
+        self.assertIn(child, self.ontology.class_subclasses(URIRef(ACTIVE + "Agent")))
+
+    def test_class_most_specialized(self):
+        """
+        Test the most specialized and most generic class filters
+        """
+        classes = [URIRef(ACTIVE + name) for name in ("Object", "Person", "Agent", "Point")]
+        self.assertEqual(self.ontology.class_most_specialized(classes), classes[1::2])
+        self.assertEqual(self.ontology.class_most_generic(classes), [classes[0], classes[3]])
+        self.assertTrue(self.ontology.class_is_subclass(classes[1], classes[0]))
+
+    def test_class_lca(self):
+        """
+        Assert the tree and exact LCA agree on a single inheritance ontology
+        """
+        classes = self.ontology._classes_from_tree()
+        pairs   = [(a, b) for a in classes for b in classes]
+        self.assertEqual(self.ontology.class_lca_many(pairs),
+                         self.ontology.class_lca_many(pairs, exact=True))
+        self.assertEqual(self.ontology.class_lca(URIRef(ACTIVE + "Person"),
+                         URIRef(ACTIVE + "Nature")), URIRef(ACTIVE + "Agent"))
+
+    def test_property_tree(self):
+        """
+        Test the property tree built from the property index
+        """
+        tree = self.ontology._build_property_tree()
+        self.assertEqual(len(tree[0]), 5)
+        self.assertEqual(tree[URIRef(ACTIVE + "motion")],
+                         [URIRef(ACTIVE + "from"), URIRef(ACTIVE + "to")])
+        self.assertEqual(self.ontology._get_top_properties("owl.datatypeproperty"),
+                         [URIRef(ACTIVE + "coord"), URIRef(ACTIVE + "name")])
+
+    def test_property_queries(self):
+        """
+        Test the property hierarchy, domain and range queries
+        """
+        prop = URIRef(ACTIVE + "x")
+        self.assertEqual(self.ontology.property_superclasses(prop), [URIRef(ACTIVE + "coord")])
+        self.assertEqual(len(self.ontology.property_subclasses(URIRef(ACTIVE + "coord"))), 3)
+        self.assertEqual(self.ontology.property_domain(prop), [URIRef(ACTIVE + "Point")])
+        self.assertEqual(self.ontology.property_range(prop),
+                         [URIRef("http://www.w3.org/2001/XMLSchema#int")])
+
+    def test_class_find(self):
+        """
+        Test finding classes by name
+        """
+        agent = URIRef(ACTIVE + "Agent")
+        self.assertEqual(len(self.ontology.class_find("agent")), 3)
+        self.assertEqual(self.ontology.class_find("Agent", exact=True), [agent])
+        self.assertEqual(self.ontology.class_find("agent", exact=True), [])
+        self.assertEqual(self.ontology.class_find("agent", exact=True, ignore_case=True), [agent])
+        self.assertEqual(self.ontology.class_find(ACTIVE + "Agent", exact=True), [agent])
+        self.assertEqual(self.ontology.class_find("coord", prefix=True), [
+            URIRef(ACTIVE + "Coordinate-2D"), URIRef(ACTIVE + "Coordinate-3D"),
+        ])
+
+    def test_property_and_instance_find(self):
+        """
+        Test finding properties and instances by name
+        """
+        self.assertEqual(self.ontology.property_find("coord"), [URIRef(ACTIVE + "coord")])
+        self.assertEqual(self.ontology.property_find("o", predicate="owl.datatypeproperty"),
+                         [URIRef(ACTIVE + "coord")])
+        self.assertEqual(self.ontology.instance_find("true"), [URIRef(ACTIVE + "True")])
+        self.assertEqual(self.ontology.class_find("true"), [])
+
+    def test_namespaces(self):
+        """
+        Assert the bound and inferred namespace prefixes are all listed
+        """
+        prefixes = dict(self.ontology.namespaces())
+        self.assertEqual(prefixes["owl"], URIRef(OWL.OWLNS))
+        self.assertIn("h9bbrktUtOdpim7m5pcmK", prefixes)
+        self.assertEqual(len(prefixes), len(list(self.ontology.graph.namespaces())))
+
+    def test_nice2uri(self):
+        """
+        Test the round trip of uris through the prefixed names
+        """
+        uris = (
+            OWL.Class, RDFS.label, URIRef(self.ontology.namespaces(True) + "x"),
+            URIRef(ACTIVE + "Agent"),   # The namespace is not bound in the ontology
+        )
+        for uri in uris:
+            self.assertEqual(self.ontology.nice2uri(self.ontology.uri2nice(uri)), uri)
+
+    def test_namespace_map_invalidated(self):
+        """
+        Assert the namespace map is rebuilt when a namespace is bound
+        """
+        nsmap = self.ontology.namespace_map()
+        self.assertIs(nsmap, self.ontology.namespace_map())
+
+        # Unbound namespaces get the prefix the ontology infers for them
+        prefix = namespace_prefix("", ACTIVE)
+        self.assertEqual(self.ontology.uri2nice(URIRef(ACTIVE + "Agent")), prefix + ":Agent")
+        self.assertEqual(self.ontology.nice2uri(prefix + ":Agent"), URIRef(ACTIVE + "Agent"))
+
+        self.ontology.graph.bind("umd", ACTIVE)
+        self.assertIsNot(nsmap, self.ontology.namespace_map())
+        self.assertEqual(self.ontology.uri2nice(URIRef(ACTIVE + "Agent")), "umd:Agent")
+
+    def test_statistics(self):
+        """
+        Test the statistics served from the entity index
+        """
+        self.assertEqual(self.ontology.statistics(), [
+            ("Triples", 140), ("Classes", 18), ("Object Properties", 5),
+            ("Datatype Properties", 5), ("Individuals", 2),
+        ])
+
+    def test_statistics_anonymous_classes(self):
+        """
+        Assert blank node restrictions are not counted as classes
+        """
+        ontology = Ontology(RESTRICT)
+        self.assertEqual(len(ontology.classes), 3)
+        self.assertEqual(dict(ontology.statistics())["Classes"], len(ontology.classes))
+
+    def test_get_all_entities(self):
+        """
+        Test the classes, properties and instances of the ontology
+        """
+        self.assertEqual(len(self.ontology.classes), 18)
+        self.assertEqual(len(self.ontology.properties), 10)
+        self.assertEqual(self.ontology.rdf_props, [])
+        self.assertEqual(self.ontology.instances,
+                         [URIRef(ACTIVE + "False"), URIRef(ACTIVE + "True")])
+        self.assertEqual(self.ontology._get_all_classes("rdfs"), [])
+        self.assertIn(URIRef("http://www.w3.org/2001/XMLSchema#int"),
+                      self.ontology._get_all_classes(include_domain_range=True))
+        self.assertIn(OWL.Thing, self.ontology._get_all_classes(exclude_rdf_owl=False))
+
+        with self.assertRaises(Exception):
+            self.ontology._get_all_properties("owl.class")
+
+    def test_entity_triples_many(self):
+        """
+        Assert batch entity triples match the single entity triples
+        """
+        entities = self.ontology.classes + self.ontology.properties
+        results  = self.ontology.entity_triples_many(entities, prettify=True,
+                                                     exclude_props=[RDFS.comment])
+        self.assertFalse(isinstance(results, list))
+
+        count = 0
+        for entity, triples in results:
+            count += 1
+            self.assertEqual(triples, self.ontology.entity_triples(entity,
+                             prettify=True, exclude_props=[RDFS.comment]))
+        self.assertEqual(count, len(entities))
+
+    def test_class_instances(self):
+        """
+        Test the direct and indirect instances of a class
+        """
+        truth = URIRef(ACTIVE + "Truth")
+        bob   = URIRef(ACTIVE + "Bob")
+        self.assertEqual(self.ontology.class_instances(truth),
+                         [URIRef(ACTIVE + "False"), URIRef(ACTIVE + "True")])
+
+        self.ontology.graph.add((bob, RDF.type, URIRef(ACTIVE + "Person")))
+        self.assertEqual(self.ontology.class_instances(URIRef(ACTIVE + "Agent")), [])
+        self.assertEqual(self.ontology.class_instances(URIRef(ACTIVE + "Agent"), direct=False), [bob])
+
+    def test_instance_parent(self):
+        """
+        Test the classes and siblings of an instance
+        """
+        bob = URIRef(ACTIVE + "Bob")
+        self.ontology.graph.add((bob, RDF.type, URIRef(ACTIVE + "Person")))
+        self.ontology.graph.add((bob, RDF.type, URIRef(ACTIVE + "Agent")))
+
+        self.assertEqual(self.ontology.instance_parent(bob), [URIRef(ACTIVE + "Person")])
+        self.assertEqual(len(self.ontology.instance_parent(bob, most_specialized=False)), 2)
+        self.assertEqual(self.ontology.instance_siblings(URIRef(ACTIVE + "True")),
+                         [URIRef(ACTIVE + "False")])
+
+    def test_class_domain_range_for(self):
+        """
+        Test the direct and inherited domain and range lookups of a class
+        """
+        point = URIRef(ACTIVE + "Coordinate-2D")
+        props = [URIRef(ACTIVE + name) for name in ("coord", "x", "y", "z")]
+        self.assertEqual(self.ontology.class_domain_for(point), [])
+        self.assertEqual(self.ontology.class_domain_for(point, inherited=True), props)
+        self.assertEqual(self.ontology.class_domain_for(URIRef(ACTIVE + "Point")), props)
+
+        person = URIRef(ACTIVE + "Person")
+        self.assertEqual(self.ontology.class_range_for(person), [])
+        self.assertIn(URIRef(ACTIVE + "actor"),
+                      self.ontology.class_range_for(person, inherited=True))
+
+    def test_class_properties(self):
+        """
+        Test the properties and ranges of a class
+        """
+        props = dict(self.ontology.class_properties(URIRef(ACTIVE + "Coordinate-3D")))
+        self.assertEqual(len(props), 4)
+        self.assertEqual(props[URIRef(ACTIVE + "x")],
+                         [URIRef("http://www.w3.org/2001/XMLSchema#int")])
+
+##########################################################################
+## Lazy Ontology Test Cases
+##########################################################################
+
+class LazyOntologyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.loads = []
+        self._load = Ontology.load
+
+        def load(ontology, uri, cache=None):
+            self.loads.append(uri)
+            return self._load(ontology, uri, cache=cache)
+        Ontology.load = load
+
+    def tearDown(self):
+        Ontology.load = self._load
+
+    def test_deferred_parse(self):
+        """
+        Assert a lazy ontology is parsed on first use
+        """
+        ontology = Ontology(MCLUMD, lazy=True)
+        self.assertFalse(ontology.loaded)
+        self.assertEqual(ontology.location, MCLUMD)
+        self.assertEqual(ontology.format, "xml")
+        self.assertIn("not loaded", repr(ontology))
+        self.assertEqual(self.loads, [])
+
+        expected = Ontology(MCLUMD)
+        self.assertEqual(ontology.class_superclasses(URIRef(ACTIVE + "Point")),
+                         expected.class_superclasses(URIRef(ACTIVE + "Point")))
+        self.assertTrue(ontology.loaded)
+        self.assertEqual(ontology.classes, expected.classes)
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+        self.assertEqual(repr(ontology), repr(expected))
+        self.assertEqual(len(self.loads), 2)
+
+    def test_missing_attribute(self):
+        """
+        Assert missing attributes still raise on a lazy ontology
+        """
+        ontology = Ontology(MCLUMD, lazy=True)
+        with self.assertRaises(AttributeError):
+            ontology.missing
+        self.assertTrue(ontology.loaded)
+
+    def test_concurrent_first_access(self):
+        """
+        Assert concurrent first accesses trigger a single parse
+        """
+        ontology = Ontology(MCLUMD, lazy=True)
+        start    = threading.Event()
+        results  = []
+
+        def query():
+            start.wait()
+            results.append(len(ontology.classes))
+
+        threads = [threading.Thread(target=query) for _ in xrange(8)]
+        for thread in threads: thread.start()
+        start.set()
+        for thread in threads: thread.join()
+
+        self.assertEqual(len(self.loads), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(len(results), 8)
+
+##########################################################################
+## Multi-source Loading Test Cases
+##########################################################################
+
+class FixtureHandler(SimpleHTTPServer.SimpleHTTPRequestHandler):
+    """
+    Serves the fixtures directory quietly.
+    """
+
+    def translate_path(self, path):
+        return os.path.join(FIXTURES, path.lstrip("/"))
+
+    def log_message(self, *args):
+        pass
+
+class LoadManyTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = BaseHTTPServer.HTTPServer(("127.0.0.1", 0), FixtureHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+        cls.url    = "http://127.0.0.1:%d/" % cls.server.server_address[1]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def expected(self):
+        ontology = Ontology(MCLUMD)
+        ontology.load(FAHR451)
+        return ontology
+
+    def test_load_many_files(self):
+        """
+        Assert loading local files in a pool matches sequential loads
+        """
+        expected = self.expected()
+        ontology = Ontology()
+        timings  = ontology.load_many([MCLUMD, FAHR451], workers=2)
+
+        self.assertEqual(timings.keys(), [MCLUMD, FAHR451])
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+        self.assertEqual(ontology.location, MCLUMD)
+        self.assertEqual(ontology.classes, expected.classes)
+        self.assertEqual(ontology.statistics(), expected.statistics())
+        self.assertEqual(sorted(ontology.namespaces()), sorted(expected.namespaces()))
+
+    def test_load_many_urls(self):
+        """
+        Assert sources are loaded from a web server
+        """
+        expected = self.expected()
+        urls     = [self.url + "mclumd.owl", self.url + "fahr451.owl"]
+        ontology = Ontology()
+        timings  = ontology.load_many(urls, workers=2)
+
+        self.assertEqual(timings.keys(), urls)
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+        self.assertEqual(ontology.classes, expected.classes)
+
+    def test_load_many_sequential(self):
+        """
+        Assert a single worker loads the sources in process
+        """
+        expected = self.expected()
+        ontology = Ontology()
+        ontology.load_many([MCLUMD, self.url + "fahr451.owl"], workers=1)
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+        self.assertEqual(ontology.load_many([]), {})
+
+##########################################################################
+## SPARQL Query Cache Test Cases
+##########################################################################
+
+SUBCLASSES = """
+    SELECT ?cls WHERE {
+        ?cls rdfs:subClassOf ?parent .   # direct subclasses only
+    }
+"""
+
+class QueryCacheTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ontology = Ontology(MCLUMD)
+        self.parent   = URIRef(ACTIVE + "Action")
+
+    def test_cached_select(self):
+        """
+        Assert equivalent queries are answered from the cache
+        """
+        bindings = {"parent": self.parent}
+        rows = self.ontology.query(SUBCLASSES, initBindings=bindings)
+        expected = set(self.ontology.graph.subjects(RDFS.subClassOf, self.parent))
+        self.assertEqual(set(row[0] for row in rows), expected)
+
+        query = "SELECT ?cls WHERE { ?cls rdfs:subClassOf ?parent . }"
+        self.assertEqual(self.ontology.query(query, initBindings=bindings), rows)
+        stats = self.ontology.query_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (1, 1, 1))
+
+        # Other bindings are a different query
+        self.ontology.query(query, initBindings={"parent": OWL.Thing})
+        self.assertEqual(self.ontology.query_stats()["misses"], 2)
+
+    def test_ask(self):
+        """
+        Test caching ask queries
+        """
+        query = "ASK { ?cls rdfs:subClassOf <%s> }" % self.parent
+        self.assertTrue(self.ontology.query(query))
+        self.assertTrue(self.ontology.query(query))
+        self.assertFalse(self.ontology.query("ASK { ?cls rdfs:subClassOf <urn:x> }"))
+        self.assertEqual(self.ontology.query_stats()["hits"], 1)
+
+    def test_escaped_local_names(self):
+        """
+        Assert queries that only differ after an escaped # do not collide
+        """
+        query = (
+            "PREFIX e: <http://example.com/> "
+            "SELECT ?x WHERE { ?x a ?t FILTER(?t != e:a\\#b) ?x a owl:%s }"
+        )
+        classes = self.ontology.query(query % "Class")
+        props   = self.ontology.query(query % "ObjectProperty")
+        self.assertEqual(len(classes), len(self.ontology.classes))
+        self.assertNotEqual(set(classes), set(props))
+        self.assertEqual(self.ontology.query_stats()["misses"], 2)
+
+    def test_invalidated_on_change(self):
+        """
+        Assert the cache is invalidated when the graph is modified
+        """
+        bindings = {"parent": self.parent}
+        before   = self.ontology.query(SUBCLASSES, initBindings=bindings)
+
+        child = URIRef(ACTIVE + "Pondering")
+        self.ontology.graph.add((child, RDFS.subClassOf, self.parent))
+        after = self.ontology.query(SUBCLASSES, initBindings=bindings)
+        self.assertEqual(len(after), len(before) + 1)
+
+        self.ontology.graph.remove((child, None, None))
+        self.assertEqual(len(self.ontology.query(SUBCLASSES, initBindings=bindings)), len(before))
+
+        stats = self.ontology.query_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["size"]), (0, 3, 1))
@@ -97,4 +97,15 @@ class OWLClassIntegrationTest(unittest.TestCase):
 ##########################################################################
 
 class OWLGraphTests(unittest.TestCase):
-    pass
+
+    def test_graph_version(self):
+        """
+        Assert modifications of the graph increment its version
+        """
+        owl = OWLGraph([], title="Test")
+        version = owl.graph.version
+        self.assertGreater(version, 0)
+
+        Plant = OWLClass("Plant", OWL.Thing, "The plant type", "The class of all plant types")
+        Plant.bind(owl.graph)
+        self.assertGreater(owl.graph.version, version)
@@ -0,0 +1,345 @@
+# tests.ontology_tests.index_tests
+# Tests for the precomputed ontology indexes
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 14:40:02 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: index_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Tests for the precomputed ontology indexes
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import unittest
+
+from lene.ontology.graph import *
+from lene.ontology.index import np
+from lene.ontology.index import *
+from lene.ontology.vocabs import OWL
+from rdflib import Namespace, BNode, Literal, RDF, RDFS
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+EX = Namespace("http://example.com/zoo#")
+
+def make_zoo():
+    """
+    A small taxonomy with multiple inheritance and a restriction:
+
+        Animal -> Mammal -> Dog, Bat
+        Animal -> Flyer  -> Bird, Bat
+    """
+    graph = VersionedGraph()
+    for cls in ("Animal", "Mammal", "Flyer", "Dog", "Bat", "Bird"):
+        graph.add((EX[cls], RDF.type, OWL.Class))
+
+    graph.add((EX.Animal, RDFS.subClassOf, OWL.Thing))
+    for child, parent in (("Mammal", "Animal"), ("Flyer", "Animal"),
+                          ("Dog", "Mammal"), ("Bat", "Mammal"),
+                          ("Bat", "Flyer"), ("Bird", "Flyer")):
+        graph.add((EX[child], RDFS.subClassOf, EX[parent]))
+
+    restriction = BNode()
+    graph.add((restriction, RDF.type, OWL.Restriction))
+    graph.add((EX.Dog, RDFS.subClassOf, restriction))
+    return graph
+
+##########################################################################
+## Entity Index Tests
+##########################################################################
+
+class EntityIndexTests(unittest.TestCase):
+
+    def test_classification(self):
+        """
+        Test sorting typed entities into classes, properties and instances
+        """
+        graph = make_zoo()
+        graph.add((EX.Plant, RDF.type, RDFS.Class))
+        graph.add((EX.eats, RDF.type, OWL.ObjectProperty))
+        graph.add((EX.rex, RDF.type, EX.Dog))
+        graph.add((EX.rex, RDF.type, OWL.OWLNS["NamedIndividual"]))
+        graph.add((EX.polly, RDF.type, OWL.OWLNS["NamedIndividual"]))
+        graph.add((BNode(), RDF.type, EX.Dog))
+
+        index = EntityIndex(graph)
+        self.assertEqual(index.classes["rdfs"], set([EX.Plant]))
+        self.assertEqual(len(index.classes["owl"]), 6)
+        self.assertEqual(len(index.all_classes()), 7)
+        self.assertEqual(index.properties["owl.objectproperty"], set([EX.eats]))
+        self.assertEqual(index.all_properties(), set([EX.eats]))
+        self.assertEqual(index.instances, set([EX.rex, EX.polly]))
+        self.assertEqual(index.types[EX.rex], set([EX.Dog, OWL.OWLNS["NamedIndividual"]]))
+        self.assertEqual(index.instances_of, {EX.Dog: set([EX.rex])})
+        self.assertEqual(index.classes_of, {EX.rex: set([EX.Dog])})
+
+##########################################################################
+## Class Hierarchy Tests
+##########################################################################
+
+class ClassHierarchyTests(unittest.TestCase):
+
+    def setUp(self):
+        self.hierarchy = ClassHierarchy(make_zoo())
+
+    def test_direct(self):
+        """
+        Test direct super and subclasses from the adjacency
+        """
+        self.assertEqual(self.hierarchy.superclasses(EX.Bat), set([EX.Mammal, EX.Flyer]))
+        self.assertEqual(self.hierarchy.subclasses(EX.Flyer), set([EX.Bat, EX.Bird]))
+        self.assertEqual(self.hierarchy.subclasses(EX.Dog), set())
+
+    def test_transitive(self):
+        """
+        Test the transitive closures with multiple inheritance
+        """
+        self.assertEqual(self.hierarchy.ancestors(EX.Bat),
+                         set([EX.Mammal, EX.Flyer, EX.Animal, OWL.Thing]))
+        self.assertEqual(self.hierarchy.descendants(EX.Animal),
+                         set([EX.Mammal, EX.Flyer, EX.Dog, EX.Bat, EX.Bird]))
+        self.assertIs(self.hierarchy.ancestors(EX.Bat), self.hierarchy.ancestors(EX.Bat))
+
+    def test_siblings(self):
+        """
+        Test siblings across all parents
+        """
+        self.assertEqual(self.hierarchy.siblings(EX.Bat), set([EX.Dog, EX.Bird]))
+
+    def test_roots_and_depths(self):
+        """
+        Test the roots and longest path depths
+        """
+        self.assertEqual(self.hierarchy.roots(), set([EX.Animal]))
+        self.assertEqual(self.hierarchy.roots(ignore=()), set([OWL.Thing]))
+        self.assertEqual(self.hierarchy.depth(EX.Animal), 0)
+        self.assertEqual(self.hierarchy.depth(EX.Bat), 2)
+        self.assertEqual(self.hierarchy.max_depth(), 2)
+
+    def test_cycle(self):
+        """
+        Assert subClassOf cycles do not break the hierarchy
+        """
+        graph = make_zoo()
+        graph.add((EX.Animal, RDFS.subClassOf, EX.Dog))
+        hierarchy = ClassHierarchy(graph)
+        self.assertIn(EX.Dog, hierarchy.ancestors(EX.Animal))
+        self.assertNotIn(EX.Dog, hierarchy.ancestors(EX.Dog))
+        self.assertEqual(len(hierarchy.depths), 6)
+
+    def test_is_subclass(self):
+        """
+        Test subsumption checks against the ancestor bitsets
+        """
+        self.assertTrue(self.hierarchy.is_subclass(EX.Bat, EX.Flyer))
+        self.assertTrue(self.hierarchy.is_subclass(EX.Bat, OWL.Thing))
+        self.assertTrue(self.hierarchy.is_subclass(EX.Bat, EX.Bat))
+        self.assertFalse(self.hierarchy.is_subclass(EX.Flyer, EX.Bat))
+        self.assertFalse(self.hierarchy.is_subclass(EX.Dog, EX.Flyer))
+        self.assertFalse(self.hierarchy.is_subclass(EX.Unknown, EX.Animal))
+
+    def test_most_specialized(self):
+        """
+        Test filtering classes to the leaves
+        """
+        classes = [EX.Animal, EX.Bat, EX.Mammal, EX.Bird, EX.Bat, EX.Unknown]
+        self.assertEqual(self.hierarchy.most_specialized(classes),
+                         [EX.Bat, EX.Bird, EX.Unknown])
+
+    def test_most_generic(self):
+        """
+        Test filtering classes to the roots
+        """
+        classes = [EX.Bat, EX.Mammal, EX.Flyer, EX.Bird, EX.Unknown]
+        self.assertEqual(self.hierarchy.most_generic(classes),
+                         [EX.Mammal, EX.Flyer, EX.Unknown])
+        self.assertEqual(self.hierarchy.most_generic([EX.Dog, EX.Bird]), [EX.Dog, EX.Bird])
+
+    def test_lca(self):
+        """
+        Test lowest common ancestors on the spanning tree
+        """
+        self.assertEqual(self.hierarchy.lca(EX.Dog, EX.Bat), EX.Mammal)
+        self.assertEqual(self.hierarchy.lca(EX.Bird, EX.Animal), EX.Animal)
+        self.assertEqual(self.hierarchy.lca(EX.Dog, EX.Dog), EX.Dog)
+        self.assertEqual(self.hierarchy.lca(EX.Dog, OWL.Thing), OWL.Thing)
+        self.assertIsNone(self.hierarchy.lca(EX.Dog, EX.Unknown))
+
+    def test_lca_multiple_inheritance(self):
+        """
+        Test the tree and exact lowest common ancestors in the DAG
+        """
+        # Bat hangs below Mammal in the tree, but is a Flyer too
+        self.assertEqual(self.hierarchy.lca(EX.Bat, EX.Bird), EX.Animal)
+        self.assertEqual(self.hierarchy.lca(EX.Bat, EX.Bird, exact=True), EX.Flyer)
+        self.assertEqual(self.hierarchy.lca(EX.Dog, EX.Bird, exact=True), EX.Animal)
+
+    def test_lca_many(self):
+        """
+        Assert batch queries match the single queries
+        """
+        classes = [EX.Animal, EX.Mammal, EX.Flyer, EX.Dog, EX.Bat, EX.Bird, EX.Unknown]
+        pairs   = [(a, b) for a in classes for b in classes]
+        self.assertEqual(self.hierarchy.lca_many(pairs),
+                         [self.hierarchy.lca(a, b) for a, b in pairs])
+        self.assertEqual(self.hierarchy.lca_many(pairs, exact=True),
+                         [self.hierarchy.lca(a, b, exact=True) for a, b in pairs])
+        self.assertEqual(self.hierarchy.lca_many([]), [])
+
+    def test_distances(self):
+        """
+        Test the shortest path distances to the ancestors
+        """
+        self.assertEqual(self.hierarchy.distances(EX.Bat), {
+            EX.Bat: 0, EX.Mammal: 1, EX.Flyer: 1, EX.Animal: 2, OWL.Thing: 3,
+        })
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_similarity_wup(self):
+        """
+        Test the Wu-Palmer similarity matrix
+        """
+        classes = [EX.Dog, EX.Bat, EX.Bird, EX.Dog, EX.Unknown]
+        matrix  = self.hierarchy.similarity(classes)
+        self.assertEqual(matrix.shape, (5, 5))
+        self.assertAlmostEqual(matrix[0, 1], 2.0 * 2 / 6)   # lcs Mammal
+        self.assertAlmostEqual(matrix[1, 2], 2.0 * 2 / 6)   # lcs Flyer
+        self.assertAlmostEqual(matrix[0, 2], 2.0 * 1 / 6)   # lcs Animal
+        self.assertEqual(matrix[0, 3], 1.0)
+        self.assertEqual(matrix[4, 4], 1.0)
+        self.assertEqual(matrix[0, 4], 0.0)
+        self.assertTrue((matrix == matrix.T).all())
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_similarity_path(self):
+        """
+        Test the path length similarity matrix
+        """
+        matrix = self.hierarchy.similarity([EX.Dog, EX.Bat, EX.Bird, EX.Animal], metric="path")
+        self.assertAlmostEqual(matrix[0, 1], 1.0 / 3)
+        self.assertAlmostEqual(matrix[0, 2], 1.0 / 5)
+        self.assertAlmostEqual(matrix[2, 3], 1.0 / 3)
+
+        with self.assertRaises(ValueError):
+            self.hierarchy.similarity([EX.Dog], metric="cosine")
+
+##########################################################################
+## Property Index Tests
+##########################################################################
+
+TOP_OBJECT = OWL.OWLNS["topObjectProperty"]
+
+class PropertyIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        graph = make_zoo()
+        graph.add((EX.eats, RDF.type, OWL.ObjectProperty))
+        graph.add((EX.hunts, RDF.type, OWL.ObjectProperty))
+        graph.add((EX.weight, RDF.type, OWL.DatatypeProperty))
+        graph.add((EX.hunts, RDFS.subPropertyOf, EX.eats))
+        graph.add((EX.stalks, RDFS.subPropertyOf, EX.hunts))
+        graph.add((EX.eats, RDFS.subClassOf, TOP_OBJECT))
+        graph.add((EX.eats, RDFS.domain, EX.Animal))
+        graph.add((EX.eats, OWL.OWLNS["range"], EX.Animal))
+        self.index = PropertyIndex(graph)
+
+    def test_properties(self):
+        """
+        Test the properties of each kind
+        """
+        self.assertEqual(self.index.properties("owl.objectproperty"), set([EX.eats, EX.hunts]))
+        self.assertEqual(self.index.properties(), set([EX.eats, EX.hunts, EX.weight]))
+        self.assertIn(EX.stalks, self.index.properties(include_implicit=True))
+        with self.assertRaises(ValueError):
+            self.index.properties("owl.class")
+
+    def test_hierarchy(self):
+        """
+        Test the sub property hierarchy
+        """
+        self.assertEqual(self.index.superproperties(EX.hunts), set([EX.eats]))
+        self.assertEqual(self.index.superproperties(EX.eats), set([TOP_OBJECT]))
+        self.assertEqual(self.index.descendants(EX.eats), set([EX.hunts, EX.stalks]))
+        self.assertEqual(self.index.roots(), set([EX.eats, EX.weight]))
+        self.assertEqual(self.index.tree("owl.objectproperty"), {
+            0: [EX.eats], EX.eats: [EX.hunts],
+        })
+
+    def test_domain_range(self):
+        """
+        Test the RDFS and OWL domains and ranges
+        """
+        self.assertEqual(self.index.domain(EX.eats), set([EX.Animal]))
+        self.assertEqual(self.index.range(EX.eats), set([EX.Animal]))
+        self.assertEqual(self.index.range(EX.hunts), set())
+        self.assertEqual(self.index.domain_for([EX.Animal, EX.Dog]), set([EX.eats]))
+        self.assertEqual(self.index.range_for([EX.Dog]), set())
+
+##########################################################################
+## Name Index Tests
+##########################################################################
+
+class NameIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        graph = make_zoo()
+        graph.add((EX.Bat, RDFS.label, Literal("Flying Fox")))
+        self.index = NameIndex(graph)
+
+    def test_exact(self):
+        """
+        Test exact and case insensitive exact matches
+        """
+        self.assertEqual(self.index.find("Bat", "exact"), set([EX.Bat]))
+        self.assertEqual(self.index.find("bat", "exact"), set())
+        self.assertEqual(self.index.find("bat", "iexact"), set([EX.Bat]))
+        self.assertEqual(self.index.find("flying fox", "iexact"), set([EX.Bat]))
+
+    def test_prefix(self):
+        """
+        Test case insensitive prefix matches
+        """
+        self.assertEqual(self.index.find("b", "prefix"), set([EX.Bat, EX.Bird]))
+        self.assertEqual(self.index.find("FLY", "prefix"), set([EX.Flyer, EX.Bat]))
+        self.assertEqual(self.index.find("zebra", "prefix"), set())
+
+    def test_substring(self):
+        """
+        Test case insensitive substring matches with and without trigrams
+        """
+        self.assertEqual(self.index.find("mal"), set([EX.Animal, EX.Mammal]))
+        self.assertEqual(self.index.find("ir"), set([EX.Bird]))
+        self.assertEqual(self.index.find(" fox"), set([EX.Bat]))
+        self.assertEqual(self.index.find("xyz"), set())
+
+        with self.assertRaises(ValueError):
+            self.index.find("bat", "regex")
+
+##########################################################################
+## Versioned Graph Tests
+##########################################################################
+
+class VersionedGraphTests(unittest.TestCase):
+
+    def test_version(self):
+        """
+        Assert modifications increment the graph version
+        """
+        graph = VersionedGraph()
+        self.assertEqual(graph.version, 0)
+        graph.add((EX.Dog, RDF.type, OWL.Class))
+        graph.remove((EX.Dog, RDF.type, OWL.Class))
+        graph += [(EX.Bat, RDF.type, OWL.Class)]
+        self.assertEqual(graph.version, 3)
+
+        graph.bind("zoo", EX)
+        self.assertEqual(graph.ns_version, 1)
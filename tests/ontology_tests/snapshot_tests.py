@@ -0,0 +1,207 @@
+# tests.ontology_tests.snapshot_tests
+# Tests for the binary snapshots of ontology graphs
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 16:34:51 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: snapshot_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Tests for the binary snapshots of ontology graphs
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import unittest
+import tempfile
+
+from lene.exceptions import *
+from lene.ontology.base import Ontology
+from lene.ontology.index import ClassHierarchy
+from lene.ontology import snapshot
+from lene.ontology.snapshot import *
+from rdflib import Graph, Literal, URIRef, BNode, RDF, RDFS
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "fixtures")
+MCLUMD   = os.path.join(FIXTURES, "mclumd.owl")
+FAHR451  = os.path.join(FIXTURES, "fahr451.owl")
+NOBASE   = os.path.join(FIXTURES, "nobase.owl")
+
+##########################################################################
+## Snapshot Tests
+##########################################################################
+
+class SnapshotTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_roundtrip(self):
+        """
+        Test writing and reading the triples and namespaces of a graph
+        """
+        graph = Graph()
+        graph.bind("ex", "http://example.com/")
+        node  = BNode()
+        graph.add((URIRef("http://example.com/a"), RDFS.label, Literal("a", lang="en")))
+        graph.add((URIRef("http://example.com/a"), RDFS.seeAlso, node))
+        graph.add((node, RDF.value, Literal(42)))
+
+        path = os.path.join(self.tmpdir, "graph.snapshot")
+        write_snapshot(path, graph, [{"an": "index"}])
+        triples, namespaces, indexes = read_snapshot(path)
+
+        self.assertEqual(set(triples), set(graph))
+        self.assertIn(("ex", URIRef("http://example.com/")), namespaces)
+        self.assertEqual(indexes, [{"an": "index"}])
+
+    def test_failed_write(self):
+        """
+        Assert a failed write leaves no files behind in the cache
+        """
+        path = os.path.join(self.tmpdir, "graph.snapshot")
+        with self.assertRaises(Exception):
+            write_snapshot(path, Graph(), [lambda: None])
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_bad_magic(self):
+        """
+        Assert an error is raised on a file that is not a snapshot
+        """
+        path = os.path.join(self.tmpdir, "bad.snapshot")
+        with open(path, 'wb') as f:
+            f.write("NOTASNAPSHOT")
+
+        with self.assertRaises(OntologyException):
+            read_snapshot(path)
+
+    def test_ontology_cache(self):
+        """
+        Assert a cached Ontology restores the graph and its indexes
+        """
+        parsed = Ontology(MCLUMD, cache=self.tmpdir)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 1)
+
+        cached = Ontology(MCLUMD, cache=self.tmpdir)
+        self.assertEqual(set(parsed.graph), set(cached.graph))
+        self.assertEqual(sorted(parsed.namespaces()), sorted(cached.namespaces()))
+        self.assertEqual(cached.statistics(), parsed.statistics())
+        self.assertEqual(cached.toplayer, parsed.toplayer)
+        self.assertEqual(cached.hierarchy.parents, parsed.hierarchy.parents)
+
+        # The hierarchy is restored from the snapshot and stays valid
+        version, hierarchy = cached._indexes[ClassHierarchy]
+        self.assertEqual(version, cached.graph.version)
+        self.assertIs(hierarchy, cached.hierarchy)
+
+    def test_ontology_cache_merge(self):
+        """
+        Assert a cached source can be added to a non empty Ontology
+        """
+        expected = Ontology(MCLUMD)
+        expected.load(FAHR451)
+
+        ontology = Ontology(MCLUMD, cache=self.tmpdir)
+        ontology.load(FAHR451, cache=self.tmpdir)
+        self.assertEqual(len(os.listdir(self.tmpdir)), 2)
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+
+        ontology = Ontology(MCLUMD, cache=self.tmpdir)
+        ontology.load(FAHR451, cache=self.tmpdir)
+        self.assertEqual(len(ontology.graph), len(expected.graph))
+        self.assertEqual(ontology.statistics(), expected.statistics())
+
+    def test_source_changed(self):
+        """
+        Assert a changed source does not hit the old snapshot
+        """
+        path = os.path.join(self.tmpdir, "onto.owl")
+        shutil.copy(MCLUMD, path)
+        Ontology(path, cache=self.tmpdir)
+
+        shutil.copy(FAHR451, path)
+        ontology = Ontology(path, cache=self.tmpdir)
+        self.assertEqual(len(ontology.graph), len(Ontology(FAHR451).graph))
+        self.assertEqual(len([f for f in os.listdir(self.tmpdir) if f.endswith(EXTENSION)]), 2)
+
+    def snapshots(self):
+        return [f for f in os.listdir(self.tmpdir) if f.endswith(EXTENSION)]
+
+    def test_source_base(self):
+        """
+        Assert the base of a local path is its absolute file uri
+        """
+        base = source_base(NOBASE)
+        self.assertTrue(base.startswith("file:///"))
+        self.assertTrue(base.endswith("/fixtures/nobase.owl"))
+        self.assertEqual(source_base("http://example.com/a.owl#"), "http://example.com/a.owl")
+
+    def test_cache_without_xml_base(self):
+        """
+        Assert relative uris resolve the same with and without the cache
+        """
+        expected = Ontology(NOBASE)
+        parsed   = Ontology(NOBASE, cache=self.tmpdir)
+        cached   = Ontology(NOBASE, cache=self.tmpdir)
+
+        bird = URIRef(source_base(NOBASE) + "#Bird")
+        self.assertIn(bird, expected.classes)
+        self.assertEqual(set(parsed.graph), set(expected.graph))
+        self.assertEqual(set(cached.graph), set(expected.graph))
+        self.assertEqual(cached.classes, expected.classes)
+
+    def test_same_source_other_location(self):
+        """
+        Assert identical sources at two locations do not share a snapshot
+        """
+        other = os.path.join(self.tmpdir, "copy", "nobase.owl")
+        os.makedirs(os.path.dirname(other))
+        shutil.copy(NOBASE, other)
+
+        Ontology(NOBASE, cache=self.tmpdir)
+        copied = Ontology(other, cache=self.tmpdir)
+        self.assertEqual(len(self.snapshots()), 2)
+        self.assertIn(URIRef(source_base(other) + "#Bird"), copied.classes)
+        self.assertNotIn(URIRef(source_base(NOBASE) + "#Bird"), copied.classes)
+
+    def test_stale_versions_miss(self):
+        """
+        Assert snapshots of other snapshot or index versions are not read
+        """
+        Ontology(MCLUMD, cache=self.tmpdir)
+        path = os.path.join(self.tmpdir, self.snapshots()[0])
+        base = source_base(MCLUMD)
+        self.assertIsNotNone(read_snapshot(path, base))
+        self.assertIsNone(read_snapshot(path, "file:///elsewhere.owl"))
+
+        index_version = snapshot.INDEX_VERSION
+        try:
+            snapshot.INDEX_VERSION = index_version + 1
+            self.assertIsNone(read_snapshot(path, base))
+        finally:
+            snapshot.INDEX_VERSION = index_version
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        with open(path, 'wb') as f:
+            f.write(MAGIC + "1" + data[len(MAGIC) + len(VERSION):])
+        self.assertIsNone(read_snapshot(path, base))
+
+        # A stale snapshot is a cache miss and is written again
+        ontology = Ontology(MCLUMD, cache=self.tmpdir)
+        self.assertEqual(len(ontology.graph), len(Ontology(MCLUMD).graph))
+        self.assertIsNotNone(read_snapshot(path, base))
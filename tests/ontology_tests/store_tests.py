@@ -0,0 +1,291 @@
+# tests.ontology_tests.store_tests
+# Tests for the disk-backed SQLite triple store
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 17:48:06 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: store_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Tests for the disk-backed SQLite triple store
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import unittest
+import threading
+import tempfile
+
+from lene.ontology.base import Ontology
+from lene.ontology.create import OWLGraph
+from lene.ontology.store import *
+from rdflib import Graph, Literal, URIRef, BNode, RDF, RDFS
+from rdflib.compare import isomorphic
+
+##########################################################################
+## Fixtures
+##########################################################################
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "..", "..", "fixtures")
+MCLUMD   = os.path.join(FIXTURES, "mclumd.owl")
+
+EX = "http://example.com/"
+
+class RecordingStore(SQLiteStore):
+    """
+    A SQLiteStore that records the patterns of every triples lookup.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.patterns = []
+        super(RecordingStore, self).__init__(*args, **kwargs)
+
+    def triples(self, pattern, context=None):
+        self.patterns.append(pattern)
+        return super(RecordingStore, self).triples(pattern, context)
+
+##########################################################################
+## SQLite Store Tests
+##########################################################################
+
+class SQLiteStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path   = os.path.join(self.tmpdir, "graph.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def make_graph(self):
+        graph = Graph(SQLiteStore(self.path))
+        graph.bind("ex", EX)
+        node  = BNode()
+        graph.add((URIRef(EX + "a"), RDFS.label, Literal("a", lang="en")))
+        graph.add((URIRef(EX + "a"), RDFS.seeAlso, node))
+        graph.add((node, RDF.value, Literal(42)))
+        graph.add((node, RDF.value, Literal("42")))
+        return graph
+
+    def test_term_roundtrip(self):
+        """
+        Test encoding and decoding terms
+        """
+        terms = (
+            URIRef(EX), BNode(), Literal("a"), Literal("a", lang="en"),
+            Literal(42), Literal(u"\u00e9t\u00e9"),
+        )
+        for term in terms:
+            decoded = decode_term(*encode_term(term))
+            self.assertEqual(decoded, term)
+            self.assertIs(type(decoded), type(term))
+
+    def test_triples(self):
+        """
+        Test adding and matching triples
+        """
+        graph = self.make_graph()
+        self.assertEqual(len(graph), 4)
+        self.assertIn((URIRef(EX + "a"), RDFS.label, Literal("a", lang="en")), graph)
+        self.assertNotIn((URIRef(EX + "a"), RDFS.label, Literal("a")), graph)
+        self.assertEqual(len(list(graph.objects(None, RDF.value))), 2)
+        self.assertEqual(list(graph.subjects(RDFS.label)), [URIRef(EX + "a")])
+        self.assertEqual(list(graph.triples((URIRef(EX + "b"), None, None))), [])
+
+        # Duplicate triples are stored once
+        graph.add((URIRef(EX + "a"), RDFS.label, Literal("a", lang="en")))
+        self.assertEqual(len(graph), 4)
+
+    def test_remove(self):
+        """
+        Test removing triples by pattern
+        """
+        graph = self.make_graph()
+        graph.remove((None, RDF.value, None))
+        self.assertEqual(len(graph), 2)
+        graph.remove((URIRef(EX + "b"), None, None))
+        self.assertEqual(len(graph), 2)
+
+    def test_where(self):
+        """
+        Test the where clauses of qualified and unqualified columns
+        """
+        graph = self.make_graph()
+        graph.commit()
+        pattern = (URIRef(EX + "a"), RDFS.label, None)
+        clause, params = graph.store._where(pattern)
+        self.assertEqual(clause, " WHERE s = ? AND p = ?")
+        self.assertEqual(len(params), 2)
+        clause, _ = graph.store._where(pattern, alias="t")
+        self.assertEqual(clause, " WHERE t.s = ? AND t.p = ?")
+        self.assertIsNone(graph.store._where((URIRef(EX + "b"), None, None)))
+
+    def test_reopen(self):
+        """
+        Assert committed triples and namespaces persist on reopening
+        """
+        graph = self.make_graph()
+        expected = set(graph)
+        graph.close()
+
+        graph = Graph(SQLiteStore(self.path))
+        self.assertEqual(set(graph), expected)
+        self.assertIn(("ex", URIRef(EX)), list(graph.namespaces()))
+
+    def test_rollback(self):
+        """
+        Assert uncommitted triples are discarded on rollback
+        """
+        graph = self.make_graph()
+        graph.commit()
+        graph.add((URIRef(EX + "b"), RDFS.label, Literal("b")))
+        graph.rollback()
+        self.assertEqual(len(graph), 4)
+
+    def test_plugin(self):
+        """
+        Test opening the store through the rdflib plugin
+        """
+        graph = Graph("SQLite")
+        self.assertIsInstance(graph.store, SQLiteStore)
+        self.assertEqual(graph.open(self.path, create=False), NO_STORE)
+        graph.open(self.path, create=True)
+        graph.add((URIRef(EX + "a"), RDFS.label, Literal("a")))
+        self.assertEqual(len(graph), 1)
+
+    def test_ontology_parity(self):
+        """
+        Assert an Ontology on a SQLite store matches the memory store
+        """
+        memory = Ontology(MCLUMD)
+        sqlite = Ontology(MCLUMD, store=SQLiteStore(self.path))
+        self.assertTrue(isomorphic(memory.graph, sqlite.graph))
+        self.assertEqual(sqlite.classes, memory.classes)
+        self.assertEqual(sqlite.properties, memory.properties)
+        self.assertEqual(sqlite.instances, memory.instances)
+        self.assertEqual(sqlite.statistics(), memory.statistics())
+
+    def test_ontology_reopen(self):
+        """
+        Assert an Ontology is initialized from a reopened store
+        """
+        memory = Ontology(MCLUMD)
+        Ontology(MCLUMD, store=SQLiteStore(self.path)).graph.close()
+
+        reopened = Ontology(store=SQLiteStore(self.path))
+        self.assertEqual(len(reopened.graph), len(memory.graph))
+        self.assertEqual(reopened.pretty_uri, memory.pretty_uri)
+        self.assertEqual(reopened.toplayer, memory.toplayer)
+        self.assertEqual(reopened.classes, memory.classes)
+
+    def test_ontology_reopen_deferred(self):
+        """
+        Assert reopening an Ontology does not scan the store until used
+        """
+        memory = Ontology(MCLUMD)
+        Ontology(MCLUMD, store=SQLiteStore(self.path)).graph.close()
+
+        store    = RecordingStore(self.path)
+        reopened = Ontology(store=store)
+        self.assertEqual(reopened.pretty_uri, memory.pretty_uri)
+        self.assertNotIn((None, None, None), store.patterns)
+        self.assertEqual(reopened._indexes, {})
+
+        # Building the property index only looks up its predicates
+        self.assertEqual(reopened.properties, memory.properties)
+        self.assertNotIn((None, None, None), store.patterns)
+        self.assertEqual(reopened.property_domain(reopened.properties[0]),
+                         memory.property_domain(memory.properties[0]))
+
+        self.assertEqual(reopened.classes, memory.classes)
+        self.assertEqual(reopened.class_tree, memory.class_tree)
+        self.assertEqual(reopened.max_depth, memory.max_depth)
+
+    def test_owlgraph_store(self):
+        """
+        Test creating an OWLGraph on a SQLite store
+        """
+        owl = OWLGraph([], store=SQLiteStore(self.path), title="Test")
+        self.assertIsInstance(owl.graph.store, SQLiteStore)
+        self.assertGreater(len(owl.graph), 0)
+        owl.graph.close()
+
+        self.assertGreater(len(Graph(SQLiteStore(self.path))), 0)
+
+    def run_in_thread(self, func):
+        """
+        Calls func in another thread and returns its result or raises its
+        exception in the calling thread.
+        """
+        result = {}
+        def target():
+            try:
+                result["value"] = func()
+            except Exception as e:
+                result["error"] = e
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+        if "error" in result:
+            raise result["error"]
+        return result["value"]
+
+    def test_cross_thread(self):
+        """
+        Assert a store can be used from threads other than its creator
+        """
+        graph = self.make_graph()
+        self.assertEqual(self.run_in_thread(lambda: len(graph)), 4)
+
+        triple = (URIRef(EX + "b"), RDFS.label, Literal("b"))
+        self.run_in_thread(lambda: graph.add(triple))
+        self.assertIn(triple, graph)
+        self.assertEqual(
+            self.run_in_thread(lambda: list(graph.subjects(RDFS.label, Literal("b")))),
+            [URIRef(EX + "b")]
+        )
+        self.run_in_thread(graph.commit)
+        self.run_in_thread(graph.close)
+
+        self.assertEqual(len(Graph(SQLiteStore(self.path))), 5)
+
+    def test_concurrent_access(self):
+        """
+        Assert concurrent readers and writers share a store safely
+        """
+        graph  = self.make_graph()
+        errors = []
+
+        def worker(idx):
+            try:
+                for jdx in xrange(200):
+                    graph.add((URIRef(EX + "t%d" % idx), RDF.value, Literal(jdx)))
+                    list(graph.triples((None, RDF.value, None)))
+                    len(graph)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(idx,)) for idx in xrange(4)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(graph), 4 + 4 * 200)
+
+    def test_lazy_ontology_thread(self):
+        """
+        Assert a lazy Ontology loaded in another thread is usable
+        """
+        memory   = Ontology(MCLUMD)
+        ontology = Ontology(MCLUMD, lazy=True, store=SQLiteStore(self.path))
+        self.assertEqual(self.run_in_thread(lambda: len(ontology.graph)), len(memory.graph))
+        self.assertEqual(ontology.classes, memory.classes)
+        self.assertEqual(len(ontology.graph), len(memory.graph))
@@ -69,3 +69,20 @@ class ParserModuleTests(unittest.TestCase):
         """
         tree = load(self.temppath, detokenize=False)
         self.assertTrue(tree)
+
+    def test_iterwalk(self):
+        """
+        Assert iterwalk matches walking the parsed tree
+        """
+        from lene.utils import walk
+        self.assertEqual(list(iterwalk(self.temppath)), list(walk(load(self.temppath))))
+
+    def test_iterwalk_unbalanced(self):
+        """
+        Assert iterwalk raises on unbalanced parentheses
+        """
+        from StringIO import StringIO
+        from lene.exceptions import SyntacticError
+        for source in ("(a (b c)", "(a))"):
+            with self.assertRaises(SyntacticError):
+                list(iterwalk(StringIO(source)))
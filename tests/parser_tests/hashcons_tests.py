@@ -0,0 +1,111 @@
+# tests.parser_tests.hashcons_tests
+# Tests for the hash-consing of parsed trees
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 09:40:12 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: hashcons_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Tests for the hash-consing of parsed trees
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import unittest
+
+from StringIO import StringIO
+from lene.parser import load, loads
+from lene.parser.hashcons import *
+from lene.utils import flatten
+from tokenize_tests import fixture
+
+##########################################################################
+## Test Cases
+##########################################################################
+
+class HashConsTests(unittest.TestCase):
+
+    def test_structure_preserved(self):
+        """
+        Assert a hash-consed tree is equal to the plain tree
+        """
+        self.assertEqual(loads(fixture), loads(fixture, hashcons=HashConsTable()))
+
+    def test_shared_subtrees(self):
+        """
+        Assert identical subtrees are the same object
+        """
+        tree = loads("(a (value (x))) (b (value (x)))", hashcons=HashConsTable())
+        self.assertIs(tree[0][1], tree[1][1])
+        self.assertIsInstance(tree[0], SExpression)
+
+    def test_dedup_ratio(self):
+        """
+        Test the dedup ratio reported by the table
+        """
+        table = HashConsTable()
+        self.assertEqual(table.dedup_ratio(), 0.0)
+
+        loads("(a (value (x))) (b (value (x)))", hashcons=table)
+        self.assertEqual(len(table), 4)
+        self.assertEqual(table.requests, 6)
+        self.assertAlmostEqual(table.dedup_ratio(), 1.0/3)
+
+    def test_load_dedup_ratio(self):
+        """
+        Test reading the dedup ratio of a file loaded with a table
+        """
+        table = HashConsTable()
+        tree  = load(StringIO("(a (value (x))) (b (value (x)))"), hashcons=table)
+        self.assertIs(tree[0][1], tree[1][1])
+        self.assertAlmostEqual(table.dedup_ratio(), 1.0/3)
+
+        with self.assertRaises(TypeError):
+            loads("(a (value (x)))", hashcons=True)
+
+    def test_shared_between_documents(self):
+        """
+        Assert a table shares nodes across documents
+        """
+        table = HashConsTable()
+        alpha = loads("(isa (value (nature)))", hashcons=table)
+        bravo = loads("(isa (value (nature)))", hashcons=table)
+        self.assertIs(alpha[0], bravo[0])
+
+    def test_atom_types_distinct(self):
+        """
+        Assert numbers of different types are not merged
+        """
+        tree = loads("(a 1) (a 1.0)", hashcons=HashConsTable())
+        self.assertIsNot(tree[0], tree[1])
+        self.assertIsInstance(tree[1][1], float)
+
+    def test_immutable(self):
+        """
+        Assert interned nodes cannot be modified
+        """
+        tree = loads("(a (b c))", hashcons=HashConsTable())
+        with self.assertRaises(TypeError):
+            tree[0].append('d')
+        with self.assertRaises(TypeError):
+            tree[0][0] = 'z'
+
+    def test_hashable(self):
+        """
+        Assert interned nodes can be used as keys
+        """
+        tree = loads("(a (b c)) (d (b c))", hashcons=HashConsTable())
+        self.assertEqual(len(set([tree[0][1], tree[1][1]])), 1)
+
+    def test_flatten(self):
+        """
+        Assert tree utilities work on interned nodes
+        """
+        tree = loads(fixture, hashcons=HashConsTable())
+        self.assertEqual(list(flatten(tree)), list(flatten(loads(fixture))))
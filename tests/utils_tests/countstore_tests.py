@@ -0,0 +1,183 @@
+# tests.utils_tests.countstore_tests
+# Test the on-disk count store
+#
+# Author:   Benjamin Bengfort <bengfort@cs.umd.edu>
+# Created:  Mon Oct 19 10:58:02 2026 -0400
+#
+# Copyright (C) 2014 UMD Metacognitive Lab
+# For license information, see LICENSE.txt
+#
+# ID: countstore_tests.py [] bengfort@cs.umd.edu $
+
+"""
+Test the on-disk count store
+"""
+
+##########################################################################
+## Imports
+##########################################################################
+
+import os
+import shutil
+import struct
+import unittest
+import tempfile
+
+from lene.exceptions import *
+from lene.utils.stats import *
+from lene.utils.countstore import *
+
+##########################################################################
+## Test Cases
+##########################################################################
+
+TREE = ['a', ['b', ['c', 'd'], 'e'], ['f', ['g', ['h'], ['i', ['j', 3]]]]]
+
+class CountStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def path(self, name):
+        return os.path.join(self.tmpdir, name)
+
+    def test_histogram_roundtrip(self):
+        """
+        Test saving and loading a Histogram
+        """
+        h = Histogram('abcabcdefa')
+        h.save(self.path('h.cnt'))
+        l = Histogram.load(self.path('h.cnt'))
+        self.assertEqual(h, l)
+        self.assertEqual(h.N(), l.N())
+        self.assertIsInstance(l.keys()[0], str)
+
+    def test_token_frequency_roundtrip(self):
+        """
+        Test saving and loading a TokenFrequency
+        """
+        freq = TokenFrequency.from_tree(TREE, idxmax=10)
+        freq.save(self.path('t.cnt'))
+        self.assertEqual(freq, TokenFrequency.load(self.path('t.cnt')))
+
+    def test_store_lookups(self):
+        """
+        Test the count lookups on the store
+        """
+        freq = TokenFrequency.from_tree(TREE + TREE, idxmax=10)
+        freq.save(self.path('t.cnt'))
+
+        for mmap in (True, False):
+            store = CountStore(self.path('t.cnt'), mmap=mmap)
+            self.assertEqual(store.kind, "TokenFrequency")
+            self.assertEqual(store.get('a', 0), 2)
+            self.assertEqual(store.get(3, 4), 2)
+            self.assertEqual(store.get('a', 1), 0)
+            self.assertEqual(store.get('z', 0), 0)
+            self.assertEqual(len(store), sum(len(h) for h in freq.values()))
+
+    def test_empty_store(self):
+        """
+        Test saving and loading empty counts
+        """
+        Histogram().save(self.path('e.cnt'))
+        self.assertEqual(Histogram.load(self.path('e.cnt')), Histogram())
+
+    def test_token_types(self):
+        """
+        Assert bytes, unicode and numeric tokens round trip exactly
+        """
+        tokens = ['plain', '\xff\xfe not utf-8', u'caf\u00e9', 'caf\xc3\xa9', 3, 3.5, True, 10**20]
+        h = Histogram()
+        for count, token in enumerate(tokens, 1):
+            h[token] = count
+        h.save(self.path('types.cnt'))
+
+        loaded = Histogram.load(self.path('types.cnt'))
+        self.assertEqual(loaded, h)
+        self.assertEqual(sorted(map(type, loaded)), sorted(map(type, h)))
+
+        with CountStore(self.path('types.cnt')) as store:
+            for count, token in enumerate(tokens, 1):
+                self.assertEqual(store.get(token), count)
+            self.assertEqual(store.get(u'plain'), 0)
+            self.assertEqual(store.get('3'), 0)
+            self.assertEqual(store.get(None), 0)
+
+        with self.assertRaises(TypeError):
+            encode_token(None)
+
+    def test_large_vocabulary(self):
+        """
+        Test lookups by binary search over a large vocabulary
+        """
+        freq = TokenFrequency()
+        for idx in xrange(5000):
+            freq[idx % 7]['token-%d' % idx] = idx + 1
+        freq.save(self.path('large.cnt'))
+
+        with CountStore(self.path('large.cnt')) as store:
+            self.assertEqual(len(store.tokens), 5000)
+            for idx in xrange(0, 5000, 37):
+                self.assertEqual(store.get('token-%d' % idx, idx % 7), idx + 1)
+                self.assertEqual(store.get('token-%d' % idx, (idx + 1) % 7), 0)
+            self.assertEqual(store.get('token-5000', 0), 0)
+            self.assertEqual(sum(1 for _ in store), 5000)
+        self.assertEqual(TokenFrequency.load(self.path('large.cnt')), freq)
+
+    def test_failed_write(self):
+        """
+        Assert a failed write leaves no files behind
+        """
+        with self.assertRaises(struct.error):
+            write_counts(self.path('big.cnt'), 'Histogram', [(0, 'a', 2 ** 70)])
+        self.assertEqual(os.listdir(self.tmpdir), [])
+
+    def test_bad_magic(self):
+        """
+        Assert an error is raised on a non count file
+        """
+        with open(self.path('bad.cnt'), 'wb') as f:
+            f.write("NOTCOUNT" + "\0" * 8)
+
+        with self.assertRaises(LeneException):
+            CountStore(self.path('bad.cnt'))
+
+    def test_merge_associative(self):
+        """
+        Assert saved partial counts merge associatively
+        """
+        parts = [['a', ['b', 'c']], ['a', ['c']], [['d', 'b']]]
+        paths = []
+        for idx, part in enumerate(parts):
+            paths.append(self.path('%d.cnt' % idx))
+            TokenFrequency.from_tree(part).save(paths[-1])
+
+        left = TokenFrequency(TokenFrequency.load(paths[0]))
+        left.update(TokenFrequency.load(paths[1]))
+        left.update(TokenFrequency.load(paths[2]))
+
+        right = TokenFrequency(TokenFrequency.load(paths[1]))
+        right.update(TokenFrequency.load(paths[2]))
+        right.update(TokenFrequency.load(paths[0]))
+
+        expected = TokenFrequency()
+        for part in parts:
+            expected.update(TokenFrequency.from_tree(part))
+
+        self.assertEqual(left, right)
+        self.assertEqual(left, expected)
+
+    def test_update_does_not_share(self):
+        """
+        Assert merging copies rather than shares histograms
+        """
+        part  = TokenFrequency.from_tree(['a', ['b']])
+        total = TokenFrequency()
+        total.update(part)
+        total.update(part)
+        self.assertEqual(part[0]['a'], 1)
+        self.assertEqual(total[0]['a'], 2)
@@ -18,11 +18,13 @@ Testing for the rdfutils package in Lene
 ##########################################################################
 
 import unittest
+import threading
 import rdflib.term
 
+from lene.exceptions import *
 from lene.utils.rdfutils import *
 from lene.ontology.vocabs import OWL
-from rdflib import RDFS, BNode
+from rdflib import RDFS, BNode, URIRef
 
 ##########################################################################
 ## TestCases
@@ -65,13 +67,182 @@ class RDFUtilsTests(unittest.TestCase):
             rdflib.term.URIRef(u'http://www.w3.org/2002/07/owl#equivalentClass'),
         ])
 
-    @unittest.skip
+    def test_namespace_sort_remaining(self):
+        """
+        Assert uris outside the namespaces are sorted last by name
+        """
+        uris = [
+            rdflib.term.URIRef(u'http://cs.umd.edu/active/#zebra'),
+            rdflib.term.URIRef(u'http://www.w3.org/2000/01/rdf-schema#label'),
+            rdflib.term.URIRef(u'http://cs.umd.edu/active/#actor'),
+            rdflib.term.URIRef(u'http://www.w3.org/2002/07/owl#equivalentClass'),
+        ]
+
+        uris = sort_by_namespace_prefix(uris, [RDFS, OWL.OWLNS, RDFS])
+        self.assertEqual(uris, [
+            rdflib.term.URIRef(u'http://www.w3.org/2000/01/rdf-schema#label'),
+            rdflib.term.URIRef(u'http://www.w3.org/2002/07/owl#equivalentClass'),
+            rdflib.term.URIRef(u'http://cs.umd.edu/active/#actor'),
+            rdflib.term.URIRef(u'http://cs.umd.edu/active/#zebra'),
+        ])
+
     def test_uri_name_sort(self):
         """
         Test the URI name sort utility
         """
-        # TODO: Implement
-        pass
+        uris = [
+            rdflib.URIRef(u'http://purl.org/vocab/frbr/core#Work'),
+            rdflib.URIRef(u'http://purl.org/ontology/mo/Vinyl'),
+            rdflib.URIRef(u'http://cs.umd.edu/active/#Caf\xe9'),
+        ]
+        self.assertEqual(sort_uri_list_by_name(uris), [
+            rdflib.URIRef(u'http://cs.umd.edu/active/#Caf\xe9'),
+            rdflib.URIRef(u'http://purl.org/ontology/mo/Vinyl'),
+            rdflib.URIRef(u'http://purl.org/vocab/frbr/core#Work'),
+        ])
+
+    def test_prefix_trie(self):
+        """
+        Test the prefix trie matching
+        """
+        trie = PrefixTrie([("http://a/", 1), ("http://a/b#", 2), ("http://c/", 3)])
+        self.assertEqual(len(trie), 3)
+        self.assertEqual(trie["http://a/b#"], 2)
+        self.assertNotIn("http://a/b", trie)
+        self.assertEqual(list(trie.prefixes("http://a/b#x")), [("http://a/", 1), ("http://a/b#", 2)])
+        self.assertEqual(trie.longest_prefix("http://a/b#x"), ("http://a/b#", 2))
+        self.assertEqual(trie.longest_prefix("http://d/x"), None)
+
+    def test_namespace_ranker(self):
+        """
+        Test the namespace ranker uses the first matching namespace
+        """
+        ranker = NamespaceRanker(["http://a/b#", "http://c/", "http://a/"])
+        self.assertEqual(ranker.rank("http://a/b#x"), 0)
+        self.assertEqual(ranker.rank("http://a/x"), 2)
+        self.assertEqual(ranker.rank("http://d/x"), 3)
+        self.assertEqual(ranker.key("http://a/x"), (2, "x"))
+        self.assertIn("http://a/x", ranker.keys)
+
+    def test_split_uri(self):
+        """
+        Test the decomposition of uris into namespace, name and prefix
+        """
+        tests = (
+            (OWL.Class, (u"http://www.w3.org/2002/07/owl#", u"Class", u"owl")),
+            (u"http://example.com/people/bob", (u"http://example.com/people/", u"bob", u"people")),
+            (u"http://www.w3.org/2008/05/skos#", (u"http://www.w3.org/2008/05/skos#", u"", u"skos")),
+            (u"bob", (u"", u"bob", u"")),
+        )
+
+        for uri, parts in tests:
+            self.assertEqual(split_uri(uri, cache=LRUCache()), parts)
+
+        self.assertEqual(infer_namespace_prefix(u"http://www.w3.org/2008/05/skos#"), u"skos")
+        self.assertEqual(infer_namespace_prefix(u"http://www.w3.org/2008/05/skos"), u"skos")
+        self.assertEqual(infer_namespace_prefix(u"http://cs.umd.edu/active/#"), u"active")
+        self.assertIn(u"http://cs.umd.edu/active/#", URI_CACHE)
+        self.assertEqual(infer_namespace_prefix(u"http://example.com/people/"), u"people")
+        self.assertEqual(infer_namespace_prefix(u"http://example.com/caf\u00e9#"), u"caf\u00e9")
+        self.assertEqual(infer_namespace_prefix(URIRef(u"http://\u4f8b\u3048.jp/\u8a9e/")), u"\u8a9e")
+        self.assertEqual(namespace_prefix("", u"http://example.com/people/"), u"people")
+        self.assertEqual(namespace_prefix("ex", u"http://example.com/people/"), u"ex")
+        self.assertEqual(namespace_prefix("", u"http://example.com/"), u"example.com")
+        self.assertEqual(namespace_prefix("", u""), u"base")
+        self.assertEqual(uri_last_bit(OWL.Class), u"Class")
+
+    def test_split_uri_cached(self):
+        """
+        Assert uri decompositions are served from the cache
+        """
+        cache = LRUCache()
+        parts = split_uri(OWL.Class, cache=cache)
+        self.assertIs(split_uri(OWL.Class, cache=cache), parts)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_lru_cache_threads(self):
+        """
+        Assert the LRU list stays consistent when shared between threads
+        """
+        cache = LRUCache(maxsize=64)
+
+        def work(seed):
+            for idx in xrange(5000):
+                key = (idx * seed) % 200
+                if cache.get(key) is None:
+                    cache[key] = key
+
+        threads = [threading.Thread(target=work, args=(seed,)) for seed in (1, 3, 7, 11)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+
+        # Walk the list and check it links exactly the cached items
+        keys = []
+        link = cache.root[LRUCache.NEXT]
+        while link is not cache.root:
+            self.assertIs(cache.map[link[LRUCache.KEY]], link)
+            self.assertIs(link[LRUCache.NEXT][LRUCache.PREV], link)
+            keys.append(link[LRUCache.KEY])
+            link = link[LRUCache.NEXT]
+
+        self.assertEqual(len(keys), len(cache))
+        self.assertEqual(sorted(keys), sorted(cache.map))
+        self.assertLessEqual(len(cache), 64)
+        self.assertEqual(cache.hits + cache.misses, 20000)
+
+    def test_lru_cache(self):
+        """
+        Test the eviction of the least recently used items
+        """
+        cache = LRUCache(maxsize=3)
+        for key in "abc":
+            cache[key] = key.upper()
+
+        self.assertEqual(cache.get('a'), 'A')
+        cache['d'] = 'D'
+        self.assertEqual(len(cache), 3)
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+
+        cache['c'] = 'Z'
+        cache['e'] = 'E'
+        self.assertNotIn('a', cache)
+        self.assertEqual(cache['c'], 'Z')
+        self.assertIsNone(cache.get('b'))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.misses, 0)
+
+    def test_namespace_map(self):
+        """
+        Test the conversion of uris to prefixed names and back
+        """
+        nsmap = NamespaceMap([
+            ("owl", OWL.OWLNS), ("ex", "http://example.com/"),
+            ("exp", "http://example.com/people/"), ("", "http://example.org/base#"),
+        ])
+
+        self.assertEqual(nsmap.uri2nice(OWL.Class), "owl:Class")
+        self.assertEqual(nsmap.uri2nice("http://example.com/people/bob"), "exp:bob")
+        self.assertEqual(nsmap.uri2nice("http://example.com/dogs/rex"), "ex:dogs/rex")
+        self.assertEqual(nsmap.uri2nice("http://example.org/base#x"), "base:x")
+        self.assertEqual(nsmap.uri2nice("http://other.com/cats/tom"), "cats:tom")
+
+        self.assertEqual(nsmap.nice2uri("exp:bob"), URIRef("http://example.com/people/bob"))
+        self.assertEqual(nsmap.nice2uri("http://other.com/x"), URIRef("http://other.com/x"))
+        with self.assertRaises(OntologyException):
+            nsmap.nice2uri("dogs:rex")
+
+        # Inferred prefixes are added to the map and numbered if taken
+        self.assertEqual(nsmap.nice2uri("cats:tom"), URIRef("http://other.com/cats/tom"))
+        self.assertEqual(nsmap.uri2nice("http://more.com/cats/kit"), "cats1:kit")
+        self.assertEqual(nsmap.uri2nice("http://other.com/cats/kit"), "cats:kit")
+        self.assertEqual(nsmap.uri2nice(u"http://example.net/caf\u00e9#x"), u"caf\u00e9:x")
+        self.assertEqual(nsmap.uri2nice("bob"), "bob")
+
+        for uri in ("http://more.com/cats/kit", u"http://example.net/caf\u00e9#x", OWL.Class):
+            self.assertEqual(nsmap.nice2uri(nsmap.uri2nice(uri)), URIRef(uri))
 
     def test_is_blank(self):
         """
@@ -95,3 +266,27 @@ class RDFUtilsTests(unittest.TestCase):
 
         for uri, fmt in tests:
             self.assertEqual(fmt, guess_rdf_format(uri))
+
+    def test_normalize_query(self):
+        """
+        Assert whitespace and comments are normalized outside of literals
+        """
+        query = """
+            SELECT  ?x   # the subjects
+            WHERE { ?x <http://example.com/#p>  "a  # b" }
+        """
+        self.assertEqual(normalize_query(query),
+            'SELECT ?x WHERE { ?x <http://example.com/#p> "a  # b" }')
+        self.assertEqual(normalize_query("ASK {\n?x ?p 'y  z' }"), "ASK { ?x ?p 'y  z' }")
+
+        # Escaped characters in local names are not the start of a comment
+        self.assertEqual(normalize_query(r"ASK { e:a\#b  a e:C } # c"), r"ASK { e:a\#b a e:C }")
+        self.assertNotEqual(normalize_query(r"ASK { e:a\#b a e:C }"),
+                            normalize_query(r"ASK { e:a\#c a e:C }"))
+
+    def test_expand_uri(self):
+        """
+        Test expanding lazy web addresses
+        """
+        self.assertEqual(expand_uri("www.example.com/a.owl"), "http://www.example.com/a.owl")
+        self.assertEqual(expand_uri("/home/ubuntu/mclumd.owl"), "/home/ubuntu/mclumd.owl")
@@ -17,6 +17,8 @@ Test the lene statistics package
 ## Imports
 ##########################################################################
 
+import copy
+import pickle
 import unittest
 from lene.utils.stats import *
 
@@ -49,6 +51,24 @@ class HistogramTests(unittest.TestCase):
         h = Histogram('abcabc')
         self.assertEqual(h.N(), 6)
 
+    def test_N_maintained(self):
+        """
+        Assert the total is kept up to date by every mutator
+        """
+        h = Histogram('abcabc')
+        h.update('aa')
+        h.update({'d': 3})
+        h.incr('e', 2)
+        h.decr('a')
+        h['b'] = 5
+        del h['c']
+        h.pop('e')
+        h.setdefault('f', 4)
+        self.assertEqual(h.N(), sum(h.values()))
+
+        h.clear()
+        self.assertEqual(h.N(), 0)
+
     def test_B(self):
         """
         Test number of bins measurement
@@ -77,6 +97,28 @@ class HistogramTests(unittest.TestCase):
         h = Histogram()
         self.assertEqual(h.freq('a'), 0.0)
 
+    def test_frequencies(self):
+        """
+        Test the bulk frequency computation
+        """
+        h = Histogram('abcabcdefa')
+        freqs = h.frequencies()
+        self.assertEqual(freqs['a'], 0.3)
+        self.assertEqual(freqs['f'], 0.1)
+        self.assertAlmostEqual(sum(freqs.values()), 1.0)
+        self.assertEqual(Histogram().frequencies(), {})
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_frequencies_array(self):
+        """
+        Test the bulk frequency computation as an array
+        """
+        h = Histogram('abcabcdefa')
+        elems, freqs = h.frequencies(as_array=True)
+        self.assertEqual(len(elems), len(freqs))
+        for elem, freq in zip(elems, freqs):
+            self.assertAlmostEqual(freq, h.freq(elem))
+
     def test_max(self):
         """
         Test the histogram maximum computation
@@ -238,6 +280,26 @@ class HistogramTests(unittest.TestCase):
         h2 = h.copy()
         self.assertNotEqual(id(h2), id(h))
 
+    def test_copy_module_totals(self):
+        """
+        Assert copies and pickles keep the running total
+        """
+        h = Histogram('aabc')
+        copies = (
+            copy.copy(h), copy.deepcopy(h),
+            pickle.loads(pickle.dumps(h)), pickle.loads(pickle.dumps(h, 2)),
+        )
+        for c in copies:
+            self.assertIsInstance(c, Histogram)
+            self.assertEqual(c, h)
+            self.assertEqual(c.N(), 4)
+            self.assertEqual(c.freq('a'), 0.5)
+
+        freq = TokenFrequency.from_tree(['a', ['b', 'a']])
+        for c in (copy.deepcopy(freq), pickle.loads(pickle.dumps(freq, 2))):
+            self.assertEqual([hist.N() for hist in c.values()],
+                             [hist.N() for hist in freq.values()])
+
     def test_pprint(self):
         """
         Test the pretty print method
@@ -457,3 +519,366 @@ class TokenFrequencyTests(unittest.TestCase):
             trpr = repr(freq)
         except Exception as e:
             self.fail(str(e))
+
+class TreeProfileTests(unittest.TestCase):
+
+    tree = [
+        ['in-package', ':reps'],
+        ['define-frame', 'NATURE', ['isa', ['value', ['non-volitional-agent']]]],
+        ['define', 'area', ['lambda', ['r'], ['*', 3.14, ['*', 'r', 'r']]]],
+    ]
+
+    def test_frames(self):
+        """
+        Test the per frame token counts, sizes and depths
+        """
+        profile = TreeProfile(self.tree)
+        self.assertEqual(profile.N(), 3)
+
+        package, nature, area = profile.frames
+        self.assertEqual(package, FrameProfile(0, ':reps', 2, len("(in-package :reps)"), 1))
+        self.assertEqual(nature.name, 'NATURE')
+        self.assertEqual(nature.tokens, 5)
+        self.assertEqual(nature.size, len("(define-frame NATURE (isa (value (non-volitional-agent))))"))
+        self.assertEqual(nature.depth, 4)
+        self.assertEqual(area.size, len("(define area (lambda (r) (* 3.14 (* r r))))"))
+        self.assertEqual(area.depth, 4)
+
+    def test_distributions(self):
+        """
+        Test the depth and branching factor distributions
+        """
+        profile = TreeProfile(self.tree)
+        self.assertEqual(profile.depths, Histogram({1: 1, 4: 2}))
+        self.assertEqual(profile.branching[3], 5)
+        self.assertEqual(profile.branching[1], 2)
+        self.assertEqual(profile.branching.N(), 10)
+
+    def test_largest_deepest(self):
+        """
+        Test finding the largest and deepest frames
+        """
+        profile = TreeProfile(self.tree)
+        self.assertEqual([f.name for f in profile.largest(1)], ['NATURE'])
+        self.assertEqual([f.name for f in profile.deepest(2)], ['NATURE', 'area'])
+
+    def test_deep_frame(self):
+        """
+        Assert very deep frames do not hit the recursion limit
+        """
+        frame = ['leaf']
+        for _ in xrange(5000):
+            frame = ['node', frame]
+
+        profile = TreeProfile()
+        self.assertEqual(profile.profile(frame).depth, 5001)
+        self.assertIn('Deepest Frames', profile.pprint())
+
+
+class CountMinSketchTests(unittest.TestCase):
+
+    def test_bounds(self):
+        """
+        Test the width and depth from the error bounds
+        """
+        sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+        self.assertEqual(sketch.width, 272)
+        self.assertEqual(sketch.depth, 5)
+        self.assertLessEqual(sketch.epsilon, 0.01)
+        self.assertLessEqual(sketch.delta, 0.01)
+
+    def test_never_undercounts(self):
+        """
+        Assert estimates are upper bounds within the error
+        """
+        sketch = CountMinSketch(width=16, depth=3)
+        hist   = Histogram()
+        for idx in xrange(500):
+            token = "token-%d" % (idx % 37)
+            sketch.incr(token)
+            hist.incr(token)
+
+        self.assertEqual(sketch.N(), hist.N())
+        for token, count in hist.iteritems():
+            self.assertGreaterEqual(sketch[token], count)
+
+    def test_exact_when_wide(self):
+        """
+        Test estimates with few elements in a wide sketch
+        """
+        sketch = CountMinSketch()
+        sketch.update('abcabca')
+        self.assertEqual(sketch['a'], 3)
+        self.assertEqual(sketch['c'], 2)
+        self.assertEqual(sketch['z'], 0)
+
+    def test_merge(self):
+        """
+        Assert merging is the same as counting the union
+        """
+        alpha = CountMinSketch(width=32, depth=4)
+        bravo = CountMinSketch(width=32, depth=4)
+        total = CountMinSketch(width=32, depth=4)
+        alpha.update(range(50))
+        bravo.update(range(25, 100))
+        total.update(range(50) + range(25, 100))
+
+        merged = alpha + bravo
+        self.assertEqual(merged.table, total.table)
+        self.assertEqual(merged.N(), total.N())
+
+        with self.assertRaises(ValueError):
+            alpha.merge(CountMinSketch(width=8, depth=4))
+
+
+class SpaceSavingTests(unittest.TestCase):
+
+    def test_exact_under_capacity(self):
+        """
+        Test exact counts while under capacity
+        """
+        summary = SpaceSaving(10)
+        summary.update('abcabca')
+        self.assertEqual(summary.most_common(1), [('a', 3)])
+        self.assertEqual(summary['b'], 2)
+        self.assertEqual(summary['c'], 2)
+        self.assertEqual(summary.error('a'), 0)
+
+    def test_heavy_hitters(self):
+        """
+        Assert heavy hitters are found with bounded error
+        """
+        summary = SpaceSaving(10)
+        hist    = Histogram()
+        stream  = ['x'] * 100 + ['y'] * 50 + ["noise-%d" % idx for idx in xrange(200)]
+        stream  = [stream[(idx * 7) % len(stream)] for idx in xrange(len(stream))]
+        for token in stream:
+            summary.incr(token)
+            hist.incr(token)
+
+        self.assertEqual(len(summary), 10)
+        self.assertEqual([t for t, _ in summary.most_common(2)], ['x', 'y'])
+        for token in ('x', 'y'):
+            self.assertGreaterEqual(summary[token], hist[token])
+            self.assertLessEqual(summary.guaranteed(token), hist[token])
+            self.assertLessEqual(summary[token] - hist[token], summary.N() / 10)
+
+    def test_merge(self):
+        """
+        Test merging two summaries
+        """
+        alpha = SpaceSaving(3)
+        bravo = SpaceSaving(3)
+        alpha.update('aaaabbc')
+        bravo.update('aabbbbd')
+
+        merged = alpha + bravo
+        self.assertEqual(merged.N(), 14)
+        self.assertEqual(merged['a'], 6)
+        self.assertEqual(merged['b'], 6)
+        self.assertEqual(len(merged), 3)
+
+        with self.assertRaises(ValueError):
+            alpha.merge(SpaceSaving(4))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TokenTensorTests(unittest.TestCase):
+
+    tree = ['a', ['b', ['c', 'd'], 'e'], ['f', ['g', ['h'], ['i', ['j', 'd']]]]]
+
+    def test_vocabulary(self):
+        """
+        Test the symbol vocabulary
+        """
+        vocab = Vocabulary('abca')
+        self.assertEqual(len(vocab), 3)
+        self.assertEqual(vocab['c'], 2)
+        self.assertEqual(vocab.symbol(1), 'b')
+        self.assertEqual(vocab.add('d'), 3)
+        self.assertIn('d', vocab)
+
+    def test_dense(self):
+        """
+        Test the dense tensor construction
+        """
+        tensor = TokenTensor(self.tree)
+        dense  = tensor.dense()
+        vocab  = tensor.vocab
+        self.assertEqual(dense.shape, (10, 5, 3))
+        self.assertEqual(dense.sum(), 11)
+        self.assertEqual(dense[vocab['d'], 2, 1], 1)
+        self.assertEqual(dense[vocab['d'], 4, 1], 1)
+        self.assertEqual(dense[vocab['e'], 1, 2], 1)
+
+    def test_update_merges(self):
+        """
+        Assert updating sums duplicate coordinates
+        """
+        tensor = TokenTensor(self.tree)
+        tensor.update(self.tree)
+        self.assertEqual(tensor.counts.size, 11)
+        self.assertEqual(tensor.dense().sum(), 22)
+
+        other = TokenTensor(self.tree, vocab=tensor.vocab)
+        tensor.update(other)
+        self.assertEqual(tensor.dense().sum(), 33)
+
+        with self.assertRaises(ValueError):
+            tensor.update(TokenTensor(self.tree))
+
+    def test_marginals(self):
+        """
+        Test the marginal counts of the tensor
+        """
+        tensor = TokenTensor(self.tree)
+        self.assertEqual(tensor.marginal(TokenTensor.DEPTH).tolist(), [1, 3, 3, 2, 2])
+        self.assertEqual(tensor.marginal(TokenTensor.POSITION).tolist(), [8, 2, 1])
+        self.assertEqual(tensor.marginal(TokenTensor.SYMBOL)[tensor.vocab['d']], 2)
+        self.assertEqual(tensor.marginal(TokenTensor.SYMBOL, TokenTensor.DEPTH).shape, (10, 5))
+
+    def test_top(self):
+        """
+        Test the top k per depth and per position
+        """
+        tensor = TokenTensor(self.tree)
+        self.assertEqual(tensor.top(1), [('d', 2)])
+        self.assertEqual(tensor.top(depth=2), [('c', 1), ('d', 1), ('g', 1)])
+        self.assertEqual(tensor.top(position=2), [('e', 1)])
+        self.assertEqual(tensor.top(depth=2, position=1), [('d', 1)])
+
+    def test_token_frequency(self):
+        """
+        Assert the tensor reproduces the TokenFrequency counts
+        """
+        tensor = TokenTensor(self.tree)
+        for idxmax in (0, 10):
+            self.assertEqual(tensor.to_token_frequency(idxmax),
+                             TokenFrequency.from_tree(self.tree, idxmax=idxmax))
+
+    def test_pprint(self):
+        """
+        Assert the tensor pprint matches TokenFrequency
+        """
+        tree   = [['define', 'a', ['isa', 'b']], ['define', 'c', ['isa', 'b']]]
+        tensor = TokenTensor(tree)
+        freq   = TokenFrequency.from_tree(tree)
+        self.assertEqual(tensor.pprint(idxmax=0), freq.pprint())
+        self.assertEqual(tensor.pprint(depth=1, idxmax=0), freq.pprint(depth=1))
+
+    def test_pprint_ties(self):
+        """
+        Assert tied tokens are printed in the same order as TokenFrequency
+        """
+        tree   = [[token, 'x'] for token in 'zyxwvutsrq'] + [['q', 'y'], ['z', 'y']]
+        tensor = TokenTensor(tree)
+        freq   = TokenFrequency.from_tree(tree, idxmax=10)
+        self.assertEqual(tensor.pprint(), freq.pprint())
+
+        lines = freq.pprint().splitlines()
+        self.assertEqual(lines[2:6], ["  11   x", "  3    y", "  2    q", "  2    z"])
+        self.assertEqual(lines[6].split(), ["1", "r"])
+
+    def test_streaming_updates(self):
+        """
+        Assert buffered updates are compacted into the same counts
+        """
+        whole = TokenTensor(self.tree)
+        streamed = TokenTensor()
+        streamed.COMPACT = 16
+        for _ in xrange(20):
+            streamed.update(self.tree)
+            self.assertLessEqual(streamed._npending, max(16, streamed._counts.size) + 11)
+
+        self.assertEqual(streamed.counts.size, whole.counts.size)
+        self.assertEqual(streamed._pending, [])
+        self.assertEqual(streamed.dense().tolist(), (whole.dense() * 20).tolist())
+
+    def test_empty(self):
+        """
+        Test an empty tensor
+        """
+        tensor = TokenTensor([])
+        self.assertEqual(tensor.shape, (0, 0, 0))
+        self.assertEqual(tensor.top(), [])
+        self.assertEqual(tensor.pprint(), "")
+
+
+@unittest.skipIf(sparse is None, "SciPy is not installed")
+class SlotFillerCooccurrenceTests(unittest.TestCase):
+
+    tree = [
+        ['in-package', ':reps'],
+        ['define-frame', 'NATURE', ['isa', ['value', ['non-volitional-agent']]]],
+        ['define-attribute-value', 'HOT.0', ['isa', ['value', ['temperature-value']]]],
+        ['define-attribute-value', 'COLD.0', ['isa', ['value', ['temperature-value']]]],
+        ['define-relation', 'TEMPERATURE',
+            ['isa', ['value', ['physical-object-attribute']]],
+            ['domain', ['value', ['physical-object']]],
+            ['co-domain', ['value', ['temperature-value']]]],
+        ['define-frame', 'BURNS',
+            ['actor', ['value', '=actor']],
+            ['goal-scene', ['value', ['ingest->fuel', ['actor', ['value', '=actor']]]]]],
+    ]
+
+    def test_kind_slot(self):
+        """
+        Test the kind by slot matrix
+        """
+        cooc = SlotFillerCooccurrence(self.tree)
+        matrix = cooc.kind_slot
+        self.assertEqual(matrix.shape, (len(cooc.kinds), len(cooc.slots)))
+        self.assertEqual(matrix[cooc.kinds['define-attribute-value'], cooc.slots['isa']], 2)
+        self.assertEqual(matrix[cooc.kinds['define-frame'], cooc.slots['isa']], 1)
+        self.assertEqual(matrix.sum(), 8)
+        self.assertEqual(matrix[cooc.kinds['in-package']].sum(), 0)
+
+    def test_slot_filler(self):
+        """
+        Test the slot by filler matrix
+        """
+        cooc = SlotFillerCooccurrence(self.tree)
+        self.assertEqual(cooc.fillers_for('isa'), [
+            ('temperature-value', 2), ('non-volitional-agent', 1),
+            ('physical-object-attribute', 1)
+        ])
+        self.assertEqual(cooc.fillers_for('actor'), [('=actor', 1)])
+        self.assertEqual(cooc.fillers_for('goal-scene'), [('ingest->fuel', 1)])
+        self.assertEqual(cooc.fillers_for('missing'), [])
+        self.assertEqual(cooc.slots_for('define-relation', 1), [('isa', 1)])
+
+    def test_merge(self):
+        """
+        Assert merging is the same as counting in one pass
+        """
+        whole = SlotFillerCooccurrence(self.tree)
+        parts = SlotFillerCooccurrence(self.tree[3:])
+        parts.update(SlotFillerCooccurrence(self.tree[:3]))
+
+        for kind in whole.kinds:
+            self.assertEqual(sorted(whole.slots_for(kind)), sorted(parts.slots_for(kind)))
+        for slot in whole.slots:
+            self.assertEqual(sorted(whole.fillers_for(slot)), sorted(parts.fillers_for(slot)))
+
+    def test_aggregated_counts(self):
+        """
+        Assert repeated pairs are aggregated rather than stored per occurrence
+        """
+        cooc = SlotFillerCooccurrence(self.tree * 50)
+        self.assertEqual(len(cooc._kind_slot), len(SlotFillerCooccurrence(self.tree)._kind_slot))
+        self.assertEqual(cooc.kind_slot.sum(), 400)
+        self.assertEqual(cooc.fillers_for('isa', 1), [('temperature-value', 100)])
+
+    def test_cached_matrices(self):
+        """
+        Assert matrices are cached until the counts are updated
+        """
+        cooc   = SlotFillerCooccurrence(self.tree)
+        matrix = cooc.kind_slot
+        self.assertIs(cooc.kind_slot, matrix)
+        self.assertIs(cooc.slot_filler, cooc.slot_filler)
+
+        cooc.update([['define-frame', 'ICE', ['melts', ['value', ['water']]]]])
+        self.assertIsNot(cooc.kind_slot, matrix)
+        self.assertEqual(cooc.kind_slot.sum(), 9)
+        self.assertEqual(cooc.fillers_for('melts'), [('water', 1)])